@@ -13,6 +13,7 @@ create table if not exists public.missing_persons (
     photo_path text,
     reported_date timestamptz not null,
     status text default 'missing',
+    region text,
     ai_analysis jsonb default '{}'::jsonb,
     face_encoding vector(128),
     embedding vector(1536),
@@ -31,6 +32,7 @@ create table if not exists public.citizen_reports (
     report_time timestamptz not null,
     status text default 'pending',
     embedding vector(1536),
+    face_encoding vector(128),
     created_at timestamptz default now()
 );
 
@@ -66,10 +68,76 @@ create table if not exists public.alerts (
 );
 
 -- 7. Semantic Search Function (pgvector similarity)
+-- Candidates are pre-ranked on 1-bit binary-quantized codes (32x smaller than the float vectors,
+-- served from an HNSW index), then the best match_count * rerank_factor are re-ranked exactly.
+-- Requires pgvector >= 0.7 (binary_quantize, bit_hamming_ops).
+create index if not exists missing_persons_embedding_bq_idx on public.missing_persons
+  using hnsw ((binary_quantize(embedding)::bit(1536)) bit_hamming_ops);
+
+-- Normalized 128-d SFace vectors of the sighting photo (null when no face was found)
+alter table public.citizen_reports add column if not exists face_encoding vector(128);
+
+-- Near-duplicate reports merged into this one within the dedup window (the row itself counts as 1)
+alter table public.citizen_reports add column if not exists duplicate_count integer not null default 1;
+alter table public.citizen_reports add column if not exists last_reported_at timestamptz;
+-- Reporter and photo of each merged duplicate (they are not verified again, but still evidence)
+create table if not exists public.citizen_report_duplicates (
+    id bigint generated always as identity primary key,
+    report_id bigint not null references public.citizen_reports(id) on delete cascade,
+    location text,
+    description text,
+    reporter_phone text,
+    sighting_photo text,
+    report_time timestamptz not null,
+    created_at timestamptz default now()
+);
+create index if not exists citizen_report_duplicates_report_idx on public.citizen_report_duplicates (report_id);
+
+-- Filter columns (existing deployments: region is new) and b-tree indexes for selective predicates
+alter table public.missing_persons add column if not exists region text;
+create index if not exists missing_persons_status_age_idx on public.missing_persons (status, age);
+create index if not exists missing_persons_reported_date_idx on public.missing_persons (reported_date);
+create index if not exists missing_persons_region_idx on public.missing_persons (lower(region));
+
+-- Change time kept by the database (not the app), the watermark for the local stores' incremental sync:
+-- edits to status, region or the embedding by any instance or directly in SQL reach every store
+alter table public.missing_persons add column if not exists updated_at timestamptz not null default now();
+create index if not exists missing_persons_updated_at_idx on public.missing_persons (updated_at, id);
+
+create or replace function touch_updated_at()
+returns trigger
+language plpgsql
+as $$
+begin
+  new.updated_at := now();
+  return new;
+end;
+$$;
+
+drop trigger if exists missing_persons_touch_updated_at on public.missing_persons;
+create trigger missing_persons_touch_updated_at
+  before insert or update on public.missing_persons
+  for each row execute function touch_updated_at();
+
+-- Filters are applied inside the candidate scan (not to its output), so a narrow filter still
+-- returns match_count rows: selective predicates plan as a b-tree scan of just the matching
+-- subset, broad ones walk the HNSW index with iterative scan (pgvector >= 0.8; a no-op before).
+-- Every earlier signature is dropped first: create or replace with new arguments adds an overload,
+-- and PostgREST rejects named-argument calls that match more than one (PGRST203).
+drop function if exists match_missing_persons(vector, float, int);
+drop function if exists match_missing_persons(vector, float, int, int);
+
 create or replace function match_missing_persons (
   query_embedding vector(1536),
   match_threshold float,
-  match_count int
+  match_count int,
+  rerank_factor int default 4,
+  filter_status text default 'missing',
+  min_age int default null,
+  max_age int default null,
+  reported_after timestamptz default null,
+  reported_before timestamptz default null,
+  filter_region text default null
 )
 returns table (
   id bigint,
@@ -82,7 +150,20 @@ returns table (
 language plpgsql
 as $$
 begin
+  perform set_config('hnsw.iterative_scan', 'relaxed_order', true);
   return query
+  with candidates as (
+    select missing_persons.id
+    from missing_persons
+    where (filter_status is null or missing_persons.status = filter_status)
+      and (min_age is null or missing_persons.age >= min_age)
+      and (max_age is null or missing_persons.age <= max_age)
+      and (reported_after is null or missing_persons.reported_date >= reported_after)
+      and (reported_before is null or missing_persons.reported_date <= reported_before)
+      and (filter_region is null or lower(missing_persons.region) = lower(filter_region))
+    order by binary_quantize(missing_persons.embedding)::bit(1536) <~> binary_quantize(query_embedding)
+    limit match_count * rerank_factor
+  )
   select
     missing_persons.id,
     missing_persons.name,
@@ -91,9 +172,66 @@ begin
     1 - (missing_persons.embedding <=> query_embedding) as similarity,
     to_char((1 - (missing_persons.embedding <=> query_embedding)) * 100, '999.9') || '%' as match_confidence
   from missing_persons
+  join candidates on candidates.id = missing_persons.id
   where 1 - (missing_persons.embedding <=> query_embedding) > match_threshold
-    and status = 'missing'
   order by missing_persons.embedding <=> query_embedding
   limit match_count;
 end;
 $$;
+
+-- 8. Atomic multi-table writes (one round trip each; the backend falls back to sequential writes
+-- until these exist). A plpgsql function runs in a single transaction: all rows or none.
+create or replace function create_missing_person(person jsonb)
+returns bigint
+language plpgsql
+as $$
+declare
+  new_id bigint;
+begin
+  insert into missing_persons (name, age, description, photo_path, reported_date, status, region,
+                               ai_analysis, face_encoding, embedding)
+  values (
+    person->>'name',
+    (person->>'age')::integer,
+    person->>'description',
+    person->>'photo_path',
+    (person->>'reported_date')::timestamptz,
+    coalesce(person->>'status', 'missing'),
+    person->>'region',
+    coalesce(person->'ai_analysis', '{}'::jsonb),
+    (person->>'face_encoding')::vector(128),
+    (person->>'embedding')::vector(1536)
+  )
+  returning id into new_id;
+
+  insert into search_status (person_id, status, last_updated, cameras_searched, matches_found)
+  values (new_id, 'searching', now(), 0, 0);
+
+  return new_id;
+end;
+$$;
+
+create or replace function record_match(target_person_id bigint, match jsonb)
+returns bigint
+language plpgsql
+as $$
+declare
+  result_id bigint;
+begin
+  update missing_persons set status = 'found' where id = target_person_id;
+  update search_status set status = 'found', last_updated = now() where person_id = target_person_id;
+
+  insert into search_results (person_id, camera_id, location, confidence, timestamp, match_data)
+  values (
+    target_person_id,
+    match->>'camera_id',
+    match->>'location',
+    (match->>'confidence')::float,
+    coalesce((match->>'timestamp')::timestamptz, now()),
+    match
+  )
+  returning id into result_id;
+
+  return result_id;
+end;
+$$;
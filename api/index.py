@@ -19,8 +19,10 @@ for path in [root_dir, backend_dir]:
 from mangum import Mangum
 from backend.main import app
 
-# Create handler for Vercel serverless
-handler = Mangum(app, lifespan="off")
+# Create handler for Vercel serverless; lifespan="auto" runs the app's shutdown flush when the
+# platform delivers lifespan events. Startup warm-up is off here unless WARMUP_ON_STARTUP=true;
+# schedule POST /api/system/warmup as a keep-warm ping instead
+handler = Mangum(app, lifespan="auto")
 
 # Required export for Vercel
 def main(request, context):
@@ -0,0 +1,148 @@
+import os
+import hmac
+import math
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+from .resilience import TokenBucket
+
+# (method, path prefix, class); first match wins. Everything else is admitted untouched
+ENDPOINT_CLASSES: List[Tuple[str, str, str]] = [
+    ("POST", "/api/report-missing", "intake"),
+    ("POST", "/api/citizen-report", "sighting"),
+    ("POST", "/api/age-progression", "generation"),
+    ("POST", "/api/ai/", "generation"),
+    ("POST", "/api/face-search", "search"),
+    ("POST", "/api/semantic-search", "search"),
+    ("POST", "/api/search-cctv", "search"),
+]
+# class -> (max in flight, requests per minute per client, burst per client)
+CLASS_DEFAULTS: Dict[str, Tuple[int, float, int]] = {
+    "intake": (8, 6, 5),
+    "sighting": (16, 20, 10),
+    "generation": (8, 20, 10),
+    "search": (16, 60, 20),
+}
+
+
+class EndpointClass:
+    """In-flight cap shared by every client, plus the per-client token bucket parameters"""
+    def __init__(self, name: str, max_inflight: int, rate_per_minute: float, burst: int):
+        self.name = name
+        self.max_inflight = max_inflight
+        self.rate_per_minute = rate_per_minute
+        self.burst = burst
+        self.inflight = 0
+
+    @classmethod
+    def from_env(cls, name: str) -> "EndpointClass":
+        max_inflight, rate, burst = CLASS_DEFAULTS[name]
+        prefix = f"ADMISSION_{name.upper()}"
+        return cls(
+            name,
+            max_inflight=int(os.getenv(f"{prefix}_CONCURRENCY", str(max_inflight))),
+            rate_per_minute=float(os.getenv(f"{prefix}_RATE_PER_MINUTE", str(rate))),
+            burst=int(os.getenv(f"{prefix}_BURST", str(burst))),
+        )
+
+
+class AdmissionController:
+    """
+    Admission for the heavy upload/AI endpoints, decided before the request body is read: a request is
+    refused (429 + Retry-After) when its class already has `max_inflight` requests running, or when its
+    client (API key, else IP) has spent its token bucket. Refusing early keeps admitted requests' latency
+    flat under overload instead of letting every request slow down together. Limits of 0 disable a check.
+    """
+    def __init__(self, classes: Dict[str, EndpointClass], enabled: bool = True, trust_forwarded: bool = False,
+                 max_clients: int = 10000, api_keys: Iterable[str] = ()):
+        self.classes = classes
+        self.enabled = enabled
+        self.trust_forwarded = trust_forwarded
+        # Only issued keys get their own bucket; anything else a client sends is ignored
+        self._api_keys = [key.encode() for key in api_keys if key]
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[Tuple[str, str], TokenBucket]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats_counters = {"admitted": 0, "rejected_concurrency": 0, "rejected_rate": 0}
+
+    @classmethod
+    def from_env(cls) -> "AdmissionController":
+        return cls(
+            {name: EndpointClass.from_env(name) for name in CLASS_DEFAULTS},
+            enabled=os.getenv("ADMISSION_ENABLED", "true").lower() == "true",
+            trust_forwarded=os.getenv("ADMISSION_TRUST_FORWARDED", "false").lower() == "true",
+            max_clients=int(os.getenv("ADMISSION_MAX_CLIENTS", "10000")),
+            api_keys=[key.strip() for key in os.getenv("ADMISSION_API_KEYS", "").split(",")],
+        )
+
+    def classify(self, method: str, path: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        for class_method, prefix, name in ENDPOINT_CLASSES:
+            if method == class_method and path.startswith(prefix):
+                return name
+        return None
+
+    def _known_key(self, api_key: str) -> bool:
+        candidate = api_key.encode()
+        # Compare against every key so the time taken does not reveal which one (or how much) matched
+        return any([hmac.compare_digest(candidate, key) for key in self._api_keys])
+
+    def client_key(self, headers, client_host: Optional[str]) -> str:
+        """A configured API key (hashed, never kept in memory as-is) when sent, else the client IP.
+        Unknown keys fall back to the IP, so rotating made-up keys cannot buy fresh buckets"""
+        api_key = headers.get("x-api-key")
+        if api_key and self._known_key(api_key):
+            return "key:" + hashlib.sha256(api_key.encode()).hexdigest()[:16]
+        if self.trust_forwarded and headers.get("x-forwarded-for"):
+            return "ip:" + headers["x-forwarded-for"].split(",")[0].strip()
+        return f"ip:{client_host or 'unknown'}"
+
+    def _bucket(self, endpoint_class: EndpointClass, client: str) -> TokenBucket:
+        key = (endpoint_class.name, client)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(endpoint_class.rate_per_minute / 60.0, endpoint_class.burst)
+            self._buckets[key] = bucket
+            # Evicting the least recently seen client only forgets a (mostly refilled) bucket
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def admit(self, name: str, client: str) -> Optional[Tuple[str, int]]:
+        """Take an in-flight slot and a token; returns (reason, retry_after_seconds) when refused"""
+        endpoint_class = self.classes[name]
+        with self._lock:
+            if endpoint_class.max_inflight and endpoint_class.inflight >= endpoint_class.max_inflight:
+                self.stats_counters["rejected_concurrency"] += 1
+                return "concurrency", 1
+            if endpoint_class.rate_per_minute > 0:
+                bucket = self._bucket(endpoint_class, client)
+                if not bucket.try_acquire():
+                    self.stats_counters["rejected_rate"] += 1
+                    return "rate", max(1, math.ceil(bucket.time_until_available()))
+            endpoint_class.inflight += 1
+            self.stats_counters["admitted"] += 1
+        return None
+
+    def release(self, name: str):
+        with self._lock:
+            self.classes[name].inflight -= 1
+
+    def inflight(self) -> Dict[Tuple[str, ...], float]:
+        with self._lock:
+            return {(name,): c.inflight for name, c in self.classes.items()}
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "classes": {name: {"inflight": c.inflight, "max_inflight": c.max_inflight,
+                                   "rate_per_minute": c.rate_per_minute, "burst": c.burst}
+                            for name, c in self.classes.items()},
+                "tracked_clients": len(self._buckets),
+                **self.stats_counters,
+            }
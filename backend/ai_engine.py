@@ -1,41 +1,87 @@
-try:
-    import cv2
-    OPENCV_AVAILABLE = True
-except ImportError:
-    OPENCV_AVAILABLE = False
 import numpy as np
 import os
+import asyncio
 import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-import openai
-from typing import List, Dict
-import base64
+from typing import AsyncIterator, Dict, Iterator, List, Optional
 import hashlib
-try:
-    import mediapipe as mp
-    MEDIAPIPE_AVAILABLE = True
-except ImportError:
-    MEDIAPIPE_AVAILABLE = False
-import aiofiles
+from .face_pipeline import FacePipeline, FACE_MISMATCH_THRESHOLD
+from .lazy import optional_import
 from .logger import logger
+from .metrics import timed_stage, face_verdicts
+from .progression_cache import ProgressionCache, photo_digest
+from .tracing import traced
+
+async def iterate_in_thread(iterator: Iterator) -> AsyncIterator:
+    """Drive a blocking iterator (e.g. an SDK token stream) from a worker thread"""
+    sentinel = object()
+    while True:
+        item = await asyncio.to_thread(next, iterator, sentinel)
+        if item is sentinel:
+            break
+        yield item
+
+# Age-progression scenarios and the factors every variant accounts for (fixed, so built once)
+PROGRESSION_SCENARIOS = [
+    {"condition": "well_cared", "description": "Well-nourished and cared for"},
+    {"condition": "street_life", "description": "Signs of malnutrition and street life"},
+    {"condition": "different_haircut", "description": "Different hairstyle or hair length"},
+    {"condition": "weight_change", "description": "Weight gain or loss"},
+]
+AGING_FACTORS = [
+    "Facial bone structure development",
+    "Weight changes due to nutrition",
+    "Hair growth and styling changes",
+    "Skin condition changes",
+    "Trauma-related facial changes"
+]
+
+_haar_local = threading.local()
+
+def _face_cascade(cv2):
+    """Haar cascade loaded once per thread (CascadeClassifier is not safe to share across threads)"""
+    cascade = getattr(_haar_local, "cascade", None)
+    if cascade is None:
+        cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+        _haar_local.cascade = cascade
+    return cascade
 
 class GaitAnalyzer:
     def __init__(self):
-        # Fallback to simulation if mediapipe solutions are missing
-        self.mp_active = False
-        if MEDIAPIPE_AVAILABLE:
-            try:
-                if hasattr(mp, 'solutions') and hasattr(mp.solutions, 'pose'):
-                    self.mp_pose = mp.solutions.pose
-                    self.pose = self.mp_pose.Pose(static_image_mode=True, min_detection_confidence=0.5)
-                    self.mp_active = True
-            except:
-                pass
+        # The MediaPipe Pose graph is built on first use, not at import/startup
+        self._pose = None
+        self._pose_loaded = False
+        self._pose_lock = threading.Lock()
+
+    @property
+    def pose(self):
+        """MediaPipe Pose graph, or None (simulation) if mediapipe solutions are missing"""
+        if not self._pose_loaded:
+            with self._pose_lock:
+                if not self._pose_loaded:
+                    mp = optional_import("mediapipe")
+                    try:
+                        if mp is not None and hasattr(mp, 'solutions') and hasattr(mp.solutions, 'pose'):
+                            self._pose = mp.solutions.pose.Pose(static_image_mode=True, min_detection_confidence=0.5)
+                    except Exception as e:
+                        logger.warning("MediaPipe Pose unavailable", error=str(e))
+                    self._pose_loaded = True
+        return self._pose
 
+    @property
+    def mp_active(self) -> bool:
+        return self.pose is not None
+
+    @timed_stage("mediapipe_pose")
+    @traced("GaitAnalyzer.extract_gait_signature")
     def extract_gait_signature(self, image_path: str) -> Dict:
         """Extract skeletal landmarks or simulate if mediapipe is unavailable"""
         try:
-            if self.mp_active and OPENCV_AVAILABLE:
+            cv2 = optional_import("cv2")
+            results = None
+            if cv2 is not None and self.mp_active:
                 image = cv2.imread(image_path)
                 if image is not None:
                     image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
@@ -45,7 +91,7 @@ class GaitAnalyzer:
                         pass
             
             # Extract specific landmarks relevant to gait/posture (shoulders, hips, knees, ankles)
-            if self.mp_active and results.pose_landmarks:
+            if results is not None and results.pose_landmarks:
                 landmarks = []
                 for lm in results.pose_landmarks.landmark:
                     landmarks.append([lm.x, lm.y, lm.z, lm.visibility])
@@ -84,6 +130,13 @@ class AIEngine:
         
         # Initialize gait analysis
         self.gait_analyzer = GaitAnalyzer()
+
+        # Local face embeddings (YuNet + SFace); remote vision is only needed to confirm candidates
+        self.face_pipeline = FacePipeline()
+
+        # Age-progression variants of a batch are generated in parallel (threads start on first use)
+        self.progression_pool = ThreadPoolExecutor(max_workers=int(os.getenv("PROGRESSION_WORKERS", "4")),
+                                                   thread_name_prefix="dhund-progression")
         
         # Mock CCTV camera locations
         self.mock_cameras = [
@@ -92,95 +145,210 @@ class AIEngine:
             {"id": "CAM_DEL_CONNAUGHT_001", "location": "Connaught Place, Delhi", "lat": 28.6315, "lng": 77.2167},
             {"id": "CAM_BLR_MAJESTIC_001", "location": "Majestic Bus Stand, Bangalore", "lat": 12.9762, "lng": 77.5993},
         ]
+
+    def warm_up(self):
+        """Load the vision stack ahead of the first request (OpenCV + Haar cascade, face models, MediaPipe Pose graph)"""
+        cv2 = optional_import("cv2")
+        if cv2 is not None:
+            _face_cascade(cv2)
+        self.face_pipeline.warm_up()
+        self.gait_analyzer.pose
     
+    @traced("AIEngine.analyze_missing_person")
     async def analyze_missing_person(self, photo_path: str, age: int, description: str) -> Dict:
         """Analyze missing person using Multi-Modal AI (OpenCV + GPT-4o)"""
         try:
-            faces = []
             # 1. Face Detection with OpenCV (if available)
-            if OPENCV_AVAILABLE:
-                image = cv2.imread(photo_path)
-                if image is not None:
-                    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-                    face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-                    faces = face_cascade.detectMultiScale(gray, 1.1, 4)
+            faces = self._detect_faces(photo_path)
+            face_encoding = self.face_pipeline.encode(photo_path)
             
             # 2. Gait/Posture Analysis (Landmark Extraction)
             gait_data = self.gait_analyzer.extract_gait_signature(photo_path)
 
             # 3. Generate Privacy Identity Signature (Deterministic hash of visual components)
-            # In a real system, this would be a feature vector hash
-            with open(photo_path, "rb") as f:
-                photo_bytes = f.read()
-            identity_signature = hashlib.sha256(photo_bytes).hexdigest()
+            identity_signature = self._identity_signature(photo_path)
             
             # 4. Generate AI insights (Actual GPT-4o Vision call)
             # This is the "Intelligence Matrix" in action
             analysis_result = self.openai_service.analyze_missing_person_image(photo_path, age, description)
             analysis = analysis_result.get('analysis', "Multi-modal analysis pending.")
             
-            return {
-                "facial_features_detected": len(faces) > 0,
-                "multi_modal_active": True,
-                "identity_signature": identity_signature,
-                "face_encoding": [0.0] * 128, # Placeholder
-                "gait_analysis": gait_data,
-                "ai_insights": analysis,
-                "predicted_locations": self._predict_likely_locations(age, description),
-                "risk_assessment": self._assess_risk_factors(age, description),
-                "search_priority": "CRITICAL" if age < 12 else "HIGH",
-                "model": "gpt-4o-vision-master"
-            }
+            return self._compose_analysis(faces, gait_data, identity_signature, analysis, age, description, face_encoding)
         except Exception as e:
             logger.error("Analysis failed", error=str(e))
             return {"error": f"Analysis failed: {str(e)}"}
+
+    async def analyze_missing_person_stream(self, photo_path: str, age: int, description: str) -> AsyncIterator[Dict]:
+        """Same pipeline as analyze_missing_person, yielding each stage result and LLM tokens as they finish"""
+        try:
+            faces = await asyncio.to_thread(self._detect_faces, photo_path)
+            yield {"event": "face_detection", "data": {"faces_detected": len(faces), "facial_features_detected": len(faces) > 0}}
+
+            face_encoding = await asyncio.to_thread(self.face_pipeline.encode, photo_path)
+            yield {"event": "face_embedding", "data": {"face_encoded": face_encoding is not None}}
+
+            gait_data = await asyncio.to_thread(self.gait_analyzer.extract_gait_signature, photo_path)
+            yield {"event": "gait_analysis", "data": gait_data}
+
+            identity_signature = await asyncio.to_thread(self._identity_signature, photo_path)
+            yield {"event": "identity_signature", "data": {"identity_signature": identity_signature}}
+
+            tokens = []
+            stream = self.openai_service.stream_missing_person_analysis(photo_path, age, description)
+            async for token in iterate_in_thread(stream):
+                tokens.append(token)
+                yield {"event": "llm_token", "data": {"token": token}}
+
+            analysis = "".join(tokens) or "Multi-modal analysis pending."
+            yield {"event": "analysis", "data": self._compose_analysis(faces, gait_data, identity_signature, analysis,
+                                                                       age, description, face_encoding)}
+        except Exception as e:
+            logger.error("Streaming analysis failed", error=str(e))
+            yield {"event": "error", "data": {"error": f"Analysis failed: {str(e)}"}}
+
+    @timed_stage("haar_detection")
+    @traced("AIEngine._detect_faces")
+    def _detect_faces(self, photo_path: str):
+        """Haar cascade face detection (empty when OpenCV is unavailable)"""
+        cv2 = optional_import("cv2")
+        if cv2 is None:
+            return []
+        image = cv2.imread(photo_path)
+        if image is None:
+            return []
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        return _face_cascade(cv2).detectMultiScale(gray, 1.1, 4)
+
+    @timed_stage("hashing")
+    @traced("AIEngine._identity_signature")
+    def _identity_signature(self, photo_path: str) -> str:
+        """Deterministic hash of the photo bytes; in a real system this would be a feature vector hash"""
+        with open(photo_path, "rb") as f:
+            photo_bytes = f.read()
+        return hashlib.sha256(photo_bytes).hexdigest()
+
+    def _compose_analysis(self, faces, gait_data: Dict, identity_signature: str, analysis: str,
+                          age: int, description: str, face_encoding: Optional[np.ndarray] = None) -> Dict:
+        return {
+            "facial_features_detected": len(faces) > 0 or face_encoding is not None,
+            "multi_modal_active": True,
+            "identity_signature": identity_signature,
+            "face_encoding": face_encoding.tolist() if face_encoding is not None else None,
+            "gait_analysis": gait_data,
+            "ai_insights": analysis,
+            "predicted_locations": self._predict_likely_locations(age, description),
+            "risk_assessment": self._assess_risk_factors(age, description),
+            "search_priority": "CRITICAL" if age < 12 else "HIGH",
+            "model": "gpt-4o-vision-master"
+        }
     
-    def generate_age_progression(self, photo_path: str, current_age: int, target_age: int) -> Dict:
-        """Generate age progression variations"""
+    @traced("AIEngine.generate_age_progression")
+    def generate_age_progression(self, photo_path: str, current_age: int, target_age: int,
+                                 cache: Optional[ProgressionCache] = None, photo_hash: Optional[str] = None) -> Dict:
+        """Generate age progression variations (each scenario served from `cache` when already generated)"""
+        result = self.generate_age_progressions(photo_path, current_age, [target_age], cache=cache, photo_hash=photo_hash)
+        if "error" in result:
+            return result
+        progression = result["progressions"][0]
+        progression.pop("target_age")
+        return progression
+
+    @traced("AIEngine.generate_age_progressions")
+    def generate_age_progressions(self, photo_path: str, current_age: int, target_ages: List[int],
+                                  scenarios: Optional[List[str]] = None, cache: Optional[ProgressionCache] = None,
+                                  photo_hash: Optional[str] = None) -> Dict:
+        """
+        Every (target age, scenario) variant of one photo in one pass: the photo is hashed, decoded and
+        its face located once, cached variants are reused and the rest are generated on the worker pool.
+        """
         try:
-            # In a real implementation, this would use advanced GANs
-            # For demo, we'll simulate with descriptions and variations
-            
-            age_difference = target_age - current_age
-            
-            variations = []
-            
-            # Generate different scenarios
-            scenarios = [
-                {"condition": "well_cared", "description": "Well-nourished and cared for"},
-                {"condition": "street_life", "description": "Signs of malnutrition and street life"},
-                {"condition": "different_haircut", "description": "Different hairstyle or hair length"},
-                {"condition": "weight_change", "description": "Weight gain or loss"},
-            ]
-            
-            for scenario in scenarios:
-                # In real implementation, this would generate actual images
-                # Using placeholders for demo to avoid 404s
-                placeholder_text = f"Age {target_age}: {scenario['condition']}".replace("_", "+")
-                variation = {
-                    "scenario": scenario["condition"],
-                    "description": f"Age {target_age}, {scenario['description']}",
-                    "confidence": np.random.uniform(0.8, 0.95),
-                    "image_path": f"https://placehold.co/600x400/000000/FFFFFF?text={placeholder_text}"
-                }
-                variations.append(variation)
-            
+            selected = [s for s in PROGRESSION_SCENARIOS if not scenarios or s["condition"] in scenarios]
+            if cache is not None and photo_hash is None and os.path.exists(photo_path):
+                photo_hash = photo_digest(photo_path)
+            variations = {age: [None] * len(selected) for age in target_ages}
+            cached = {age: 0 for age in target_ages}
+            pending = []
+            for age in target_ages:
+                for index, scenario in enumerate(selected):
+                    key = cache.key(photo_hash, current_age, age, scenario["condition"]) if photo_hash else None
+                    variation = cache.get(key) if key else None
+                    if variation is None:
+                        pending.append((age, index, scenario, key))
+                    else:
+                        variations[age][index] = variation
+                        cached[age] += 1
+
+            subject = self._progression_subject(photo_path) if pending else None
+
+            def produce(age: int, scenario: Dict, key: Optional[str]) -> Dict:
+                variation = self._generate_variation(subject, current_age, age, scenario)
+                if key:
+                    cache.put(key, variation)
+                return variation
+
+            futures = [self.progression_pool.submit(produce, age, scenario, key) for age, _, scenario, key in pending]
+            for (age, index, _, _), future in zip(pending, futures):
+                variations[age][index] = future.result()
+
             return {
                 "status": "success",
-                "age_progression_generated": True,
-                "variations": variations,
-                "aging_factors_considered": [
-                    "Facial bone structure development",
-                    "Weight changes due to nutrition",
-                    "Hair growth and styling changes",
-                    "Skin condition changes",
-                    "Trauma-related facial changes"
-                ]
+                "progressions": [{"target_age": age, **self._progression_result(variations[age], cached[age])}
+                                 for age in target_ages],
+                "face_landmarks": subject["landmarks"] if subject else None,
+                "generated_variations": len(pending),
+                "cached_variations": sum(cached.values())
             }
             
         except Exception as e:
             return {"error": f"Age progression failed: {str(e)}"}
+
+    def _progression_subject(self, photo_path: str) -> Dict:
+        """Decode the photo and locate the face once; every variant of a batch is generated from this"""
+        cv2 = optional_import("cv2")
+        image = cv2.imread(photo_path) if cv2 is not None else None
+        face = self.face_pipeline.detect(image)
+        return {
+            "photo_path": photo_path,
+            "image": image,
+            # Eyes, nose tip and mouth corners anchor the aging warp
+            "landmarks": face[4:14].reshape(5, 2).round(1).tolist() if face is not None else None
+        }
+
+    def cached_age_progression(self, photo_hash: str, current_age: int, target_age: int,
+                               cache: ProgressionCache) -> Optional[Dict]:
+        """The full progression when every scenario is already cached (no photo needed), else None"""
+        variations = []
+        for scenario in PROGRESSION_SCENARIOS:
+            key = cache.key(photo_hash, current_age, target_age, scenario["condition"])
+            if cache.get(key, record=False) is None:
+                return None
+        for scenario in PROGRESSION_SCENARIOS:
+            variations.append(cache.get(cache.key(photo_hash, current_age, target_age, scenario["condition"])))
+        return self._progression_result(variations, len(variations))
+
+    @staticmethod
+    def _progression_result(variations: List[Dict], cached: int) -> Dict:
+        return {
+            "status": "success",
+            "age_progression_generated": True,
+            "variations": variations,
+            "cached_variations": cached,
+            "aging_factors_considered": list(AGING_FACTORS)
+        }
+
+    def _generate_variation(self, subject: Dict, current_age: int, target_age: int, scenario: Dict) -> Dict:
+        """One progressed variant of a decoded photo (see _progression_subject) for a scenario"""
+        # In a real implementation, this would use advanced GANs and generate actual images
+        # Using placeholders for demo to avoid 404s
+        placeholder_text = f"Age {target_age}: {scenario['condition']}".replace("_", "+")
+        return {
+            "scenario": scenario["condition"],
+            "description": f"Age {target_age}, {scenario['description']}",
+            "confidence": float(np.random.uniform(0.8, 0.95)),
+            "image_path": f"https://placehold.co/600x400/000000/FFFFFF?text={placeholder_text}"
+        }
     
+    @traced("AIEngine.search_cctv_network")
     def search_cctv_network(self, person_data: Dict) -> List[Dict]:
         """Simulate search across CCTV network"""
         try:
@@ -219,69 +387,158 @@ class AIEngine:
         except Exception as e:
             return [{"error": f"CCTV search failed: {str(e)}"}]
     
+    @traced("AIEngine.verify_citizen_sighting")
     async def verify_citizen_sighting(self, target_image_path: str, sighting_photo_path: str, 
-                                location: str, description: str) -> Dict:
+                                location: str, description: str, target_face: Optional[np.ndarray] = None,
+                                sighting_face: Optional[np.ndarray] = None) -> Dict:
         """Verify report with Dynamic Bayesian Weighting and Side-by-Side Vision"""
         try:
             # 1. Image Quality Assessment for Dynamic Weighting
-            is_low_res = True # Default to conservative
-            if OPENCV_AVAILABLE:
-                image = cv2.imread(sighting_photo_path)
-                if image is not None:
-                    height, width = image.shape[:2]
-                    is_low_res = width < 400 or height < 400
-            
-            # 2. Multi-Modal Vision Analysis (Side-by-Side Comparison)
-            verification_result = self.openai_service.verify_citizen_sighting(
-                sighting_photo_path, 
-                target_image_path,
-                "Target Profile",
-                location,
-                description
-            )
+            is_low_res = self._is_low_resolution(sighting_photo_path)
+
+            # 2. Local face comparison (milliseconds); a clear mismatch skips the remote vision call
+            face = self._compare_faces(target_image_path, sighting_photo_path, target_face, is_low_res, sighting_face)
             
-            vision_confidence = verification_result.get('confidence', 0)
-            vision_analysis = verification_result.get('analysis', "")
+            # 3. Multi-Modal Vision Analysis (Side-by-Side Comparison); off the event loop so several
+            # verifications (open-case screening) can wait on the vision model concurrently
+            if face["remote_vision_skipped"]:
+                vision_confidence, vision_analysis = self._local_face_rejection(face)
+            else:
+                verification_result = await asyncio.to_thread(
+                    self.openai_service.verify_citizen_sighting,
+                    sighting_photo_path, 
+                    target_image_path,
+                    "Target Profile",
+                    location,
+                    description
+                )
+                
+                vision_confidence = verification_result.get('confidence', 0)
+                vision_analysis = verification_result.get('analysis', "")
 
             # 3. Enhanced Gait/Posture Analysis
             gait_data = self.gait_analyzer.extract_gait_signature(sighting_photo_path)
-            gait_score = gait_data.get('posture_score', 0) if gait_data.get('status') == 'success' else 50
 
             # 4. Contextual & Geo-Distance Score
             # In a real system, we'd compare coordinates. Here we simulate advanced proximity.
             location_score = self._verify_location_plausibility(location)
             
-            # --- DYNAMIC WEIGHTING ENGINE ---
-            if is_low_res:
-                # LOW RESOLUTION: Shift weight to Gait and Context
-                weights = {"vision": 0.4, "gait": 0.35, "context": 0.25}
-                logger.info("LOW_RES DETECTED: Activating Gait-Dominant Weighting")
-            else:
-                # HIGH RESOLUTION: Vision-Dominant
-                weights = {"vision": 0.6, "gait": 0.2, "context": 0.2}
-
-            final_confidence = (
-                vision_confidence * weights["vision"] + 
-                gait_score * weights["gait"] + 
-                location_score * weights["context"]
-            )
-            
-            return {
-                "verified": final_confidence > 75,
-                "confidence": round(final_confidence, 1),
-                "dynamic_weights": weights,
-                "resolution_profile": "LOW_RES" if is_low_res else "HIGH_RES",
-                "breakdown": {
-                    "vision_matrix": round(vision_confidence, 1),
-                    "gait_signature": round(gait_score, 1),
-                    "contextual_plausibility": location_score
-                },
-                "ai_analysis": vision_analysis,
-                "status": "VERIFIED" if final_confidence > 82 else ("PROBABLE" if final_confidence > 70 else "UNVERIFIED")
-            }
+            return self._weigh_verification(is_low_res, vision_confidence, vision_analysis, gait_data, location_score, face)
         except Exception as e:
             logger.error("Advanced Verification failed", error=str(e))
             return {"verified": False, "confidence": 0.0, "error": str(e)}
+
+    async def verify_citizen_sighting_stream(self, target_image_path: str, sighting_photo_path: str,
+                                             location: str, description: str,
+                                             target_face: Optional[np.ndarray] = None) -> AsyncIterator[Dict]:
+        """Streaming verification: cheap local stages first, then vision tokens, then the weighted verdict"""
+        try:
+            is_low_res = await asyncio.to_thread(self._is_low_resolution, sighting_photo_path)
+            yield {"event": "image_quality", "data": {"resolution_profile": "LOW_RES" if is_low_res else "HIGH_RES"}}
+
+            face = await asyncio.to_thread(self._compare_faces, target_image_path, sighting_photo_path,
+                                           target_face, is_low_res)
+            yield {"event": "face_match", "data": {key: face[key] for key in
+                                                   ("face_similarity", "face_verdict", "remote_vision_skipped")}}
+
+            gait_data = await asyncio.to_thread(self.gait_analyzer.extract_gait_signature, sighting_photo_path)
+            yield {"event": "gait_analysis", "data": gait_data}
+
+            location_score = self._verify_location_plausibility(location)
+            yield {"event": "location_plausibility", "data": {"contextual_plausibility": location_score}}
+
+            if face["remote_vision_skipped"]:
+                vision_confidence, vision_analysis = self._local_face_rejection(face)
+            else:
+                tokens = []
+                stream = self.openai_service.stream_citizen_sighting_verification(
+                    sighting_photo_path, target_image_path, "Target Profile", location, description
+                )
+                async for token in iterate_in_thread(stream):
+                    tokens.append(token)
+                    yield {"event": "llm_token", "data": {"token": token}}
+
+                vision_analysis = "".join(tokens)
+                vision_confidence = self.openai_service.parse_confidence(vision_analysis)
+            yield {"event": "verification", "data": self._weigh_verification(
+                is_low_res, vision_confidence, vision_analysis, gait_data, location_score, face
+            )}
+        except Exception as e:
+            logger.error("Streaming verification failed", error=str(e))
+            yield {"event": "error", "data": {"verified": False, "confidence": 0.0, "error": str(e)}}
+
+    def _compare_faces(self, target_image_path: str, sighting_photo_path: str,
+                       target_face: Optional[np.ndarray], is_low_res: bool,
+                       sighting_face: Optional[np.ndarray] = None) -> Dict:
+        """Sighting face vs the case's stored encoding (or its photo); clear mismatches on usable
+        photos are settled locally instead of by the remote vision model"""
+        if sighting_face is None:
+            sighting_face = self.face_pipeline.encode(sighting_photo_path)
+        if target_face is None and sighting_face is not None:
+            target_face = self.face_pipeline.encode(target_image_path)
+        face = FacePipeline.compare(target_face, sighting_face)
+        face["remote_vision_skipped"] = face["face_verdict"] == "mismatch" and not is_low_res
+        face["sighting_face"] = sighting_face
+        face_verdicts.inc(verdict=face["face_verdict"],
+                          remote_vision="skipped" if face["remote_vision_skipped"] else "called")
+        return face
+
+    def _local_face_rejection(self, face: Dict):
+        similarity = face["face_similarity"]
+        analysis = (f"LOCAL_FACE_MISMATCH: face similarity {similarity:.2f} is below {FACE_MISMATCH_THRESHOLD:.2f}; "
+                    "remote vision comparison skipped.")
+        return max(similarity, 0.0) * 100, analysis
+
+    def _is_low_resolution(self, photo_path: str) -> bool:
+        is_low_res = True # Default to conservative
+        cv2 = optional_import("cv2")
+        if cv2 is not None:
+            image = cv2.imread(photo_path)
+            if image is not None:
+                height, width = image.shape[:2]
+                is_low_res = width < 400 or height < 400
+        return is_low_res
+
+    def _weigh_verification(self, is_low_res: bool, vision_confidence: float, vision_analysis: str,
+                            gait_data: Dict, location_score: float, face: Optional[Dict] = None) -> Dict:
+        gait_score = gait_data.get('posture_score', 0) if gait_data.get('status') == 'success' else 50
+
+        # --- DYNAMIC WEIGHTING ENGINE ---
+        if is_low_res:
+            # LOW RESOLUTION: Shift weight to Gait and Context
+            weights = {"vision": 0.4, "gait": 0.35, "context": 0.25}
+            logger.info("LOW_RES DETECTED: Activating Gait-Dominant Weighting")
+        else:
+            # HIGH RESOLUTION: Vision-Dominant
+            weights = {"vision": 0.6, "gait": 0.2, "context": 0.2}
+
+        final_confidence = (
+            vision_confidence * weights["vision"] + 
+            gait_score * weights["gait"] + 
+            location_score * weights["context"]
+        )
+        
+        result = {
+            "verified": final_confidence > 75,
+            "confidence": round(final_confidence, 1),
+            "dynamic_weights": weights,
+            "resolution_profile": "LOW_RES" if is_low_res else "HIGH_RES",
+            "breakdown": {
+                "vision_matrix": round(vision_confidence, 1),
+                "gait_signature": round(gait_score, 1),
+                "contextual_plausibility": location_score
+            },
+            "ai_analysis": vision_analysis,
+            "status": "VERIFIED" if final_confidence > 82 else ("PROBABLE" if final_confidence > 70 else "UNVERIFIED")
+        }
+        if face:
+            result["breakdown"]["face_similarity"] = face["face_similarity"]
+            result["face_verdict"] = face["face_verdict"]
+            result["remote_vision_skipped"] = face["remote_vision_skipped"]
+            # Persisted with the report, then dropped from the response (see _persist_citizen_report)
+            sighting_face = face.get("sighting_face")
+            result["face_encoding"] = sighting_face.tolist() if sighting_face is not None else None
+        return result
     
     def _generate_ai_analysis(self, photo_path: str, age: int, description: str) -> str:
         """Generate Trauma-Informed AI insights using Grok"""
@@ -358,6 +615,15 @@ class AIEngine:
             
         return max(30.0, min(score, 98.0))
     
+    def case_location_plausibility(self, location: str, case: Dict) -> float:
+        """Location plausibility of a sighting for one specific case: the general geo score, raised when the
+        sighting is inside the case's region and lowered when it is clearly elsewhere"""
+        score = self._verify_location_plausibility(location)
+        region = (case.get('region') or "").strip().lower()
+        if region:
+            score = score + 10.0 if region in location.lower() else score * 0.6
+        return max(0.0, min(score, 98.0))
+
     def _analyze_description_consistency(self, description: str) -> float:
         """Analyze consistency of description"""
         # Simple analysis for demo
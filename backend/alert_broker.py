@@ -0,0 +1,207 @@
+import os
+import json
+import time
+import asyncio
+import threading
+from typing import Callable, Dict, List, Optional, Set
+from .logger import logger
+
+
+class AlertSubscription:
+    """A single dashboard connection; receives batches of alerts matching its filters"""
+    def __init__(self, person_id: Optional[int], region: Optional[str], max_queue: int):
+        self.person_id = person_id
+        self.region = region.lower() if region else None
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.dropped = False
+
+    def matches(self, alert: Dict) -> bool:
+        if self.person_id is not None and alert.get("person_id") != self.person_id:
+            return False
+        if self.region and self.region not in str(alert.get("location", "")).lower():
+            return False
+        return True
+
+    async def next_batch(self, timeout: Optional[float] = None) -> Optional[List[Dict]]:
+        """Next batch of alerts; None when the subscription was dropped, [] on timeout"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return []
+
+
+class AlertBroker:
+    """In-process alert fan-out: batches alerts into short windows, pushes them to
+    subscribers and persists each batch to the alerts table off the request path"""
+    def __init__(self, persist: Callable[[str, List[Dict]], None], batch_window: float = 0.1,
+                 max_queue: int = 64, persist_retries: int = 2, retry_backoff: float = 0.2):
+        self.persist = persist
+        self.batch_window = batch_window
+        self.max_queue = max_queue
+        self.persist_retries = persist_retries
+        self.retry_backoff = retry_backoff
+        # Batches being written on worker threads; shutdown waits for them before the process exits
+        self._persisting = 0
+        self._persist_idle = threading.Condition()
+        self._pending: List[Dict] = []
+        self._pending_lock = threading.Lock()
+        self._subscribers: Set[AlertSubscription] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self.stats_counters = {"published": 0, "delivered_batches": 0, "dropped_subscribers": 0,
+                               "persisted": 0, "persist_retries": 0, "persist_failures": 0}
+
+    @classmethod
+    def from_env(cls, persist: Callable[[str, List[Dict]], None]) -> "AlertBroker":
+        return cls(
+            persist,
+            batch_window=float(os.getenv("ALERT_BATCH_WINDOW_MS", "100")) / 1000.0,
+            max_queue=int(os.getenv("ALERT_SUBSCRIBER_QUEUE", "64")),
+            persist_retries=int(os.getenv("ALERT_PERSIST_RETRIES", "2")),
+            retry_backoff=float(os.getenv("ALERT_PERSIST_RETRY_BACKOFF_MS", "200")) / 1000.0,
+        )
+
+    def _ensure_started(self):
+        """Start the flusher on the running loop (must be called from the loop thread)"""
+        loop = asyncio.get_running_loop()
+        if self._flusher and not self._flusher.done() and self._loop is loop:
+            return
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+        self._flusher = self._loop.create_task(self._flush_loop())
+
+    def _signal(self):
+        self._ensure_started()
+        self._wakeup.set()
+
+    def publish(self, topic: str, payload: Dict):
+        """Queue an alert for delivery and persistence; never blocks the caller"""
+        with self._pending_lock:
+            self._pending.append({"topic": topic, **payload})
+            self.stats_counters["published"] += 1
+
+        try:
+            asyncio.get_running_loop()
+            self._signal()
+            return
+        except RuntimeError:
+            pass
+        # Called from a worker thread: hand off to the loop that owns the flusher
+        if self._loop and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._signal)
+        else:
+            threading.Thread(target=self._flush_sync, daemon=True).start()
+
+    def subscribe(self, person_id: Optional[int] = None, region: Optional[str] = None) -> AlertSubscription:
+        self._ensure_started()
+        subscription = AlertSubscription(person_id, region, self.max_queue)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: AlertSubscription):
+        self._subscribers.discard(subscription)
+
+    def _drain(self) -> List[Dict]:
+        with self._pending_lock:
+            batch, self._pending = self._pending, []
+        return batch
+
+    async def _flush_loop(self):
+        while True:
+            await self._wakeup.wait()
+            # Collect everything published within the window into one batch
+            await asyncio.sleep(self.batch_window)
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        """Deliver and persist everything pending right now"""
+        batch = self._drain()
+        if not batch:
+            return
+        self._deliver(batch)
+        await asyncio.to_thread(self._persist_batch, batch)
+
+    async def close(self, timeout: float = 5.0):
+        """Stop the batching loop, persist whatever is still pending and wait (up to `timeout`)
+        for batches already being written on worker threads (shutdown)"""
+        if self._flusher and not self._flusher.done():
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+        self._flusher = None
+        await self.flush()
+        if not await asyncio.to_thread(self._wait_persisted, timeout):
+            logger.warning("Alert persistence still running at shutdown", batches=self._persisting)
+
+    def _wait_persisted(self, timeout: float) -> bool:
+        with self._persist_idle:
+            return self._persist_idle.wait_for(lambda: self._persisting == 0, timeout)
+
+    def _flush_sync(self):
+        self._persist_batch(self._drain())
+
+    def _deliver(self, batch: List[Dict]):
+        for subscription in list(self._subscribers):
+            matching = [alert for alert in batch if subscription.matches(alert)]
+            if not matching:
+                continue
+            try:
+                subscription.queue.put_nowait(matching)
+                self.stats_counters["delivered_batches"] += 1
+            except asyncio.QueueFull:
+                # Slow consumer: cut it loose rather than buffering without bound
+                self._drop(subscription)
+
+    def _drop(self, subscription: AlertSubscription):
+        self._subscribers.discard(subscription)
+        subscription.dropped = True
+        while not subscription.queue.empty():
+            subscription.queue.get_nowait()
+        subscription.queue.put_nowait(None)
+        self.stats_counters["dropped_subscribers"] += 1
+        logger.warning("Alert subscriber dropped: consumer too slow")
+
+    def _persist_batch(self, batch: List[Dict]):
+        if not batch:
+            return
+        with self._persist_idle:
+            self._persisting += 1
+        try:
+            by_topic: Dict[str, List[Dict]] = {}
+            for alert in batch:
+                by_topic.setdefault(alert["topic"], []).append({k: v for k, v in alert.items() if k != "topic"})
+            for topic, payloads in by_topic.items():
+                self._persist_topic(topic, payloads)
+        finally:
+            with self._persist_idle:
+                self._persisting -= 1
+                self._persist_idle.notify_all()
+
+    def _persist_topic(self, topic: str, payloads: List[Dict]):
+        """Write one topic's alerts, retrying with exponential backoff before counting them as lost"""
+        for attempt in range(self.persist_retries + 1):
+            try:
+                self.persist(topic, payloads)
+                self.stats_counters["persisted"] += len(payloads)
+                return
+            except Exception as e:
+                if attempt < self.persist_retries:
+                    self.stats_counters["persist_retries"] += 1
+                    logger.warning("Alert persistence failed, retrying", topic=topic, attempt=attempt + 1, error=str(e))
+                    time.sleep(self.retry_backoff * 2 ** attempt)
+                    continue
+                self.stats_counters["persist_failures"] += len(payloads)
+                logger.error("Alert persistence failed", topic=topic, count=len(payloads), error=str(e))
+
+    def stats(self) -> Dict:
+        with self._pending_lock:
+            pending = len(self._pending)
+        return {"subscribers": len(self._subscribers), "pending": pending, **self.stats_counters}
+
+    @staticmethod
+    def encode_batch(batch: List[Dict]) -> str:
+        return json.dumps(batch, default=str)
@@ -1,19 +1,28 @@
 import os
-from supabase import create_client, Client
-from typing import Optional
+import json
+from typing import Dict, List, Optional
 import uuid
 import requests
 from .logger import logger
+from .metrics import observe_stage
+from .tracing import traced
 
 class CloudStorage:
     def __init__(self):
         self.url = os.getenv("SUPABASE_URL", "")
         self.key = os.getenv("SUPABASE_SERVICE_ROLE_KEY", "")
         self.bucket_name = "dhund-assets"
+        # Pooled keep-alive session for image downloads (reused across requests instead of per-call sockets)
+        pool_size = int(os.getenv("STORAGE_HTTP_POOL_SIZE", "10"))
+        self.http = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.http.mount("http://", adapter)
+        self.http.mount("https://", adapter)
         
         if self.url and self.key:
             try:
-                self.supabase: Client = create_client(self.url, self.key)
+                from supabase import create_client
+                self.supabase = create_client(self.url, self.key)
                 logger.info("Supabase storage client initialized.")
             except Exception as e:
                 self.supabase = None
@@ -22,6 +31,7 @@ class CloudStorage:
             self.supabase = None
             logger.warning("Supabase credentials missing. Cloud storage disabled.")
 
+    @traced("CloudStorage.upload_image")
     def upload_image(self, file_path: str, folder: str = "uploads") -> Optional[str]:
         """Uploads a local file to Supabase Storage and returns the public URL."""
         if not self.supabase:
@@ -36,7 +46,7 @@ class CloudStorage:
             file_ext = os.path.splitext(file_path)[1]
             file_name = f"{folder}/{uuid.uuid4()}{file_ext}"
             
-            with open(file_path, 'rb') as f:
+            with open(file_path, 'rb') as f, observe_stage("storage.upload"):
                 self.supabase.storage.from_(self.bucket_name).upload(
                     path=file_name,
                     file=f,
@@ -51,11 +61,13 @@ class CloudStorage:
             logger.error("Cloud upload failed", error=str(e))
             return None
 
+    @traced("CloudStorage.download_image")
     def download_image(self, url: str, local_path: str) -> bool:
         """Download an image from a URL (cloud or HTTP) to local path"""
         try:
-            response = requests.get(url, timeout=30)
-            response.raise_for_status()
+            with observe_stage("storage.download"):
+                response = self.http.get(url, timeout=30)
+                response.raise_for_status()
             
             os.makedirs(os.path.dirname(local_path) if os.path.dirname(local_path) else '.', exist_ok=True)
             with open(local_path, 'wb') as f:
@@ -65,13 +77,43 @@ class CloudStorage:
             logger.error("Image download failed", url=url, error=str(e))
             return False
 
+    def upload_json(self, path: str, payload: Dict) -> bool:
+        """Write (upsert) a JSON document at a fixed path in the bucket"""
+        if not self.supabase:
+            return False
+        with observe_stage("storage.upload_json"):
+            self.supabase.storage.from_(self.bucket_name).upload(
+                path=path,
+                file=json.dumps(payload).encode(),
+                file_options={"content-type": "application/json", "upsert": "true"}
+            )
+        return True
+
+    def download_json(self, path: str) -> Optional[Dict]:
+        """JSON document at a fixed path in the bucket; None when it does not exist"""
+        if not self.supabase:
+            return None
+        try:
+            with observe_stage("storage.download_json"):
+                return json.loads(self.supabase.storage.from_(self.bucket_name).download(path))
+        except Exception:
+            # Missing objects are the common case (cache misses), not an error
+            return None
+
+    def close(self):
+        self.http.close()
+
     def send_realtime_alert(self, topic: str, payload: dict):
         """Sends a real-time broadcast via Supabase table insertion."""
-        if not self.supabase:
+        self.send_realtime_alerts(topic, [payload])
+
+    @traced("CloudStorage.send_realtime_alerts")
+    def send_realtime_alerts(self, topic: str, payloads: List[dict]):
+        """Persists a batch of alerts with a single Supabase insert; raises when the insert fails
+        so the caller (the alert broker) can retry and count the failure."""
+        if not self.supabase or not payloads:
             return
-            
-        try:
-            self.supabase.table("alerts").insert(payload).execute()
-            logger.info("Real-time alert broadcasted", topic=topic)
-        except Exception as e:
-            logger.error("Real-time alert failed", error=str(e))
+
+        with observe_stage("supabase.alerts.insert"):
+            self.supabase.table("alerts").insert([{"topic": topic, **payload} for payload in payloads]).execute()
+        logger.info("Real-time alert broadcasted", topic=topic, count=len(payloads))
@@ -1,9 +1,29 @@
 import os
+import re
 import json
-from datetime import datetime
-from typing import Dict, List, Optional
-from supabase import create_client, Client
+import time
+import threading
+from datetime import datetime, timedelta
+from functools import partial
+from typing import Dict, List, Optional, Set
+from .embedding_store import EmbeddingStore
+from .face_pipeline import FACE_DIM, FACE_MATCH_THRESHOLD, FACE_MISMATCH_THRESHOLD
+from .lexical_index import LexicalIndex, reciprocal_rank_fusion
+from .models import CitizenReport, SearchFilters
 from .logger import logger
+from .metrics import observe_stage
+from .tracing import span
+
+# Case columns mirrored into the local embedding store so filtered searches can pre-select candidates
+CASE_FILTER_ATTRIBUTES = {"age": "int", "reported_date": "time", "status": "label", "region": "label"}
+# Text indexed per case: its own name/description plus location/description of its citizen reports
+LEXICAL_SOURCES = {"missing_persons": "id, name, description", "citizen_reports": "id, person_id, location, description"}
+# Multi-table writes done as one stored-procedure call (SUPABASE_SCHEMA.sql), atomic and one round trip
+ATOMIC_RPCS = {"create_missing_person", "record_match"}
+# _execute operations that change rows (bump data_version)
+WRITE_OPERATIONS = {"insert", "update", "upsert", "delete"} | ATOMIC_RPCS
+# PostgREST "function not found" (schema cache) and Postgres undefined_function
+MISSING_FUNCTION_CODES = {"PGRST202", "42883"}
 
 class Database:
     def __init__(self):
@@ -14,9 +34,59 @@ class Database:
             logger.warning("Supabase credentials missing. Database operations will fail.")
             self.supabase = None
         else:
+            from supabase import create_client
             self.supabase = create_client(self.url, self.key)
             logger.info("Supabase client initialized successfully.")
 
+        # Local memory-mapped copy of case embeddings for the semantic search fallback
+        self.embedding_store = EmbeddingStore.from_env("missing_persons", 1536, CASE_FILTER_ATTRIBUTES)
+        self.embedding_sync_interval = float(os.getenv("EMBEDDING_SYNC_INTERVAL_SECONDS", "30"))
+        # Re-read this much before the watermark: now() is the transaction's start, so a slow transaction
+        # can commit a change stamped earlier than rows an earlier sync already saw
+        self.embedding_sync_lookback = float(os.getenv("EMBEDDING_SYNC_LOOKBACK_SECONDS", "120"))
+        self._embedding_synced_at = 0.0
+        # Dedicated index of normalized case face vectors (128-d SFace) for local identity matching
+        self.face_store = EmbeddingStore.from_env("case_faces", FACE_DIM, {"status": "label"})
+        self._faces_synced_at = 0.0
+        # In-process BM25 index over case name/description and citizen report text (hybrid search)
+        self.lexical_index = LexicalIndex()
+        self._lexical_synced_at = 0.0
+        self._lexical_sync_lock = threading.Lock()
+        self.hybrid_candidate_factor = int(os.getenv("HYBRID_CANDIDATE_FACTOR", "4"))
+        # A face hit counts this many times a text hit when sightings are screened against open cases
+        self.screening_face_weight = float(os.getenv("SCREENING_FACE_WEIGHT", "2"))
+        # Bumped on every write through this instance; read caches compare it to decide when to re-query
+        self.data_version = 0
+        # Atomic RPCs found missing on this database; their writes fall back to sequential calls
+        self._missing_rpcs: Set[str] = set()
+
+    def _execute(self, table: str, operation: str, query):
+        """Execute a Supabase query builder, timed per table/operation"""
+        try:
+            with observe_stage(f"supabase.{table}.{operation}"), span(f"Database.{table}.{operation}",
+                                                                     **{"db.table": table, "db.operation": operation}):
+                return query.execute()
+        finally:
+            # Also on failure: the write may have landed even if the response was lost
+            if operation in WRITE_OPERATIONS:
+                self.data_version += 1
+
+    def _call_atomic(self, function: str, params: Dict):
+        """Run a multi-table write as one stored-procedure call; None when the function is not deployed
+        (the caller then falls back to sequential writes). Any other failure raises, with nothing written"""
+        if function in self._missing_rpcs:
+            return None
+        try:
+            return self._execute("rpc", function, self.supabase.rpc(function, params))
+        except Exception as e:
+            # postgrest-py surfaces the code either parsed or inside the raw body in `details`
+            reported = f"{getattr(e, 'code', '')} {getattr(e, 'details', '')}"
+            if not any(code in reported for code in MISSING_FUNCTION_CODES):
+                raise
+            logger.warning("Atomic RPC missing, using sequential writes (apply SUPABASE_SCHEMA.sql)", function=function)
+            self._missing_rpcs.add(function)
+            return None
+
     def save_missing_person(self, person, ai_analysis: Dict, embedding: List[float] = None) -> int:
         """Save missing person to Supabase with semantic embedding"""
         if not self.supabase:
@@ -30,22 +100,33 @@ class Database:
                 "photo_path": person.photo_path,
                 "reported_date": person.reported_date.isoformat(),
                 "ai_analysis": ai_analysis,
-                "face_encoding": ai_analysis.get('face_encoding', []),
+                "face_encoding": ai_analysis.get('face_encoding'),
                 "embedding": embedding,
                 "status": "missing"
             }
+            if getattr(person, "region", None):
+                data["region"] = person.region
             
-            response = self.supabase.table("missing_persons").insert(data).execute()
-            person_id = response.data[0]['id']
-            
-            # Initialize search status
-            self.supabase.table("search_status").insert({
-                "person_id": person_id,
-                "status": "searching",
-                "last_updated": datetime.now().isoformat(),
-                "cameras_searched": 0,
-                "matches_found": 0
-            }).execute()
+            # Case row and its search status in one transaction
+            response = self._call_atomic("create_missing_person", {"person": data})
+            if response is not None:
+                person_id = int(response.data)
+            else:
+                person_id = self._insert_missing_person_sequential(data)
+            if embedding:
+                # Write-through; the sync watermark still only advances from the database
+                try:
+                    self.embedding_store.upsert([person_id], [embedding], attributes=[{
+                        "age": person.age, "reported_date": data["reported_date"], "status": "missing",
+                        "region": data.get("region")}])
+                except Exception as e:
+                    logger.warning("Embedding store write failed", person_id=person_id, error=str(e))
+            if ai_analysis.get('face_encoding'):
+                try:
+                    self.face_store.upsert([person_id], [ai_analysis['face_encoding']], attributes=[{"status": "missing"}])
+                except Exception as e:
+                    logger.warning("Face store write failed", person_id=person_id, error=str(e))
+            self.lexical_index.add(person_id, f"{person.name} {person.description}", source=f"case:{person_id}")
             
             logger.info("Missing person saved to Supabase", person_id=person_id)
             return person_id
@@ -53,13 +134,31 @@ class Database:
             logger.error("Failed to save missing person", error=str(e))
             return 0
 
+    def _insert_missing_person_sequential(self, data: Dict) -> int:
+        """Fallback for databases without create_missing_person: two inserts, the case removed again
+        when its search status cannot be created"""
+        response = self._execute("missing_persons", "insert", self.supabase.table("missing_persons").insert(data))
+        person_id = response.data[0]['id']
+        try:
+            self._execute("search_status", "insert", self.supabase.table("search_status").insert({
+                "person_id": person_id,
+                "status": "searching",
+                "last_updated": datetime.now().isoformat(),
+                "cameras_searched": 0,
+                "matches_found": 0
+            }))
+        except Exception:
+            self._execute("missing_persons", "delete", self.supabase.table("missing_persons").delete().eq("id", person_id))
+            raise
+        return person_id
+
     def get_missing_person(self, person_id: int) -> Optional[Dict]:
         """Get missing person by ID from Supabase"""
         if not self.supabase:
             return None
             
         try:
-            response = self.supabase.table("missing_persons").select("*").eq("id", person_id).execute()
+            response = self._execute("missing_persons", "select", self.supabase.table("missing_persons").select("*").eq("id", person_id))
             if response.data:
                 return response.data[0]
             return None
@@ -73,7 +172,7 @@ class Database:
             return []
             
         try:
-            response = self.supabase.table("missing_persons").select("id, name, age, description, photo_path, reported_date, status").order("reported_date", desc=True).execute()
+            response = self._execute("missing_persons", "select", self.supabase.table("missing_persons").select("id, name, age, description, photo_path, reported_date, status").order("reported_date", desc=True))
             return response.data
         except Exception as e:
             logger.error("Failed to fetch all missing persons", error=str(e))
@@ -94,22 +193,51 @@ class Database:
                 "verification_score": report.verification_score,
                 "report_time": report.report_time.isoformat(),
                 "embedding": embedding,
-                "status": "pending"
+                "status": "pending",
+                "duplicate_count": 1
             }
+            if getattr(report, "face_encoding", None):
+                data["face_encoding"] = report.face_encoding
             
-            response = self.supabase.table("citizen_reports").insert(data).execute()
-            return response.data[0]['id']
+            response = self._execute("citizen_reports", "insert", self.supabase.table("citizen_reports").insert(data))
+            report_id = response.data[0]['id']
+            if report.person_id:
+                self.lexical_index.add(report.person_id, f"{report.location} {report.description}",
+                                       source=f"report:{report_id}")
+            return report_id
         except Exception as e:
             logger.error("Failed to save citizen report", error=str(e))
             return 0
 
+    def update_report_cluster(self, report_id: int, duplicate_count: int, duplicate: Optional[CitizenReport] = None):
+        """Record a near-duplicate merged into a report: its reporter and photo go to citizen_report_duplicates,
+        and the count only ever rises, so concurrent merges landing out of order cannot lower it"""
+        if not self.supabase or not report_id:
+            return
+        try:
+            if duplicate is not None:
+                self._execute("citizen_report_duplicates", "insert", self.supabase.table("citizen_report_duplicates").insert({
+                    "report_id": report_id,
+                    "location": duplicate.location,
+                    "description": duplicate.description,
+                    "reporter_phone": duplicate.reporter_phone,
+                    "sighting_photo": duplicate.sighting_photo,
+                    "report_time": duplicate.report_time.isoformat()
+                }))
+            self._execute("citizen_reports", "update", self.supabase.table("citizen_reports").update({
+                "duplicate_count": duplicate_count,
+                "last_reported_at": datetime.now().isoformat()
+            }).eq("id", report_id).lt("duplicate_count", duplicate_count))
+        except Exception as e:
+            logger.error("Failed to update report cluster", report_id=report_id, error=str(e))
+
     def get_all_citizen_reports(self) -> List[Dict]:
         """Get all citizen reports from Supabase"""
         if not self.supabase:
             return []
             
         try:
-            response = self.supabase.table("citizen_reports").select("*").order("report_time", desc=True).execute()
+            response = self._execute("citizen_reports", "select", self.supabase.table("citizen_reports").select("*").order("report_time", desc=True))
             return response.data
         except Exception as e:
             logger.error("Failed to fetch all citizen reports", error=str(e))
@@ -121,7 +249,7 @@ class Database:
             return None
             
         try:
-            response = self.supabase.table("citizen_reports").select("*").eq("id", report_id).execute()
+            response = self._execute("citizen_reports", "select", self.supabase.table("citizen_reports").select("*").eq("id", report_id))
             if response.data:
                 return response.data[0]
             return None
@@ -143,10 +271,24 @@ class Database:
                 "timestamp": result.get('timestamp') or datetime.now().isoformat(),
                 "match_data": result
             }
-            self.supabase.table("search_results").insert(data).execute()
+            self._execute("search_results", "insert", self.supabase.table("search_results").insert(data))
         except Exception as e:
             logger.error("Failed to save search result", person_id=person_id, error=str(e))
 
+    def update_search_progress(self, person_id: int, cameras_searched: int, matches_found: int):
+        """Record CCTV sweep progress on the search status row"""
+        if not self.supabase:
+            return
+            
+        try:
+            self._execute("search_status", "update", self.supabase.table("search_status").update({
+                "cameras_searched": cameras_searched,
+                "matches_found": matches_found,
+                "last_updated": datetime.now().isoformat()
+            }).eq("person_id", person_id))
+        except Exception as e:
+            logger.error("Failed to update search progress", person_id=person_id, error=str(e))
+
     def get_search_status(self, person_id: int) -> Dict:
         """Get current search status from Supabase"""
         if not self.supabase:
@@ -154,11 +296,11 @@ class Database:
             
         try:
             # Get search status
-            status_res = self.supabase.table("search_status").select("*").eq("person_id", person_id).execute()
+            status_res = self._execute("search_status", "select", self.supabase.table("search_status").select("*").eq("person_id", person_id))
             
             # Get counts
-            report_count = self.supabase.table("citizen_reports").select("id", count="exact").eq("person_id", person_id).execute()
-            result_count = self.supabase.table("search_results").select("id", count="exact").eq("person_id", person_id).execute()
+            report_count = self._execute("citizen_reports", "select", self.supabase.table("citizen_reports").select("id", count="exact").eq("person_id", person_id))
+            result_count = self._execute("search_results", "select", self.supabase.table("search_results").select("id", count="exact").eq("person_id", person_id))
             
             if status_res.data:
                 status = status_res.data[0]
@@ -177,76 +319,331 @@ class Database:
             return
             
         try:
-            # Update missing person status
-            self.supabase.table("missing_persons").update({"status": "found"}).eq("id", person_id).execute()
-            
-            # Update search status
-            self.supabase.table("search_status").update({
-                "status": "found", 
-                "last_updated": datetime.now().isoformat(),
-            }).eq("person_id", person_id).execute()
-            
-            # Note: We can't easily increment with current supabase-py without RPC, 
-            # so we'll just update the status for now. In production, an RPC would be better.
-            
-            # Save the match result
-            self.save_search_result(person_id, match_result)
+            # Case status, search status and the match row in one transaction
+            if self._call_atomic("record_match", {"target_person_id": person_id, "match": match_result}) is None:
+                # Update missing person status
+                self._execute("missing_persons", "update", self.supabase.table("missing_persons").update({"status": "found"}).eq("id", person_id))
+
+                # Update search status
+                self._execute("search_status", "update", self.supabase.table("search_status").update({
+                    "status": "found",
+                    "last_updated": datetime.now().isoformat(),
+                }).eq("person_id", person_id))
+
+                # Save the match result
+                self.save_search_result(person_id, match_result)
+            self.embedding_store.set_attributes(person_id, status="found")
+            self.face_store.set_attributes(person_id, status="found")
         except Exception as e:
             logger.error("Failed to update match status", person_id=person_id, error=str(e))
 
-    def semantic_search(self, query_embedding: List[float], limit: int = 10, threshold: float = 0.7) -> List[Dict]:
-        """Semantic search using Supabase RPC for vector similarity (pgvector)"""
+    def semantic_search(self, query_embedding: List[float], limit: int = 10, threshold: float = 0.7,
+                        filters: Optional[SearchFilters] = None) -> List[Dict]:
+        """Semantic search using Supabase RPC for vector similarity (pgvector), optionally filtered"""
         if not self.supabase:
             return []
+        filters = filters or SearchFilters()
             
         try:
             # This assumes an RPC named 'match_missing_persons' is defined in Supabase
             # If not, we download and compare locally as fallback (advanced!)
             try:
-                response = self.supabase.rpc('match_missing_persons', {
+                params = {
                     'query_embedding': query_embedding,
                     'match_threshold': threshold,
                     'match_count': limit
-                }).execute()
+                }
+                # Filter arguments only when used, so unfiltered search still works against the older function
+                if filters != SearchFilters():
+                    params.update(self._rpc_filter_params(filters))
+                response = self._execute("rpc", "match_missing_persons", self.supabase.rpc('match_missing_persons', params))
                 return response.data
-            except:
-                # Fallback to local comparison (less efficient but reliable if RPC isn't set up yet)
-                return self._local_semantic_search_fallback(query_embedding, limit, threshold)
+            except Exception as e:
+                # Fallback to local comparison (less efficient but reliable if RPC isn't set up yet); logged so
+                # a broken deployment (e.g. ambiguous overloads, PGRST203) does not go unnoticed
+                logger.warning("match_missing_persons RPC failed, using local fallback", error=str(e))
+                return self._local_semantic_search_fallback(query_embedding, limit, threshold, filters)
         except Exception as e:
             logger.error("Semantic search failed", error=str(e))
             return []
 
-    def _local_semantic_search_fallback(self, query_embedding: List[float], limit: int, threshold: float) -> List[Dict]:
-        """Local fallback for semantic search when RPC is unavailable"""
-        import numpy as np
+    @staticmethod
+    def _rpc_filter_params(filters: SearchFilters) -> Dict:
+        return {
+            'filter_status': filters.status,
+            'min_age': filters.min_age,
+            'max_age': filters.max_age,
+            'reported_after': filters.reported_after.isoformat() if filters.reported_after else None,
+            'reported_before': filters.reported_before.isoformat() if filters.reported_before else None,
+            'filter_region': filters.region
+        }
+
+    @staticmethod
+    def _apply_filters(query, filters: SearchFilters):
+        """The same predicates as PostgREST filters (authoritative re-check of store candidates)"""
+        if filters.status:
+            query = query.eq("status", filters.status)
+        if filters.min_age is not None:
+            query = query.gte("age", filters.min_age)
+        if filters.max_age is not None:
+            query = query.lte("age", filters.max_age)
+        if filters.reported_after:
+            query = query.gte("reported_date", filters.reported_after.isoformat())
+        if filters.reported_before:
+            query = query.lte("reported_date", filters.reported_before.isoformat())
+        if filters.region:
+            # Case-insensitive equality like the RPC's lower(region) = lower(filter_region): the value is
+            # escaped so a % or _ in it is matched literally instead of as a wildcard
+            query = query.ilike("region", re.sub(r"([\\%_])", r"\\\1", filters.region))
+        return query
+
+    def _store_mask(self, filters: SearchFilters):
+        """Candidate bitmap over the local store for the filters"""
+        ranges = {}
+        if filters.min_age is not None or filters.max_age is not None:
+            ranges["age"] = (filters.min_age, filters.max_age)
+        if filters.reported_after or filters.reported_before:
+            ranges["reported_date"] = (filters.reported_after, filters.reported_before)
+        labels = {}
+        if filters.status:
+            labels["status"] = [filters.status]
+        if filters.region:
+            labels["region"] = [filters.region]
+        return self.embedding_store.attribute_mask(ranges, labels)
+
+    def hybrid_search(self, query: str, query_embedding: List[float], limit: int = 10,
+                      filters: Optional[SearchFilters] = None) -> List[Dict]:
+        """
+        BM25 candidates from the lexical index, vector-scored against the local store (candidates only,
+        no corpus scan) and fused with reciprocal-rank fusion. Queries with no lexical match fall back
+        to plain semantic search.
+        """
+        if not self.supabase:
+            return []
+        filters = filters or SearchFilters()
+        try:
+            self.sync_lexical_index()
+            self.sync_embedding_store()
+            store = self.embedding_store
+            # Every mask below indexes the same mapping, so they combine row for row
+            with store.pinned():
+                mask = self._store_mask(filters)
+                # Cases the store has not seen yet are kept; the database re-check below decides for them
+                lexical = self.lexical_index.search(query, limit * self.hybrid_candidate_factor,
+                                                    accept=lambda person_id: store.in_mask(person_id, mask) is not False)
+                vector = store.search(query_embedding, len(lexical), exact=True,
+                                      mask=mask & store.id_mask(person_id for person_id, _ in lexical)) if lexical else []
+            if not lexical:
+                return self.semantic_search(query_embedding, limit, filters=filters)
+            fused = reciprocal_rank_fusion([lexical, vector])
+
+            response = self._execute("missing_persons", "select", self._apply_filters(
+                self.supabase.table("missing_persons").select("id, name, age, description")
+                .in_("id", [person_id for person_id, _ in fused]), filters))
+            rows = {row['id']: row for row in response.data}
+            lexical_scores, similarities = dict(lexical), dict(vector)
+            results = []
+            for person_id, fusion_score in fused:
+                row = rows.get(person_id)
+                if not row:
+                    continue
+                similarity = similarities.get(person_id)
+                results.append({
+                    'id': row['id'],
+                    'name': row['name'],
+                    'age': row['age'],
+                    'description': row['description'],
+                    'similarity': similarity,
+                    'match_confidence': f"{similarity * 100:.1f}%" if similarity is not None else None,
+                    'lexical_score': round(lexical_scores.get(person_id, 0.0), 4),
+                    'fusion_score': round(fusion_score, 6)
+                })
+                if len(results) == limit:
+                    break
+            return results
+        except Exception as e:
+            logger.error("Hybrid search failed", error=str(e))
+            return []
+
+    def screen_open_cases(self, face_encoding, query_text: str, query_embedding: List[float],
+                          limit: int = 50) -> List[Dict]:
+        """
+        Prefilter for sightings without a person_id: face, BM25 and text-vector rankings over open
+        cases from the local indexes (no remote calls), fused with weighted RRF. Returns the best
+        `limit` cases with their per-signal scores.
+        """
+        if not self.supabase:
+            return []
         try:
-            # Get all missing persons with embeddings
-            response = self.supabase.table("missing_persons").select("id, name, age, description, embedding").eq("status", "missing").not_.is_("embedding", "null").execute()
-            
+            self.sync_face_store()
+            self.sync_embedding_store()
+            self.sync_lexical_index()
+            store = self.embedding_store
+            rankings, weights = [], []
+            face = []
+            if face_encoding is not None:
+                with self.face_store.pinned():
+                    face = self.face_store.search(face_encoding, limit, FACE_MISMATCH_THRESHOLD,
+                                                  mask=self.face_store.attribute_mask(labels={"status": ["missing"]}))
+                rankings.append(face)
+                weights.append(self.screening_face_weight)
+            with store.pinned():
+                open_cases = store.attribute_mask(labels={"status": ["missing"]})
+                lexical = self.lexical_index.search(query_text, limit,
+                                                    accept=lambda person_id: store.in_mask(person_id, open_cases) is not False)
+                vector = store.search(query_embedding, limit, mask=open_cases)
+            rankings += [lexical, vector]
+            weights += [1.0, 1.0]
+            fused = reciprocal_rank_fusion(rankings, weights=weights)[:limit]
+            if not fused:
+                return []
+
+            response = self._execute("missing_persons", "select", self.supabase.table("missing_persons")
+                                     .select("id, name, age, description, region, photo_path, face_encoding, reported_date")
+                                     .in_("id", [person_id for person_id, _ in fused]).eq("status", "missing"))
+            rows = {row['id']: row for row in response.data}
+            face_scores, lexical_scores, text_scores = dict(face), dict(lexical), dict(vector)
+            return [{
+                **rows[person_id],
+                "prefilter_score": round(score, 6),
+                "face_similarity": face_scores.get(person_id),
+                "lexical_score": round(lexical_scores[person_id], 4) if person_id in lexical_scores else None,
+                "text_similarity": text_scores.get(person_id)
+            } for person_id, score in fused if person_id in rows]
+        except Exception as e:
+            logger.error("Open case screening failed", error=str(e))
+            return []
+
+    def sync_lexical_index(self, force: bool = False, page_size: int = 500) -> int:
+        """Index cases and citizen reports added since the last sync (ids are monotonic, so they are the watermark)"""
+        if not self.supabase:
+            return 0
+        now = time.monotonic()
+        if not force and now - self._lexical_synced_at < self.embedding_sync_interval:
+            return 0
+        with self._lexical_sync_lock:
+            self._lexical_synced_at = now
+            start, added = time.perf_counter(), 0
+            try:
+                for table, columns in LEXICAL_SOURCES.items():
+                    while True:
+                        query = self.supabase.table(table).select(columns) \
+                            .gt("id", self.lexical_index.watermarks.get(table, 0)).order("id").limit(page_size)
+                        rows = self._execute(table, "select", query).data
+                        for row in rows:
+                            if table == "missing_persons":
+                                doc_id, text, source = row['id'], f"{row['name']} {row['description']}", f"case:{row['id']}"
+                            else:
+                                doc_id, text, source = row['person_id'], f"{row['location']} {row['description']}", f"report:{row['id']}"
+                            if doc_id is not None and self.lexical_index.add(doc_id, text, source=source):
+                                added += 1
+                        if rows:
+                            self.lexical_index.advance(table, rows[-1]['id'])
+                        if len(rows) < page_size:
+                            break
+            except Exception as e:
+                logger.warning("Lexical index sync failed", error=str(e))
+            if added:
+                logger.info("Lexical index synced", added=added, documents=len(self.lexical_index),
+                            duration_ms=round((time.perf_counter() - start) * 1000, 1))
+            return added
+
+    def _fetch_embeddings_since(self, watermark: Optional[str], offset: int, limit: int,
+                                column: str = "embedding", attributes=CASE_FILTER_ATTRIBUTES) -> List[Dict]:
+        """One page of cases changed at/after the watermark (less the lookback), for incremental store sync
+        (`column` is returned as "embedding", e.g. face_encoding for the face store)"""
+        vector = "embedding" if column == "embedding" else f"embedding:{column}"
+        columns = ", ".join(["id", vector, "updated_at", *attributes])
+        query = self.supabase.table("missing_persons").select(columns).not_.is_(column, "null")
+        if watermark:
+            since = datetime.fromisoformat(watermark.replace("Z", "+00:00")) - timedelta(seconds=self.embedding_sync_lookback)
+            query = query.gte("updated_at", since.isoformat())
+        query = query.order("updated_at").order("id").range(offset, offset + limit - 1)
+        return self._execute("missing_persons", "select", query).data
+
+    def sync_embedding_store(self, force: bool = False) -> int:
+        """Pull embeddings and filter attributes changed since the last sync (rate-limited by EMBEDDING_SYNC_INTERVAL_SECONDS)"""
+        if not self.supabase:
+            return 0
+        now = time.monotonic()
+        if not force and now - self._embedding_synced_at < self.embedding_sync_interval:
+            return 0
+        self._embedding_synced_at = now
+        try:
+            return self.embedding_store.sync(self._fetch_embeddings_since)
+        except Exception as e:
+            logger.error("Embedding store sync failed", error=str(e))
+            return 0
+
+    def sync_face_store(self, force: bool = False) -> int:
+        """Pull case face encodings and attributes changed since the last sync (same cadence as the embedding store)"""
+        if not self.supabase:
+            return 0
+        now = time.monotonic()
+        if not force and now - self._faces_synced_at < self.embedding_sync_interval:
+            return 0
+        self._faces_synced_at = now
+        try:
+            return self.face_store.sync(partial(self._fetch_embeddings_since, column="face_encoding",
+                                                attributes=self.face_store.attributes))
+        except Exception as e:
+            logger.error("Face store sync failed", error=str(e))
+            return 0
+
+    def match_faces(self, face_encoding, limit: int = 5, threshold: float = FACE_MATCH_THRESHOLD,
+                    status: Optional[str] = "missing") -> List[Dict]:
+        """Cases whose stored face is closest to the given face vector (local index, no remote call)"""
+        if not self.supabase:
+            return []
+        try:
+            self.sync_face_store()
+            with self.face_store.pinned():
+                mask = self.face_store.attribute_mask(labels={"status": [status]}) if status else None
+                candidates = self.face_store.search(face_encoding, limit, threshold, mask=mask)
+            if not candidates:
+                return []
+            query = self.supabase.table("missing_persons").select("id, name, age, photo_path") \
+                .in_("id", [person_id for person_id, _ in candidates])
+            if status:
+                query = query.eq("status", status)
+            rows = {row['id']: row for row in self._execute("missing_persons", "select", query).data}
+            return [{**rows[person_id], "face_similarity": round(similarity, 4)}
+                    for person_id, similarity in candidates if person_id in rows]
+        except Exception as e:
+            logger.error("Face match failed", error=str(e))
+            return []
+
+    def _local_semantic_search_fallback(self, query_embedding: List[float], limit: int, threshold: float,
+                                        filters: Optional[SearchFilters] = None) -> List[Dict]:
+        """Local fallback for semantic search when RPC is unavailable: score only the store rows whose
+        attributes pass the filters, then fetch the candidates' rows with the filters re-applied
+        (the store's copy of status can lag a change made by another process)"""
+        filters = filters or SearchFilters()
+        try:
+            self.sync_embedding_store()
+            with self.embedding_store.pinned():
+                candidates = self.embedding_store.search(query_embedding, limit * 2, threshold,
+                                                         mask=self._store_mask(filters))
+            if not candidates:
+                return []
+            response = self._execute("missing_persons", "select", self._apply_filters(
+                self.supabase.table("missing_persons").select("id, name, age, description")
+                .in_("id", [person_id for person_id, _ in candidates]), filters))
+            rows = {row['id']: row for row in response.data}
+
             results = []
-            query_vec = np.array(query_embedding)
-            
-            for row in response.data:
-                stored_embedding = np.array(row['embedding'])
-                
-                # Cosine similarity
-                dot_product = np.dot(query_vec, stored_embedding)
-                norm_query = np.linalg.norm(query_vec)
-                norm_stored = np.linalg.norm(stored_embedding)
-                
-                if norm_query > 0 and norm_stored > 0:
-                    similarity = dot_product / (norm_query * norm_stored)
-                    if similarity >= threshold:
-                        results.append({
-                            'id': row['id'],
-                            'name': row['name'],
-                            'age': row['age'],
-                            'description': row['description'],
-                            'similarity': float(similarity),
-                            'match_confidence': f"{similarity * 100:.1f}%"
-                        })
-            
-            results.sort(key=lambda x: x['similarity'], reverse=True)
+            for person_id, similarity in candidates:
+                row = rows.get(person_id)
+                if not row:
+                    continue
+                results.append({
+                    'id': row['id'],
+                    'name': row['name'],
+                    'age': row['age'],
+                    'description': row['description'],
+                    'similarity': similarity,
+                    'match_confidence': f"{similarity * 100:.1f}%"
+                })
             return results[:limit]
         except Exception as e:
             logger.error("Local semantic search fallback failed", error=str(e))
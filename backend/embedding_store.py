@@ -0,0 +1,648 @@
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from .logger import logger
+from .metrics import observe_stage
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: single-process use only
+    fcntl = None
+
+EMBEDDING_STORE_DIR = os.getenv("EMBEDDING_STORE_DIR", os.path.join(os.environ.get("TMPDIR", "/tmp"), "dhund_embeddings"))
+# Compact (rewrite without superseded/removed rows) once this fraction of rows is dead
+EMBEDDING_COMPACT_RATIO = float(os.getenv("EMBEDDING_COMPACT_RATIO", "0.2"))
+# Also compact on sync once this long has passed since the last snapshot and any row is dead (0 disables)
+EMBEDDING_COMPACT_INTERVAL_SECONDS = float(os.getenv("EMBEDDING_COMPACT_INTERVAL_SECONDS", "3600"))
+# "int8": rank on per-row int8 codes (4x smaller than float32, the only part kept hot in RAM),
+# then re-rank the best limit * EMBEDDING_RERANK_FACTOR candidates exactly; "none": exact scan.
+# Local only: Postgres and sync still carry full float embeddings, and the float32 file stays on disk
+EMBEDDING_QUANTIZATION = os.getenv("EMBEDDING_QUANTIZATION", "int8")
+EMBEDDING_RERANK_FACTOR = int(os.getenv("EMBEDDING_RERANK_FACTOR", "4"))
+# Rows dequantized per step of the approximate scan (bounds the float32 temporary)
+EMBEDDING_SCAN_BLOCK_ROWS = int(os.getenv("EMBEDDING_SCAN_BLOCK_ROWS", "8192"))
+
+# Filterable per-row attributes are int64 columns: "int" as-is, "time" as epoch seconds (naive = UTC),
+# "label" as a code into the header's per-field dictionary (case-insensitive). NULL never matches.
+ATTRIBUTE_KINDS = ("int", "time", "label")
+ATTR_NULL = np.iinfo(np.int64).min
+
+
+def _epoch_seconds(value) -> int:
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    moment = value if isinstance(value, datetime) else datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp())
+
+
+def _label(value) -> str:
+    return str(value).strip().lower()
+
+
+def quantize_int8(matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-row int8 codes of the unit-normalized rows; cos(q, v) ~= (codes @ q_unit) * scale"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    unit = np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+    peak = np.abs(unit).max(axis=1, initial=0.0)
+    scales = (peak / 127.0).astype(np.float32)
+    safe = np.where(scales > 0, scales, 1.0)[:, None]
+    codes = np.clip(np.rint(unit / safe), -127, 127).astype(np.int8)
+    return codes, scales
+
+
+class EmbeddingStore:
+    """
+    Append-only float32 vector file + int64 id file, memory-mapped read-only for search.
+
+    `<name>.header.json` is the commit record: rows beyond its `rows` count are an interrupted
+    append and are truncated before the next write. Processes on one host map the same files,
+    so the vectors live once in the page cache; a reader remaps when the header version changes.
+    Optional `attributes` ({field: kind}) are stored row-aligned in `<name>.attrs.i64` and can
+    pre-filter a search to a candidate bitmap before any vector is scored.
+    """
+    def __init__(self, directory: str, name: str, dim: int, quantization: str = "none", rerank_factor: int = 4,
+                 attributes: Optional[Dict[str, str]] = None, compact_interval: float = 0.0):
+        self.directory = directory
+        self.name = name
+        self.dim = dim
+        self.attributes: Dict[str, str] = dict(attributes or {})
+        unknown = set(self.attributes.values()) - set(ATTRIBUTE_KINDS)
+        if unknown:
+            raise ValueError(f"Unknown attribute kinds {sorted(unknown)}; expected one of {ATTRIBUTE_KINDS}")
+        self.quantized = quantization == "int8"
+        self.rerank_factor = max(1, rerank_factor)
+        self.compact_interval = compact_interval
+        self.vectors_path = os.path.join(directory, f"{name}.vectors.f32")
+        self.ids_path = os.path.join(directory, f"{name}.ids.i64")
+        self.codes_path = os.path.join(directory, f"{name}.codes.i8")
+        self.scales_path = os.path.join(directory, f"{name}.scales.f32")
+        self.attrs_path = os.path.join(directory, f"{name}.attrs.i64")
+        self.header_path = os.path.join(directory, f"{name}.header.json")
+        self.lock_path = os.path.join(directory, f"{name}.lock")
+        self._lock = threading.RLock()
+        self._sync_lock = threading.Lock()
+        self._writing = 0
+        # Pinned readers (see pinned()); a remap waits until none is active and holds new ones back meanwhile
+        self._pins = 0
+        self._pin_depth = threading.local()
+        self._pin_state = threading.Condition()
+        self._remapping = False
+        self._header: Dict = {}
+        self._header_mtime = None
+        self._mapped_version = None
+        self._vectors = np.zeros((0, dim), dtype=np.float32)
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._live = np.zeros(0, dtype=bool)
+        self._norms = np.zeros(0, dtype=np.float32)
+        self._codes = np.zeros((0, dim), dtype=np.int8)
+        self._scales = np.zeros(0, dtype=np.float32)
+        self._attrs = np.zeros((0, len(self.attributes)), dtype=np.int64)
+        self._bitmaps: Dict[Tuple[str, int], np.ndarray] = {}
+        self._row_of: Dict[int, int] = {}
+        os.makedirs(directory, exist_ok=True)
+        self._ensure_layout()
+        if self.quantized:
+            self._ensure_codes()
+        self.refresh()
+
+    @classmethod
+    def from_env(cls, name: str, dim: int = 1536, attributes: Optional[Dict[str, str]] = None) -> "EmbeddingStore":
+        return cls(EMBEDDING_STORE_DIR, name, dim, EMBEDDING_QUANTIZATION, EMBEDDING_RERANK_FACTOR, attributes,
+                   EMBEDDING_COMPACT_INTERVAL_SECONDS)
+
+    def _files(self) -> List[Tuple[str, int]]:
+        """Per-row column files and their row size in bytes (all kept row-aligned)"""
+        files = [(self.vectors_path, 4 * self.dim), (self.ids_path, 8)]
+        if self.quantized:
+            files += [(self.codes_path, self.dim), (self.scales_path, 4)]
+        if self.attributes:
+            files.append((self.attrs_path, 8 * len(self.attributes)))
+        return files
+
+    def _row_bytes(self, matrix: np.ndarray, ids: np.ndarray, attrs: np.ndarray) -> Dict[str, bytes]:
+        data = {self.vectors_path: matrix.tobytes(), self.ids_path: ids.tobytes()}
+        if self.quantized:
+            codes, scales = quantize_int8(matrix)
+            data[self.codes_path], data[self.scales_path] = codes.tobytes(), scales.tobytes()
+        if self.attributes:
+            data[self.attrs_path] = attrs.tobytes()
+        return data
+
+    def _ensure_layout(self):
+        """Reset a store written with a different attribute layout (it is a cache; sync refills it)"""
+        if not os.path.exists(self.header_path) or self._read_header().get("attributes", {}) == self.attributes:
+            return
+        with self._write_lock():
+            header = self._read_header()
+            for path in (self.vectors_path, self.ids_path, self.codes_path, self.scales_path, self.attrs_path):
+                if os.path.exists(path):
+                    os.truncate(path, 0)
+            self._commit({**header, "rows": 0, "version": header.get("version", 0) + 1, "watermark": None,
+                          "removed": [], "attributes": self.attributes, "dictionaries": {}})
+        logger.info("Embedding store reset for new attribute layout", store=self.name,
+                    attributes=list(self.attributes))
+
+    def _encode_attributes(self, header: Dict, values: Optional[List[Dict]], count: int) -> np.ndarray:
+        """Encode attribute dicts into int64 rows; new labels are added to header["dictionaries"]"""
+        encoded = np.full((count, len(self.attributes)), ATTR_NULL, dtype=np.int64)
+        if not values:
+            return encoded
+        dictionaries = header.setdefault("dictionaries", {})
+        for i, row in enumerate(values):
+            for j, (field, kind) in enumerate(self.attributes.items()):
+                value = row.get(field)
+                if value is None:
+                    continue
+                if kind == "label":
+                    labels = dictionaries.setdefault(field, [])
+                    value = _label(value)
+                    if value not in labels:
+                        labels.append(value)
+                    encoded[i, j] = labels.index(value)
+                else:
+                    encoded[i, j] = int(value) if kind == "int" else _epoch_seconds(value)
+        return encoded
+
+    def _ensure_codes(self):
+        """Build codes for a store written without quantization (one-off migration)"""
+        rows = self._read_header()["rows"]
+        try:
+            if rows == 0 or (os.path.getsize(self.codes_path) >= rows * self.dim
+                             and os.path.getsize(self.scales_path) >= rows * 4):
+                return
+        except OSError:
+            pass
+        with self._write_lock():
+            rows = self._read_header()["rows"]
+            vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dim))
+            with open(self.codes_path, "wb") as codes_file, open(self.scales_path, "wb") as scales_file:
+                for start in range(0, rows, EMBEDDING_SCAN_BLOCK_ROWS):
+                    codes, scales = quantize_int8(np.asarray(vectors[start:start + EMBEDDING_SCAN_BLOCK_ROWS]))
+                    codes_file.write(codes.tobytes())
+                    scales_file.write(scales.tobytes())
+        logger.info("Embedding store codes built", store=self.name, rows=rows)
+
+    # --- reading ------------------------------------------------------------------------------
+    def _read_header(self) -> Dict:
+        try:
+            with open(self.header_path) as f:
+                header = json.load(f)
+        except (OSError, ValueError):
+            return {"dim": self.dim, "rows": 0, "version": 0, "watermark": None, "removed": [],
+                    "attributes": self.attributes, "dictionaries": {}}
+        if header.get("dim") != self.dim:
+            raise ValueError(f"Embedding store {self.name} has dim {header.get('dim')}, expected {self.dim}")
+        return header
+
+    def refresh(self):
+        """Remap the files if another writer (or process) committed since the last look"""
+        if getattr(self._pin_depth, "depth", 0):
+            # This thread pinned the mapping; the next refresh after the block picks the commit up
+            return
+        try:
+            mtime = os.stat(self.header_path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime == self._header_mtime and self._header:
+            return
+        # Shared lock: a snapshot swaps the column files before committing the header, so reading
+        # the header and mapping the files must not interleave with another process's write
+        with self._lock, self._read_lock():
+            header = self._read_header()
+            rows = header["rows"]
+            if rows:
+                vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dim))
+                ids = np.memmap(self.ids_path, dtype=np.int64, mode="r", shape=(rows,))
+            else:
+                vectors, ids = np.zeros((0, self.dim), dtype=np.float32), np.zeros(0, dtype=np.int64)
+            codes, scales = self._codes, self._scales
+            if self.quantized and rows:
+                codes = np.memmap(self.codes_path, dtype=np.int8, mode="r", shape=(rows, self.dim))
+                scales = np.memmap(self.scales_path, dtype=np.float32, mode="r", shape=(rows,))
+            elif self.quantized:
+                codes, scales = np.zeros((0, self.dim), dtype=np.int8), np.zeros(0, dtype=np.float32)
+            if self.attributes and rows:
+                attrs = np.memmap(self.attrs_path, dtype=np.int64, mode="r", shape=(rows, len(self.attributes)))
+            else:
+                attrs = np.zeros((0, len(self.attributes)), dtype=np.int64)
+            with self._pin_state:
+                self._remapping = True
+                try:
+                    self._pin_state.wait_for(lambda: self._pins == 0)
+                    self._codes, self._scales, self._attrs = codes, scales, attrs
+                    self._apply_mapping(header, vectors, ids)
+                finally:
+                    self._remapping = False
+                    self._pin_state.notify_all()
+            self._header_mtime = mtime
+
+    def _apply_mapping(self, header: Dict, vectors: np.ndarray, ids: np.ndarray):
+        # Norms are cached per process; appends (same version) only compute norms for the new tail.
+        # Quantized stores skip this so the float32 file is only paged in for re-ranked candidates.
+        cached = len(self._norms)
+        if self.quantized:
+            norms = self._norms
+        elif header.get("version") == self._mapped_version and 0 < cached <= len(ids):
+            norms = np.concatenate([self._norms, np.linalg.norm(vectors[cached:], axis=1).astype(np.float32)])
+        else:
+            norms = np.linalg.norm(vectors, axis=1).astype(np.float32)
+        # Latest row per id wins; earlier rows for the same id and removed ids are dead
+        live = np.zeros(len(ids), dtype=bool)
+        if len(ids):
+            _, first = np.unique(ids[::-1], return_index=True)
+            live[len(ids) - 1 - first] = True
+            removed = header.get("removed") or []
+            if removed:
+                live &= ~np.isin(ids, np.asarray(removed, dtype=np.int64))
+        rows = np.flatnonzero(live)
+        self._header, self._mapped_version = header, header.get("version")
+        self._vectors, self._ids, self._live, self._norms = vectors, ids, live, norms
+        self._row_of = dict(zip(ids[rows].tolist(), rows.tolist()))
+        self._bitmaps = {}
+
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    def __contains__(self, item_id: int) -> bool:
+        return int(item_id) in self._row_of
+
+    @property
+    def watermark(self) -> Optional[str]:
+        return self._header.get("watermark")
+
+    def get(self, item_id: int) -> Optional[np.ndarray]:
+        with self.pinned():
+            row = self._row_of.get(int(item_id))
+            return None if row is None else np.asarray(self._vectors[row])
+
+    def attributes_of(self, item_id: int) -> Optional[Dict]:
+        """Decoded attributes of the live row for an id (labels as stored, lower-cased)"""
+        with self.pinned():
+            row = self._row_of.get(int(item_id))
+            if row is None or not self.attributes:
+                return None
+            dictionaries = self._header.get("dictionaries") or {}
+            values = [int(value) for value in self._attrs[row]]
+        decoded = {}
+        for (field, kind), value in zip(self.attributes.items(), values):
+            if value == ATTR_NULL:
+                decoded[field] = None
+            elif kind == "label":
+                decoded[field] = dictionaries.get(field, [])[value]
+            else:
+                decoded[field] = value
+        return decoded
+
+    def _label_bitmap(self, field: str, value) -> np.ndarray:
+        """Rows whose label equals value; cached per (field, code) until the next remap"""
+        labels = (self._header.get("dictionaries") or {}).get(field, [])
+        value = _label(value)
+        if value not in labels:
+            return np.zeros(len(self._ids), dtype=bool)
+        key = (field, labels.index(value))
+        bitmap = self._bitmaps.get(key)
+        if bitmap is None or len(bitmap) != len(self._ids):
+            bitmap = np.asarray(self._attrs[:, list(self.attributes).index(field)]) == key[1]
+            self._bitmaps[key] = bitmap
+        return bitmap
+
+    def attribute_mask(self, ranges: Optional[Dict[str, Tuple]] = None,
+                       labels: Optional[Dict[str, List]] = None) -> np.ndarray:
+        """
+        Candidate bitmap over stored rows: every inclusive (low, high) range (None = open) and every
+        label set (any of) must match. Pass the result to search(mask=...) to score only those rows.
+        """
+        with self.pinned():
+            mask = self._live.copy()
+            for field, (low, high) in (ranges or {}).items():
+                kind = self.attributes[field]
+                column = np.asarray(self._attrs[:, list(self.attributes).index(field)])
+                mask &= column != ATTR_NULL
+                if low is not None:
+                    mask &= column >= (int(low) if kind == "int" else _epoch_seconds(low))
+                if high is not None:
+                    mask &= column <= (int(high) if kind == "int" else _epoch_seconds(high))
+            for field, values in (labels or {}).items():
+                if self.attributes[field] != "label":
+                    raise ValueError(f"{field} is not a label attribute")
+                matched = np.zeros(len(self._ids), dtype=bool)
+                for value in values:
+                    matched |= self._label_bitmap(field, value)
+                mask &= matched
+            return mask
+
+    @contextmanager
+    def pinned(self):
+        """Keep the current mapping for the block: masks built inside line up row for row with searches
+        inside, even if another process commits or compacts meanwhile (the remap waits for the block).
+        Pinned blocks of different threads run concurrently; do not write to the store inside one"""
+        depth = getattr(self._pin_depth, "depth", 0)
+        if not depth:
+            self.refresh()
+            with self._pin_state:
+                self._pin_state.wait_for(lambda: not self._remapping)
+                self._pins += 1
+        self._pin_depth.depth = depth + 1
+        try:
+            yield self
+        finally:
+            self._pin_depth.depth = depth
+            if not depth:
+                with self._pin_state:
+                    self._pins -= 1
+                    self._pin_state.notify_all()
+
+    def id_mask(self, ids: Iterable[int]) -> np.ndarray:
+        """Bitmap of the live rows for the given ids (unknown ids are ignored)"""
+        with self.pinned():
+            mask = np.zeros(len(self._ids), dtype=bool)
+            rows = [self._row_of[int(i)] for i in ids if int(i) in self._row_of]
+            mask[rows] = True
+            return mask
+
+    def in_mask(self, item_id: int, mask: np.ndarray) -> Optional[bool]:
+        """Whether an id's live row is set in mask; None when the id is not stored"""
+        row = self._row_of.get(int(item_id))
+        return None if row is None or row >= len(mask) else bool(mask[row])
+
+    def _approximate_scores(self, q_unit: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """int8 scores for every row, or only for `rows` (a pre-filtered subset) when given"""
+        codes, scales = self._codes, self._scales
+        total = len(scales) if rows is None else len(rows)
+        scores = np.empty(total, dtype=np.float32)
+        for start in range(0, total, EMBEDDING_SCAN_BLOCK_ROWS):
+            block = slice(start, start + EMBEDDING_SCAN_BLOCK_ROWS)
+            picked = block if rows is None else rows[block]
+            scores[block] = (codes[picked].astype(np.float32) @ q_unit) * scales[picked]
+        return scores
+
+    def search(self, query: Iterable[float], limit: int = 10, threshold: float = -1.0,
+               exact: bool = False, mask: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """Cosine similarity over live rows (restricted to `mask` when given, see attribute_mask);
+        returns [(id, similarity)] best first. Quantized stores pre-rank on int8 codes and re-rank
+        limit * rerank_factor candidates on float32 (exact=True skips that)"""
+        with self.pinned(), observe_stage(f"embedding_store.{self.name}.search"):
+            vectors, live, ids = self._vectors, self._live, self._ids
+            if not len(ids) or limit <= 0:
+                return []
+            q = np.asarray(query, dtype=np.float32)
+            q_norm = float(np.linalg.norm(q))
+            if q_norm == 0:
+                return []
+            shortlist = limit * self.rerank_factor
+            if mask is not None:
+                # Narrow filters score only their subset instead of the whole corpus
+                # A mask built before a concurrent append is shorter; rows it never saw are excluded
+                eligible = np.flatnonzero(live[:len(mask)] & mask[:len(live)])
+                if self.quantized and not exact and len(eligible) > shortlist:
+                    approx = self._approximate_scores(q / q_norm, eligible)
+                    candidates = np.sort(eligible[np.argpartition(-approx, shortlist - 1)[:shortlist]])
+                else:
+                    candidates = eligible
+            elif self.quantized and not exact and len(self._row_of) > shortlist:
+                approx = np.where(live, self._approximate_scores(q / q_norm), -np.inf)
+                candidates = np.sort(np.argpartition(-approx, shortlist - 1)[:shortlist])
+            else:
+                candidates = np.flatnonzero(live)
+            if not len(candidates):
+                return []
+            if self.quantized:
+                candidate_vectors = np.asarray(vectors[candidates])
+                norms = np.linalg.norm(candidate_vectors, axis=1)
+            else:
+                candidate_vectors, norms = vectors[candidates], self._norms[candidates]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                scores = (candidate_vectors @ q) / (norms * q_norm)
+            scores = np.where(norms > 0, scores, -np.inf)
+            keep = min(limit, len(scores))
+            top = np.argpartition(-scores, keep - 1)[:keep]
+            top = top[np.argsort(-scores[top])]
+            return [(int(ids[candidates[i]]), float(scores[i])) for i in top if scores[i] >= threshold]
+
+    def measure_recall(self, k: int = 10, queries: int = 50, noise: float = 0.1, seed: int = 0) -> Dict:
+        """recall@k of the quantized path against an exact scan, using perturbed stored vectors as queries"""
+        rows = np.flatnonzero(self._live)
+        if not len(rows):
+            return {"k": k, "queries": 0, "recall_at_k": None}
+        rng = np.random.default_rng(seed)
+        sample = rng.choice(rows, size=min(queries, len(rows)), replace=False)
+        recalls = []
+        for row in sample:
+            vector = np.asarray(self._vectors[row])
+            query = vector + rng.normal(0, noise * (np.linalg.norm(vector) / np.sqrt(self.dim) or 1.0), self.dim)
+            truth = {item for item, _ in self.search(query, k, exact=True)}
+            found = {item for item, _ in self.search(query, k)}
+            recalls.append(len(truth & found) / len(truth) if truth else 1.0)
+        return {"k": k, "queries": len(sample), "rerank_factor": self.rerank_factor,
+                "quantization": "int8" if self.quantized else "none", "recall_at_k": round(float(np.mean(recalls)), 4)}
+
+    # --- writing ------------------------------------------------------------------------------
+    @contextmanager
+    def _file_lock(self, mode):
+        with open(self.lock_path, "a") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, mode)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @contextmanager
+    def _write_lock(self):
+        with self._lock, self._file_lock(fcntl.LOCK_EX if fcntl else None):
+            self._writing += 1
+            try:
+                yield
+            finally:
+                self._writing -= 1
+
+    @contextmanager
+    def _read_lock(self):
+        """Shared flock, unless this thread already holds the exclusive one (flock would deadlock on it)"""
+        if self._writing:
+            yield
+            return
+        with self._file_lock(fcntl.LOCK_SH if fcntl else None):
+            yield
+
+    def _commit(self, header: Dict):
+        header = {**header, "updated_at": datetime.now().isoformat()}
+        tmp = f"{self.header_path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(header, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.header_path)
+        self._header_mtime = None
+        self.refresh()
+
+    def upsert(self, ids: List[int], vectors, watermark: Optional[str] = None,
+               attributes: Optional[List[Dict]] = None) -> int:
+        """Append vectors (replacing earlier rows for the same ids) and commit; returns rows written.
+        attributes: one dict per id ({field: value}, missing fields NULL) for stores with attributes"""
+        matrix = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        if not len(ids):
+            if watermark:
+                with self._write_lock():
+                    self._commit({**self._read_header(), "watermark": watermark})
+            return 0
+        with self._write_lock():
+            header = self._read_header()
+            committed = header["rows"]
+            attrs = self._encode_attributes(header, attributes, len(ids))
+            data = self._row_bytes(matrix, np.asarray(ids, dtype=np.int64), attrs)
+            # Drop any tail left by an append that crashed before its commit
+            for path, itemsize in self._files():
+                with open(path, "ab") as f:
+                    if f.tell() != committed * itemsize:
+                        f.truncate(committed * itemsize)
+                    f.write(data[path])
+                    f.flush()
+                    os.fsync(f.fileno())
+            removed = set(header.get("removed") or []) - {int(i) for i in ids}
+            self._commit({**header, "rows": committed + len(ids), "version": header.get("version", 0),
+                          "removed": sorted(removed), "watermark": watermark or header.get("watermark")})
+        if self._dead_ratio() > EMBEDDING_COMPACT_RATIO:
+            self.snapshot()
+        return len(ids)
+
+    def set_attributes(self, item_id: int, **values) -> bool:
+        """Re-append an id's row with some attributes changed (e.g. status); False when not stored"""
+        current = self.attributes_of(item_id)
+        vector = self.get(item_id)
+        if current is None or vector is None:
+            return False
+        self.upsert([int(item_id)], [vector], attributes=[{**current, **values}])
+        return True
+
+    def remove(self, ids: List[int]):
+        """Mark ids as removed (e.g. case closed); rows are reclaimed by the next snapshot"""
+        with self._write_lock():
+            header = self._read_header()
+            self._commit({**header, "removed": sorted(set(header.get("removed") or []) | {int(i) for i in ids})})
+
+    def _dead_ratio(self) -> float:
+        total = len(self._ids)
+        return (total - len(self._row_of)) / total if total else 0.0
+
+    def snapshot(self):
+        """Compact into fresh files holding only live rows and swap them in atomically"""
+        with self._write_lock(), observe_stage(f"embedding_store.{self.name}.snapshot"):
+            self._header_mtime = None
+            self.refresh()
+            rows = np.flatnonzero(self._live)
+            header = self._read_header()
+            columns = {self.vectors_path: self._vectors, self.ids_path: self._ids}
+            if self.quantized:
+                columns.update({self.codes_path: self._codes, self.scales_path: self._scales})
+            if self.attributes:
+                columns[self.attrs_path] = self._attrs
+            for path, column in columns.items():
+                tmp = f"{path}.tmp"
+                with open(tmp, "wb") as f:
+                    f.write(np.asarray(column[rows]).tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, path)
+            # Existing maps keep the old inodes alive; the version bump makes readers remap
+            self._commit({**header, "rows": int(len(rows)), "removed": [], "version": header.get("version", 0) + 1,
+                          "compacted_at": time.time()})
+        logger.info("Embedding store compacted", store=self.name, rows=len(rows))
+
+    def sync(self, fetch_since: Callable[[Optional[str], int, int], List[Dict]], page_size: int = 500) -> int:
+        """
+        Pull rows changed since the watermark (paged): append ids not stored yet, re-append stored ids
+        whose vector or attributes changed (status, region, ...) and advance the watermark; returns rows
+        written. fetch_since(watermark, offset, limit) returns dicts with id, embedding and updated_at
+        (a server-maintained change time) ordered by (updated_at, id), plus any attribute fields.
+        """
+        with self._sync_lock:
+            added = self._sync(fetch_since, page_size)
+            if self._compaction_due():
+                self.snapshot()
+            return added
+
+    def _unchanged(self, item_id: int, vector, values: Dict) -> bool:
+        """Whether an id is stored with this vector and these attribute values (as they would be encoded)"""
+        current = self.attributes_of(item_id) if self.attributes else {}
+        stored = self.get(item_id)
+        if current is None or stored is None:
+            return False
+        for field, kind in self.attributes.items():
+            value = values.get(field)
+            if value is not None:
+                value = _label(value) if kind == "label" else int(value) if kind == "int" else _epoch_seconds(value)
+            if value != current[field]:
+                return False
+        return bool(np.allclose(stored, np.asarray(vector, dtype=np.float32), rtol=0, atol=1e-6))
+
+    def _compaction_due(self) -> bool:
+        """Periodic snapshot, so dead rows below the compaction ratio are still reclaimed eventually"""
+        if not self.compact_interval or len(self._row_of) == len(self._ids):
+            return False
+        last = self._header.get("compacted_at") or 0
+        if not last:
+            # Stores written before compacted_at was recorded start their interval now
+            with self._write_lock():
+                self._commit({**self._read_header(), "compacted_at": time.time()})
+            return False
+        return time.time() - last >= self.compact_interval
+
+    def _sync(self, fetch_since, page_size: int) -> int:
+        start = time.perf_counter()
+        self.refresh()
+        watermark, offset, added = self.watermark, 0, 0
+        newest = watermark
+        while True:
+            rows = fetch_since(watermark, offset, page_size)
+            ids, vectors, attributes = [], [], []
+            for r in rows:
+                if r.get("embedding") is None:
+                    continue
+                vector = json.loads(r["embedding"]) if isinstance(r["embedding"], str) else r["embedding"]
+                values = {field: r.get(field) for field in self.attributes}
+                if self._unchanged(int(r["id"]), vector, values):
+                    continue
+                ids.append(int(r["id"]))
+                vectors.append(vector)
+                attributes.append(values)
+            if ids:
+                added += self.upsert(ids, vectors, attributes=attributes)
+            if rows:
+                newest = max(newest or "", *(str(r["updated_at"]) for r in rows))
+            if len(rows) < page_size:
+                break
+            offset += page_size
+        if newest != watermark:
+            self.upsert([], [], watermark=newest)
+        if added:
+            logger.info("Embedding store synced", store=self.name, written=added, rows=len(self),
+                        duration_ms=round((time.perf_counter() - start) * 1000, 1))
+        return added
+
+    def stats(self) -> Dict:
+        return {
+            "name": self.name,
+            "dim": self.dim,
+            "live_rows": len(self._row_of),
+            "total_rows": int(len(self._ids)),
+            "removed": len(self._header.get("removed") or []),
+            "watermark": self.watermark,
+            "version": self._header.get("version"),
+            "compacted_at": self._header.get("compacted_at"),
+            "quantization": "int8" if self.quantized else "none",
+            "rerank_factor": self.rerank_factor,
+            "attributes": self.attributes,
+            "labels": {field: len(values) for field, values in (self._header.get("dictionaries") or {}).items()},
+            "vector_bytes": int(len(self._ids)) * self.dim * 4,
+            # What a search scans every time (the rest is only paged in for re-ranked candidates)
+            "hot_bytes": int(len(self._ids)) * (self.dim + 4 + 8) if self.quantized else int(len(self._ids)) * (self.dim * 4 + 12),
+        }
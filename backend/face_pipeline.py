@@ -0,0 +1,181 @@
+import os
+import sys
+import json
+import queue
+import threading
+import urllib.request
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+import numpy as np
+from .lazy import optional_import
+from .logger import logger
+from .metrics import timed_stage
+
+# OpenCV Zoo models: YuNet face detector + SFace 128-d face recognizer (both CPU, ~0.3M / 37MB)
+FACE_MODEL_DIR = os.getenv("FACE_MODEL_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models"))
+FACE_DETECTOR_MODEL = os.getenv("FACE_DETECTOR_MODEL", os.path.join(FACE_MODEL_DIR, "face_detection_yunet_2023mar.onnx"))
+FACE_RECOGNIZER_MODEL = os.getenv("FACE_RECOGNIZER_MODEL", os.path.join(FACE_MODEL_DIR, "face_recognition_sface_2021dec.onnx"))
+FACE_DETECTION_SCORE = float(os.getenv("FACE_DETECTION_SCORE", "0.8"))
+# Longest image side fed to the detector (larger photos are downscaled first)
+FACE_INPUT_MAX_SIDE = int(os.getenv("FACE_INPUT_MAX_SIDE", "640"))
+# SFace cosine similarity: >= match is the same identity; < mismatch is clearly someone else
+FACE_MATCH_THRESHOLD = float(os.getenv("FACE_MATCH_THRESHOLD", "0.363"))
+FACE_MISMATCH_THRESHOLD = float(os.getenv("FACE_MISMATCH_THRESHOLD", "0.15"))
+# Detector/recognizer pairs shared by all worker threads (each pair holds its own copy of the ~37MB weights)
+FACE_MODEL_POOL_SIZE = int(os.getenv("FACE_MODEL_POOL_SIZE", "2"))
+
+FACE_DIM = 128
+MODEL_URLS = {
+    FACE_DETECTOR_MODEL: "https://github.com/opencv/opencv_zoo/raw/main/models/face_detection_yunet/face_detection_yunet_2023mar.onnx",
+    FACE_RECOGNIZER_MODEL: "https://github.com/opencv/opencv_zoo/raw/main/models/face_recognition_sface/face_recognition_sface_2021dec.onnx",
+}
+
+
+def as_face_vector(value) -> Optional[np.ndarray]:
+    """Stored face_encoding (pgvector text, list or None) as a unit float32 vector; None for empty/zero placeholders"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = json.loads(value)
+    vector = np.asarray(value, dtype=np.float32).reshape(-1)
+    norm = float(np.linalg.norm(vector))
+    if vector.shape[0] != FACE_DIM or norm == 0:
+        return None
+    return vector / norm
+
+
+def face_verdict(similarity: Optional[float]) -> str:
+    if similarity is None:
+        return "unavailable"
+    if similarity >= FACE_MATCH_THRESHOLD:
+        return "match"
+    if similarity < FACE_MISMATCH_THRESHOLD:
+        return "mismatch"
+    return "inconclusive"
+
+
+class FacePipeline:
+    """Local CPU face embeddings: YuNet detection, 5-point alignment, SFace features (L2-normalized)"""
+    def __init__(self, pool_size: int = FACE_MODEL_POOL_SIZE):
+        # cv2.dnn-backed models keep per-call state (input size, blobs), so a pair is leased to one
+        # caller at a time; at most pool_size pairs are ever loaded, however many threads call in
+        self.pool_size = max(1, pool_size)
+        self._pool: "queue.LifoQueue[Tuple]" = queue.LifoQueue()
+        self._loaded = 0
+        self._lock = threading.Lock()
+        self._warned_missing = False
+
+    @property
+    def available(self) -> bool:
+        cv2 = optional_import("cv2")
+        if cv2 is None or not hasattr(cv2, "FaceDetectorYN") or not hasattr(cv2, "FaceRecognizerSF"):
+            return False
+        missing = [path for path in (FACE_DETECTOR_MODEL, FACE_RECOGNIZER_MODEL) if not os.path.exists(path)]
+        if missing and not self._warned_missing:
+            self._warned_missing = True
+            logger.warning("Face models missing; local face matching disabled (fetch with python -m backend.face_pipeline)",
+                           missing=missing)
+        return not missing
+
+    @contextmanager
+    def _models(self, cv2) -> Iterator[Tuple]:
+        """Lease a (detector, recognizer) pair, loading a new one only while the pool is below its size"""
+        try:
+            models = self._pool.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                grow = self._loaded < self.pool_size
+                if grow:
+                    self._loaded += 1
+            if grow:
+                try:
+                    models = (cv2.FaceDetectorYN.create(FACE_DETECTOR_MODEL, "", (320, 320), FACE_DETECTION_SCORE),
+                              cv2.FaceRecognizerSF.create(FACE_RECOGNIZER_MODEL, ""))
+                except Exception:
+                    with self._lock:
+                        self._loaded -= 1
+                    raise
+            else:
+                models = self._pool.get()
+        try:
+            yield models
+        finally:
+            self._pool.put(models)
+
+    def warm_up(self):
+        """Load one model pair (no-op when OpenCV or the model files are missing)"""
+        if self.available:
+            with self._models(optional_import("cv2")):
+                pass
+
+    def _detect(self, cv2, detector, image) -> Optional[np.ndarray]:
+        height, width = image.shape[:2]
+        scale = min(1.0, FACE_INPUT_MAX_SIDE / max(height, width))
+        if scale < 1.0:
+            image = cv2.resize(image, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+            height, width = image.shape[:2]
+        detector.setInputSize((width, height))
+        _, faces = detector.detect(image)
+        if faces is None or not len(faces):
+            return None
+        face = faces[int(np.argmax(faces[:, 2] * faces[:, 3]))].copy()
+        face[:14] /= scale
+        return face
+
+    def detect(self, image) -> Optional[np.ndarray]:
+        """Largest face in a BGR image as YuNet's row (box x,y,w,h, 5 landmark x,y pairs, score) in the
+        image's own coordinates; None when unavailable or no face is found"""
+        if not self.available or image is None:
+            return None
+        cv2 = optional_import("cv2")
+        with self._models(cv2) as (detector, _):
+            return self._detect(cv2, detector, image)
+
+    def encode_image(self, image, face: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
+        """Embedding of the largest detected face in a BGR image (or of an already detected `face` row);
+        None when no face is found"""
+        if image is None:
+            return None
+        cv2 = optional_import("cv2")
+        with self._models(cv2) as (detector, recognizer):
+            if face is None:
+                face = self._detect(cv2, detector, image)
+            if face is None:
+                return None
+            feature = recognizer.feature(recognizer.alignCrop(image, face)).reshape(-1).astype(np.float32)
+        norm = float(np.linalg.norm(feature))
+        return feature / norm if norm else None
+
+    @timed_stage("face_embedding")
+    def encode(self, photo_path: str) -> Optional[np.ndarray]:
+        """Face embedding for a photo on disk (None when unavailable, unreadable or faceless)"""
+        if not self.available:
+            return None
+        try:
+            return self.encode_image(optional_import("cv2").imread(photo_path))
+        except Exception as e:
+            logger.warning("Face embedding failed", error=str(e))
+            return None
+
+    @staticmethod
+    def compare(first: Optional[np.ndarray], second: Optional[np.ndarray]) -> Dict:
+        """Cosine similarity of two unit face vectors plus the match/mismatch/inconclusive verdict"""
+        similarity = None if first is None or second is None else round(float(np.dot(first, second)), 4)
+        return {"face_similarity": similarity, "face_verdict": face_verdict(similarity)}
+
+
+def download_models(force: bool = False):
+    """Fetch the YuNet and SFace ONNX files into their configured paths"""
+    for path, url in MODEL_URLS.items():
+        if os.path.exists(path) and not force:
+            print(f"present  {path}")
+            continue
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        urllib.request.urlretrieve(url, f"{path}.part")
+        os.replace(f"{path}.part", path)
+        print(f"fetched  {path}")
+
+
+if __name__ == "__main__":
+    # python -m backend.face_pipeline [--force]
+    download_models(force="--force" in sys.argv)
@@ -0,0 +1,155 @@
+import os
+import json
+import gzip
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Callable, Dict, Optional, Tuple
+from fastapi import Request
+from fastapi.responses import Response
+from .lazy import optional_import
+from .metrics import cache_hits, cache_misses, http_not_modified
+
+# Writes made by other instances become visible after at most this many seconds (0 re-queries every time)
+HTTP_CACHE_MAX_STALENESS_SECONDS = float(os.getenv("HTTP_CACHE_MAX_STALENESS_SECONDS", "15"))
+# Cache-Control max-age for clients; 0 sends no-cache, so browsers revalidate every poll with If-None-Match
+HTTP_CACHE_MAX_AGE_SECONDS = int(os.getenv("HTTP_CACHE_MAX_AGE_SECONDS", "0"))
+HTTP_CACHE_MAX_ENTRIES = int(os.getenv("HTTP_CACHE_MAX_ENTRIES", "1024"))
+# Smaller bodies are sent uncompressed: the framing costs more than it saves
+HTTP_COMPRESS_MIN_BYTES = int(os.getenv("HTTP_COMPRESS_MIN_BYTES", "1024"))
+
+
+class CachedBody:
+    """One rendered JSON body with its validators and lazily built compressed variants"""
+    def __init__(self, body: bytes, etag: str, last_modified: float, version: int):
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.version = version
+        self.fetched_at = time.monotonic()
+        self.encoded: Dict[str, bytes] = {}
+
+
+def _opaque_tag(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def _accepts(accept_encoding: str, coding: str) -> bool:
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        if name.strip() in (coding, "*"):
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+class ResponseCache:
+    """
+    Rendered JSON for the dashboard's polled read endpoints, keyed by route and invalidated by the
+    database's write counter (`data_version`). A poll whose version is unchanged is answered from
+    memory (or with 304 when its If-None-Match / If-Modified-Since still matches) without touching
+    the database; entries older than `max_staleness` are re-queried to pick up other instances' writes.
+    ETags hash the body, so a re-query that finds the same data keeps the client's copy valid.
+    """
+    def __init__(self, max_entries: int = HTTP_CACHE_MAX_ENTRIES, max_staleness: float = HTTP_CACHE_MAX_STALENESS_SECONDS,
+                 max_age: int = HTTP_CACHE_MAX_AGE_SECONDS, compress_min_bytes: int = HTTP_COMPRESS_MIN_BYTES):
+        self.max_entries = max_entries
+        self.max_staleness = max_staleness
+        self.max_age = max_age
+        self.compress_min_bytes = compress_min_bytes
+        self._entries: "OrderedDict[str, CachedBody]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._brotli = None
+        self._brotli_checked = False
+        self.stats_counters = {"hits": 0, "misses": 0, "not_modified": 0, "compressed_bytes_saved": 0}
+
+    def _lookup(self, key: str, version: int) -> Optional[CachedBody]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.version != version or time.monotonic() - entry.fetched_at > self.max_staleness:
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def _store(self, key: str, version: int, payload) -> CachedBody:
+        body = json.dumps(payload, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+        etag = 'W/"{}"'.format(hashlib.sha256(body).hexdigest()[:32])
+        with self._lock:
+            previous = self._entries.get(key)
+            last_modified = previous.last_modified if previous and previous.etag == etag else time.time()
+            entry = CachedBody(body, etag, last_modified, version)
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def _not_modified(self, request: Request, entry: CachedBody) -> bool:
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            # Weak comparison: W/"x" and "x" name the same representation
+            tags = {_opaque_tag(tag) for tag in if_none_match.split(",")}
+            return "*" in tags or _opaque_tag(entry.etag) in tags
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since:
+            try:
+                return int(entry.last_modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def _encode(self, entry: CachedBody, accept_encoding: str) -> Tuple[bytes, Optional[str]]:
+        """Brotli when available and accepted, else gzip; each variant is compressed once per body"""
+        if len(entry.body) < self.compress_min_bytes:
+            return entry.body, None
+        if not self._brotli_checked:
+            self._brotli, self._brotli_checked = optional_import("brotli"), True
+        if self._brotli is not None and _accepts(accept_encoding, "br"):
+            coding = "br"
+        elif _accepts(accept_encoding, "gzip"):
+            coding = "gzip"
+        else:
+            return entry.body, None
+        encoded = entry.encoded.get(coding)
+        if encoded is None:
+            encoded = self._brotli.compress(entry.body, quality=5) if coding == "br" else gzip.compress(entry.body, 6)
+            entry.encoded[coding] = encoded
+        with self._lock:
+            self.stats_counters["compressed_bytes_saved"] += len(entry.body) - len(encoded)
+        return encoded, coding
+
+    def respond(self, request: Request, key: str, version: int, produce: Callable[[], Dict]) -> Response:
+        """Serve `key` from cache when `version` still matches, else render produce() (which may raise)"""
+        route = getattr(request.scope.get("route"), "path", key)
+        entry = self._lookup(key, version)
+        hit = entry is not None
+        if entry is None:
+            entry = self._store(key, version, produce())
+        (cache_hits if hit else cache_misses).inc(cache="http_response")
+        with self._lock:
+            self.stats_counters["hits" if hit else "misses"] += 1
+
+        headers = {
+            "ETag": entry.etag,
+            "Last-Modified": formatdate(entry.last_modified, usegmt=True),
+            "Cache-Control": f"max-age={self.max_age}, must-revalidate" if self.max_age > 0 else "no-cache",
+            "Vary": "Accept-Encoding",
+        }
+        if self._not_modified(request, entry):
+            http_not_modified.inc(route=route)
+            with self._lock:
+                self.stats_counters["not_modified"] += 1
+            return Response(status_code=304, headers=headers)
+        body, coding = self._encode(entry, request.headers.get("accept-encoding", ""))
+        if coding:
+            headers["Content-Encoding"] = coding
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"entries": len(self._entries), "max_staleness_seconds": self.max_staleness,
+                    "max_age_seconds": self.max_age, "brotli": self._brotli is not None if self._brotli_checked else None, **self.stats_counters}
@@ -0,0 +1,46 @@
+import time
+import importlib
+import threading
+from functools import lru_cache
+from typing import Any, Callable, Optional
+from .logger import logger
+
+
+@lru_cache(maxsize=None)
+def optional_import(module_name: str) -> Optional[Any]:
+    """Import a heavy optional dependency on first use; None when it is not installed"""
+    start = time.perf_counter()
+    try:
+        module = importlib.import_module(module_name)
+    except ImportError:
+        logger.warning(f"{module_name} not available; dependent features use fallbacks")
+        return None
+    logger.info("Deferred import loaded", module=module_name,
+                duration_ms=round((time.perf_counter() - start) * 1000, 1))
+    return module
+
+
+class LazyComponent:
+    """Proxy that builds a component on first attribute access, so cold starts only pay for what a route uses"""
+    def __init__(self, factory: Callable[[], Any], name: str):
+        self._factory = factory
+        self._name = name
+        self._instance = None
+        self._lock = threading.Lock()
+
+    @property
+    def initialized(self) -> bool:
+        return self._instance is not None
+
+    def get(self) -> Any:
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    start = time.perf_counter()
+                    self._instance = self._factory()
+                    logger.info("Component initialized", component=self._name,
+                                duration_ms=round((time.perf_counter() - start) * 1000, 1))
+        return self._instance
+
+    def __getattr__(self, item: str):
+        return getattr(self.get(), item)
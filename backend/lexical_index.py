@@ -0,0 +1,147 @@
+import os
+import re
+import math
+import threading
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Set, Tuple
+import numpy as np
+from .metrics import observe_stage
+
+# Okapi BM25 parameters (term-frequency saturation, length normalisation)
+LEXICAL_BM25_K1 = float(os.getenv("LEXICAL_BM25_K1", "1.2"))
+LEXICAL_BM25_B = float(os.getenv("LEXICAL_BM25_B", "0.75"))
+# Reciprocal-rank fusion constant: larger values flatten the advantage of the very top ranks
+HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+_STOPWORDS = {"a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "he", "her", "his", "in",
+              "is", "it", "of", "on", "or", "she", "that", "the", "their", "they", "this", "to", "was", "were",
+              "with"}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased word tokens (any script) without English stopwords"""
+    return [t for t in _TOKEN.findall((text or "").lower()) if t not in _STOPWORDS]
+
+
+def reciprocal_rank_fusion(rankings: List[List[Tuple[int, float]]], k: int = HYBRID_RRF_K,
+                           weights: Optional[List[float]] = None) -> List[Tuple[int, float]]:
+    """Fuse best-first [(id, score)] rankings by sum of weight / (k + rank); scores themselves are ignored"""
+    fused: Dict[int, float] = {}
+    for index, ranking in enumerate(rankings):
+        weight = weights[index] if weights else 1.0
+        for rank, (item_id, _) in enumerate(ranking, start=1):
+            fused[item_id] = fused.get(item_id, 0.0) + weight / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+class LexicalIndex:
+    """
+    In-memory inverted index with BM25 scoring. A document (one case) accumulates text from several
+    sources (the case itself, later citizen reports); each source key is indexed once, so the
+    write-through on insert and the periodic sync can both offer the same row. Postings are kept as
+    dicts for cheap appends and converted to arrays per term on first query, so scoring is vectorized.
+    """
+    def __init__(self, k1: float = LEXICAL_BM25_K1, b: float = LEXICAL_BM25_B):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._slot_of: Dict[int, int] = {}
+        self._doc_ids = np.zeros(1024, dtype=np.int64)
+        self._doc_len = np.zeros(1024, dtype=np.float32)
+        self._total_len = 0
+        self._sources: Set[str] = set()
+        self._lock = threading.Lock()
+        # Highest row id indexed per source table, for incremental sync
+        self.watermarks: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    def _slot(self, doc_id: int) -> int:
+        slot = self._slot_of.get(doc_id)
+        if slot is None:
+            slot = len(self._slot_of)
+            if slot == len(self._doc_ids):
+                self._doc_ids = np.concatenate([self._doc_ids, np.zeros_like(self._doc_ids)])
+                self._doc_len = np.concatenate([self._doc_len, np.zeros_like(self._doc_len)])
+            self._slot_of[doc_id] = slot
+            self._doc_ids[slot] = doc_id
+        return slot
+
+    def add(self, doc_id: int, text: str, source: Optional[str] = None) -> bool:
+        """Append text to a document; False when `source` was already indexed"""
+        terms = Counter(tokenize(text))
+        with self._lock:
+            if source is not None:
+                if source in self._sources:
+                    return False
+                self._sources.add(source)
+            slot = self._slot(int(doc_id))
+            for term, count in terms.items():
+                postings = self._postings.setdefault(term, {})
+                postings[slot] = postings.get(slot, 0) + count
+                self._arrays.pop(term, None)
+            added = sum(terms.values())
+            self._doc_len[slot] += added
+            self._total_len += added
+        return True
+
+    def advance(self, table: str, row_id: int):
+        with self._lock:
+            self.watermarks[table] = max(self.watermarks.get(table, 0), int(row_id))
+
+    def _term_arrays(self, term: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            postings = self._postings.get(term)
+            if not postings:
+                return None
+            arrays = (np.fromiter(postings.keys(), dtype=np.int64, count=len(postings)),
+                      np.fromiter(postings.values(), dtype=np.float32, count=len(postings)))
+            self._arrays[term] = arrays
+        return arrays
+
+    def search(self, query: str, limit: int = 10,
+               accept: Optional[Callable[[int], bool]] = None) -> List[Tuple[int, float]]:
+        """BM25 over documents sharing at least one query term; returns [(doc_id, score)] best first.
+        accept(doc_id) drops documents (e.g. outside the metadata filters) before the limit applies"""
+        with observe_stage("lexical_index.search"):
+            terms = set(tokenize(query))
+            with self._lock:
+                docs = len(self._slot_of)
+                if not docs or not terms or limit <= 0:
+                    return []
+                doc_len = self._doc_len[:docs]
+                norms = self.k1 * (1 - self.b + self.b * doc_len / (self._total_len / docs))
+                scores = np.zeros(docs, dtype=np.float32)
+                for term in terms:
+                    arrays = self._term_arrays(term)
+                    if arrays is None:
+                        continue
+                    slots, tfs = arrays
+                    idf = math.log(1 + (docs - len(slots) + 0.5) / (len(slots) + 0.5))
+                    scores[slots] += idf * tfs * (self.k1 + 1) / (tfs + norms[slots])
+                doc_ids = self._doc_ids[:docs].copy()
+            matched = np.flatnonzero(scores > 0)
+            order = matched[np.argsort(-scores[matched], kind="stable")]
+            results = []
+            for slot in order:
+                doc_id = int(doc_ids[slot])
+                if accept is None or accept(doc_id):
+                    results.append((doc_id, float(scores[slot])))
+                    if len(results) == limit:
+                        break
+            return results
+
+    def stats(self) -> Dict:
+        with self._lock:
+            docs = len(self._slot_of)
+            return {
+                "documents": docs,
+                "terms": len(self._postings),
+                "postings": sum(len(p) for p in self._postings.values()),
+                "avg_doc_tokens": round(self._total_len / docs, 1) if docs else 0,
+                "watermarks": dict(self.watermarks),
+            }
@@ -0,0 +1,77 @@
+import os
+import time
+import asyncio
+import threading
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from .logger import logger
+from .metrics import observe_stage
+
+# Serverless (Vercel / Lambda via Mangum) starts a process per cold start: warming everything there would
+# put the heavy imports and index syncs back on the path lazy loading took them off, so it defaults to off
+SERVERLESS = bool(os.getenv("VERCEL") or os.getenv("AWS_LAMBDA_FUNCTION_NAME"))
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "false" if SERVERLESS else "true").lower() == "true"
+SHUTDOWN_FLUSH_TIMEOUT_SECONDS = float(os.getenv("SHUTDOWN_FLUSH_TIMEOUT_SECONDS", "5"))
+
+
+class ResourceManager:
+    """Startup warm-up and shutdown flush for process-wide resources (models, clients, pools, buffers)"""
+    def __init__(self):
+        self._warmups: List[Tuple[str, Callable[[], object]]] = []
+        self._flushes: List[Tuple[str, Callable[[], Optional[Awaitable]]]] = []
+        self._status: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.state = "cold"
+
+    def on_warmup(self, name: str, fn: Callable[[], object]):
+        """Register a blocking warm-up step; steps run in order and failures are logged, not raised"""
+        self._warmups.append((name, fn))
+        self._status[name] = {"state": "pending"}
+
+    def on_shutdown(self, name: str, fn: Callable[[], Optional[Awaitable]]):
+        """Register a flush step (sync or async), run in registration order at shutdown"""
+        self._flushes.append((name, fn))
+
+    def warm_up(self, force: bool = False) -> Dict:
+        """Run every warm-up step (blocking); already-warm steps are skipped unless forced"""
+        with self._lock:
+            self.state = "warming"
+            for name, fn in self._warmups:
+                if not force and self._status[name].get("state") == "ready":
+                    continue
+                start = time.perf_counter()
+                try:
+                    with observe_stage(f"warmup.{name}"):
+                        fn()
+                    self._status[name] = {"state": "ready"}
+                except Exception as e:
+                    logger.warning("Warm-up step failed", step=name, error=str(e))
+                    self._status[name] = {"state": "failed", "error": str(e)}
+                self._status[name].update(duration_ms=round((time.perf_counter() - start) * 1000, 1),
+                                          completed_at=datetime.now().isoformat())
+            failed = [name for name, status in self._status.items() if status["state"] == "failed"]
+            self.state = "degraded" if failed else "warm"
+        logger.info("Warm-up finished", state=self.state, failed=failed)
+        return self.status()
+
+    def warm_up_in_background(self):
+        """Start warm-up on a daemon thread so startup (and the first request) is not blocked on it"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self.warm_up, name="dhund-warmup", daemon=True)
+        self._thread.start()
+
+    def status(self) -> Dict:
+        return {"state": self.state, "steps": {name: dict(status) for name, status in self._status.items()}}
+
+    async def shutdown(self):
+        """Flush write-behind buffers; each step is bounded so a stuck sink cannot hang the process"""
+        for name, fn in self._flushes:
+            try:
+                result = fn()
+                if asyncio.iscoroutine(result):
+                    await asyncio.wait_for(result, timeout=SHUTDOWN_FLUSH_TIMEOUT_SECONDS)
+            except Exception as e:
+                logger.error("Shutdown flush failed", step=name, error=str(e))
+        self.state = "stopped"
@@ -1,39 +1,127 @@
 import logging
+import logging.handlers
 import json
 import os
+import queue
+import random
+import atexit
 from datetime import datetime
 
+try:
+    import orjson
+    def _dumps(data) -> str:
+        return orjson.dumps(data, default=str).decode()
+except ImportError:
+    _encoder = json.JSONEncoder(default=str, ensure_ascii=False, check_circular=False)
+    def _dumps(data) -> str:
+        return _encoder.encode(data)
+
+
+class JSONFormatter(logging.Formatter):
+    """Serializes the structured payload; runs on the listener thread when logging is async"""
+    def format(self, record):
+        log_data = {
+            "timestamp": datetime.fromtimestamp(record.created).isoformat(),
+            "level": record.levelname,
+            "message": record.getMessage(),
+            **getattr(record, "structured", {})
+        }
+        return _dumps(log_data)
+
+
+class _NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Hands raw records to the queue: no formatting on the caller, drops instead of blocking when full"""
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _parse_sampling(spec: str):
+    """'API Request=0.1,LOW_RES DETECTED=0.05' -> [(prefix, rate), ...]"""
+    rules = []
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        prefix, _, rate = item.rpartition("=")
+        try:
+            rules.append((prefix, max(0.0, min(1.0, float(rate)))))
+        except ValueError:
+            continue
+    return rules
+
+
 class StructuredLogger:
     def __init__(self, name="DHUND"):
         self.logger = logging.getLogger(name)
-        self.logger.setLevel(logging.INFO)
-        
+        self.logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+        self.logger.propagate = False
+        self.sampling_rules = _parse_sampling(os.getenv("LOG_SAMPLING", ""))
+        self.listener = None
+        self.queue_handler = None
+
         # Avoid duplicate handlers
         if not self.logger.handlers:
-            handler = logging.StreamHandler()
-            formatter = logging.Formatter('%(message)s')
-            handler.setFormatter(formatter)
-            self.logger.addHandler(handler)
+            handler = self._handler = logging.StreamHandler()
+            handler.setFormatter(JSONFormatter())
+            if os.getenv("LOG_ASYNC", "true").lower() == "true":
+                # Formatting and stream I/O happen on a background thread
+                log_queue = queue.Queue(maxsize=int(os.getenv("LOG_QUEUE_SIZE", "10000")))
+                self.queue_handler = _NonBlockingQueueHandler(log_queue)
+                self.listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+                self.listener.start()
+                self.logger.addHandler(self.queue_handler)
+                atexit.register(self.shutdown)
+            else:
+                self.logger.addHandler(handler)
+
+    def _sampled_out(self, message: str) -> bool:
+        for prefix, rate in self.sampling_rules:
+            if message.startswith(prefix):
+                return random.random() >= rate
+        return False
 
     def _log(self, level, message, **kwargs):
-        log_data = {
-            "timestamp": datetime.now().isoformat(),
-            "level": level,
-            "message": message,
-            **kwargs
-        }
-        self.logger.info(json.dumps(log_data))
+        if not self.logger.isEnabledFor(level):
+            return
+        # Only high-volume informational events are sampled; warnings and errors always go out
+        if level <= logging.INFO and self.sampling_rules and self._sampled_out(message):
+            return
+        self.logger.log(level, message, extra={"structured": kwargs})
 
     def info(self, message, **kwargs):
-        self._log("INFO", message, **kwargs)
+        self._log(logging.INFO, message, **kwargs)
 
     def error(self, message, **kwargs):
-        self._log("ERROR", message, **kwargs)
+        self._log(logging.ERROR, message, **kwargs)
 
     def warning(self, message, **kwargs):
-        self._log("WARNING", message, **kwargs)
+        self._log(logging.WARNING, message, **kwargs)
 
     def debug(self, message, **kwargs):
-        self._log("DEBUG", message, **kwargs)
+        self._log(logging.DEBUG, message, **kwargs)
+
+    def stats(self) -> dict:
+        return {
+            "level": logging.getLevelName(self.logger.level),
+            "async": self.listener is not None,
+            "queued": self.queue_handler.queue.qsize() if self.queue_handler else 0,
+            "dropped": self.queue_handler.dropped if self.queue_handler else 0,
+        }
+
+    def shutdown(self):
+        """Drain queued records and stop the background writer"""
+        if self.listener:
+            self.listener.stop()
+            self.listener = None
+            # Anything logged after shutdown is written synchronously
+            self.logger.removeHandler(self.queue_handler)
+            self.logger.addHandler(self._handler)
 
 logger = StructuredLogger()
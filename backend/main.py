@@ -1,28 +1,51 @@
 import os
+import time
+import asyncio
 from datetime import datetime
 import json
-from fastapi import FastAPI, File, UploadFile, HTTPException, Request, Form
-from typing import Optional
+from fastapi import FastAPI, File, UploadFile, HTTPException, Request, Form, WebSocket, WebSocketDisconnect
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
+from contextlib import aclosing, asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-import uvicorn
-import shutil
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
 # Import our modules
-from .models import MissingPerson, SearchResult, CitizenReport
-from .ai_engine import AIEngine
+from .face_pipeline import as_face_vector
+from .models import MissingPerson, SearchResult, CitizenReport, SearchFilters
+from .ai_engine import AIEngine, PROGRESSION_SCENARIOS, iterate_in_thread
 from .database import Database
 from .cloud_storage import CloudStorage
+from .alert_broker import AlertBroker
+from .progression_cache import ProgressionCache, ProgressionPrecomputer, photo_digest
+from .report_dedup import ReportCluster, ReportDeduplicator, normalize_description
+from .scheduler import SchedulerOverloaded, VerificationScheduler
+from .admission import AdmissionController
+from .http_cache import ResponseCache
+from .lazy import LazyComponent
+from .lifecycle import ResourceManager, WARMUP_ON_STARTUP, SHUTDOWN_FLUSH_TIMEOUT_SECONDS
 from .logger import logger
+from .openai_integration import grok_guard, embeddings_guard
+from .upload_validation import UploadRejected, save_validated
+from . import metrics, profiling, tracing
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm-up runs on a thread: startup (and Mangum's first invocation) never waits on model loading
+    if WARMUP_ON_STARTUP:
+        resources.warm_up_in_background()
+    yield
+    await resources.shutdown()
 
 app = FastAPI(
     title="DHUND API", 
     description="Production-grade AI Recovery System for Missing Persons",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware - In production, this should be restricted to specific domains
@@ -35,10 +58,69 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize components
-ai_engine = AIEngine()
-db = Database()
-cloud = CloudStorage()
+# Components are built on first use so cold starts only pay for what the route touches
+# (e.g. GET /api/missing-persons never loads the vision stack or the Grok client)
+ai_engine = LazyComponent(AIEngine, "ai_engine")
+db = LazyComponent(Database, "database")
+cloud = LazyComponent(CloudStorage, "cloud_storage")
+alert_broker = AlertBroker.from_env(persist=lambda topic, payloads: cloud.send_realtime_alerts(topic, payloads))
+report_dedup = ReportDeduplicator.from_env()
+scheduler = VerificationScheduler.from_env()
+admission = AdmissionController.from_env()
+# Polled dashboard reads (missing persons, sightings, search status), revalidated by ETag
+response_cache = ResponseCache()
+progression_cache = ProgressionCache.from_env(load=lambda key: cloud.download_json(key),
+                                              store=lambda key, variation: cloud.upload_json(key, variation))
+progression_precompute = ProgressionPrecomputer.from_env(job=lambda case, horizons: _precompute_progressions(case, horizons))
+
+# Warm-up order: cheap clients/pools first, then the vision stack
+resources = ResourceManager()
+resources.on_warmup("database", db.get)
+resources.on_warmup("cloud_storage", cloud.get)
+resources.on_warmup("grok_client", ai_engine.get)
+resources.on_warmup("vision_models", lambda: ai_engine.warm_up())
+resources.on_warmup("embedding_index", lambda: db.sync_embedding_store(force=True))
+resources.on_warmup("lexical_index", lambda: db.sync_lexical_index(force=True))
+resources.on_warmup("face_index", lambda: db.sync_face_store(force=True))
+# Shutdown order: pending alerts first (they may log and trace), then traces, then the log queue
+resources.on_shutdown("alert_broker", lambda: alert_broker.close(SHUTDOWN_FLUSH_TIMEOUT_SECONDS))
+resources.on_shutdown("progression_precompute", progression_precompute.stop)
+resources.on_shutdown("storage_http_pool", lambda: cloud.close() if cloud.initialized else None)
+resources.on_shutdown("trace_exporter", lambda: tracing.exporter.flush())
+resources.on_shutdown("logger", logger.shutdown)
+
+# Scrape-time gauges for component state
+_CIRCUIT_STATES = {"closed": 0, "half_open": 1, "open": 2}
+metrics.registry.gauge(
+    "dhund_grok_circuit_state", "Grok circuit breaker state (0=closed, 1=half_open, 2=open)",
+    callback=lambda: {(): _CIRCUIT_STATES[grok_guard.stats()["circuit_state"]]})
+metrics.registry.gauge(
+    "dhund_grok_concurrency_limit", "Adaptive concurrency limit for Grok calls",
+    callback=lambda: {(): grok_guard.stats()["concurrency_limit"]})
+metrics.registry.gauge(
+    "dhund_alert_subscribers", "Connected realtime alert subscribers",
+    callback=lambda: {(): alert_broker.stats()["subscribers"]})
+metrics.registry.gauge(
+    "dhund_embedding_store_rows", "Live rows in the local memory-mapped embedding store",
+    callback=lambda: {(): len(db.embedding_store)} if db.initialized else {})
+metrics.registry.gauge(
+    "dhund_lexical_index_documents", "Cases in the in-process BM25 index",
+    callback=lambda: {(): len(db.lexical_index)} if db.initialized else {})
+metrics.registry.gauge(
+    "dhund_report_clusters_open", "Near-duplicate citizen report clusters inside their dedup window",
+    callback=lambda: {(): report_dedup.stats()["open_clusters"]})
+metrics.registry.gauge(
+    "dhund_scheduler_queue_depth", "Verification/analysis jobs waiting for a scheduler slot",
+    ("kind", "priority"), callback=lambda: scheduler.queue_depths())
+metrics.registry.gauge(
+    "dhund_scheduler_running", "Verification/analysis jobs holding a scheduler slot",
+    callback=lambda: {(): scheduler.stats()["running"]})
+metrics.registry.gauge(
+    "dhund_admission_inflight", "Admitted requests in flight per endpoint class",
+    ("endpoint_class",), callback=lambda: admission.inflight())
+metrics.registry.gauge(
+    "dhund_log_queue_depth", "Log records waiting for the background writer",
+    callback=lambda: {(): logger.stats()["queued"]})
 
 # Setup upload directory
 TMP_DIR = os.environ.get("TMPDIR", "/tmp")
@@ -48,17 +130,173 @@ os.makedirs(UPLOADS_DIR, exist_ok=True)
 # Mount static files for local development/debugging
 app.mount("/local-uploads", StaticFiles(directory=UPLOADS_DIR), name="uploads")
 
+# Sightings submitted without a person_id are screened against every open case: the local prefilter
+# keeps PREFILTER_K cases, and only the VERIFY_TOP_K best reach the remote vision model
+SCREENING_PREFILTER_K = int(os.getenv("SCREENING_PREFILTER_K", "50"))
+SCREENING_VERIFY_TOP_K = int(os.getenv("SCREENING_VERIFY_TOP_K", "3"))
+SCREENING_VERIFY_CONCURRENCY = int(os.getenv("SCREENING_VERIFY_CONCURRENCY", "3"))
+
+def _save_upload(upload: UploadFile, prefix: str, kind: str = "image") -> str:
+    """Persist an uploaded file to the temporary uploads directory for processing, after the admission
+    checks (size, magic bytes, header dimensions); junk is refused with 413/415/422 before any model runs"""
+    os.makedirs(UPLOADS_DIR, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(upload.filename or "upload"))[0]
+    try:
+        path, _ = save_validated(upload.file, UPLOADS_DIR, f"{prefix}_{datetime.now().timestamp()}_{stem}",
+                                 kind=kind, declared_size=upload.size)
+    except UploadRejected as e:
+        metrics.upload_rejections.inc(kind=kind, status=str(e.status_code))
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    return path
+
+def _remove_temp_file(path: Optional[str]):
+    if path and os.path.exists(path):
+        try: os.remove(path)
+        except: pass
+
+def _verification_slot(person_id: int, case: Dict):
+    """Scheduler slot for verifying a sighting of `case`: child cases first, fair share per case"""
+    return scheduler.slot("verification", person_id, scheduler.priority_for(case.get('age')), case.get('reported_date'))
+
+async def _relay_in_slot(slot, stream: AsyncIterator[Dict]) -> AsyncIterator[Dict]:
+    """
+    Run a pipeline stream under a scheduler slot in its own task and relay its events through a queue,
+    so the slot is freed when the pipeline finishes rather than when a slow SSE client has read every
+    event. Re-raises what the pipeline raised (SchedulerOverloaded included); closing the relay
+    (client gone) cancels the pipeline.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    done = object()
+
+    async def pump():
+        try:
+            async with slot, aclosing(stream):
+                async for event in stream:
+                    queue.put_nowait(event)
+        finally:
+            queue.put_nowait(done)
+
+    task = asyncio.create_task(pump())
+    try:
+        while (event := await queue.get()) is not done:
+            yield event
+        await task
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+def _overloaded(e: SchedulerOverloaded) -> HTTPException:
+    return HTTPException(status_code=503, detail=f"Verification capacity exhausted ({e.reason}), retry later",
+                         headers={"Retry-After": str(e.retry_after)})
+
+def _json_default(value):
+    # numpy scalars/arrays leak out of the vision stages
+    return value.tolist() if hasattr(value, "tolist") else str(value)
+
+def _event_stream_response(events: AsyncIterator[Dict], request: Request, fmt: Optional[str]) -> StreamingResponse:
+    """Encode pipeline events as SSE (default) or NDJSON (format=ndjson or Accept: application/x-ndjson)"""
+    use_ndjson = fmt == "ndjson" or (fmt is None and "application/x-ndjson" in request.headers.get("accept", ""))
+
+    async def body():
+        async for event in events:
+            if use_ndjson:
+                yield json.dumps(event, default=_json_default) + "\n"
+            else:
+                yield f"event: {event['event']}\ndata: {json.dumps(event['data'], default=_json_default)}\n\n"
+
+    return StreamingResponse(
+        body(),
+        media_type="application/x-ndjson" if use_ndjson else "text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.middleware("http")
+async def admission_control(request: Request, call_next):
+    """Per-class in-flight caps and per-client token buckets, checked before the upload body is read"""
+    endpoint_class = admission.classify(request.method, request.url.path)
+    if endpoint_class is None:
+        return await call_next(request)
+    rejection = admission.admit(endpoint_class, admission.client_key(
+        request.headers, request.client.host if request.client else None))
+    if rejection:
+        reason, retry_after = rejection
+        metrics.admission_rejections.inc(endpoint_class=endpoint_class, reason=reason)
+        detail = "Too many requests from this client" if reason == "rate" else "Server busy, too many requests in flight"
+        return JSONResponse(status_code=429, content={"detail": detail}, headers={"Retry-After": str(retry_after)})
+    try:
+        response = await call_next(request)
+    except BaseException:
+        admission.release(endpoint_class)
+        raise
+    body_iterator = response.body_iterator
+
+    async def admitted_body():
+        # Streaming endpoints keep working while the body is sent; the slot is held until it is drained
+        try:
+            async for chunk in body_iterator:
+                yield chunk
+        finally:
+            admission.release(endpoint_class)
+
+    response.body_iterator = admitted_body()
+    return response
+
+@app.middleware("http")
+async def profile_requests(request: Request, call_next):
+    """Opt-in profiling (X-Profile-Token or PROFILE_SAMPLE_RATE); runs inside the request's trace"""
+    session = profiling.begin(request.headers, request.method, request.url.path)
+    if session is None:
+        return await call_next(request)
+    session.trace_id = tracing.current_trace_id()
+    try:
+        response = await call_next(request)
+    except Exception:
+        session.finish()
+        raise
+    session.route = getattr(request.scope.get("route"), "path", request.url.path)
+    session.status_code = response.status_code
+    response.headers["X-Profile-Id"] = session.profile_id
+    body_iterator = response.body_iterator
+
+    async def profiled_body():
+        # Streaming endpoints do their work while the body is sent; stop only once it is drained
+        try:
+            async for chunk in body_iterator:
+                yield chunk
+        finally:
+            session.stop()
+            await asyncio.to_thread(session.finish)
+
+    response.body_iterator = profiled_body()
+    return response
+
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
     start_time = datetime.now()
-    response = await call_next(request)
+    with tracing.start_trace(f"{request.method} {request.url.path}", request.headers.get("traceparent"),
+                             **{"http.method": request.method, "http.target": request.url.path}) as root_span:
+        response = await call_next(request)
+        # Label by route template (not raw path) to keep histogram cardinality bounded
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        if root_span:
+            root_span.name = f"{request.method} {route}"
+            root_span.set_attribute("http.status_code", response.status_code)
+            if response.status_code >= 500:
+                root_span.error = f"HTTP {response.status_code}"
+            response.headers["X-Trace-Id"] = root_span.trace.trace_id
     duration = (datetime.now() - start_time).total_seconds()
     
+    metrics.http_request_duration.observe(duration, method=request.method, route=route,
+                                          status=str(response.status_code))
+    if response.status_code >= 500:
+        metrics.http_errors.inc(route=route)
+    
     logger.info(
         f"API Request: {request.method} {request.url.path}",
         status_code=response.status_code,
         duration=f"{duration:.3f}s",
-        client_ip=request.client.host
+        client_ip=request.client.host,
+        trace_id=root_span.trace.trace_id if root_span else None
     )
     return response
 
@@ -73,21 +311,128 @@ async def root():
         "timestamp": datetime.now().isoformat()
     }
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus text exposition of latency histograms and counters"""
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/system/embedding-store")
+async def get_embedding_store_stats(recall_queries: int = 0, k: int = 10):
+    """Local embedding store size/quantization; recall_queries > 0 also measures quantized recall@k"""
+    stats = db.embedding_store.stats()
+    if recall_queries > 0:
+        stats["recall"] = await asyncio.to_thread(db.embedding_store.measure_recall, k, min(recall_queries, 500))
+    stats["lexical_index"] = db.lexical_index.stats()
+    stats["face_store"] = db.face_store.stats()
+    return stats
+
+@app.get("/api/system/warmup")
+async def get_warmup_status():
+    """Warm-up state of each preloaded resource"""
+    return resources.status()
+
+@app.post("/api/system/warmup")
+async def warm_up(force: bool = False):
+    """Load models, clients and pools now (e.g. from a scheduled ping) so the next heavy request is warm"""
+    return await asyncio.to_thread(resources.warm_up, force)
+
+@app.get("/api/system/progression-cache")
+async def get_progression_cache_stats():
+    """Age-progression cache hit rates and the off-peak precompute queue"""
+    return {"cache": progression_cache.stats(), "precompute": progression_precompute.stats()}
+
+@app.post("/api/system/progression-cache/precompute")
+async def run_progression_precompute():
+    """Precompute every queued case now, ignoring the off-peak window"""
+    cases = await asyncio.to_thread(progression_precompute.run_pending, True)
+    return {"cases_precomputed": cases, **progression_precompute.stats()}
+
+@app.get("/api/system/scheduler")
+async def get_scheduler_stats():
+    """Verification/analysis slots in use, queue depth by kind and priority, rejections"""
+    return scheduler.stats()
+
+@app.get("/api/system/admission")
+async def get_admission_stats():
+    """In-flight requests per endpoint class, limits and 429 counts"""
+    return admission.stats()
+
+@app.get("/api/system/http-cache")
+async def get_http_cache_stats():
+    """Cached read responses, hits, 304s and bytes saved by compression"""
+    return response_cache.stats()
+
+@app.get("/api/admin/profiles")
+async def list_profiles(request: Request, limit: int = 50):
+    """Captured request profiles, newest first (requires X-Profile-Token)"""
+    if not profiling.is_authorized(request.headers.get("x-profile-token")):
+        raise HTTPException(status_code=403, detail="Profiling token required")
+    return {"profiles": await asyncio.to_thread(profiling.list_profiles, limit)}
+
+@app.get("/api/admin/profiles/{profile_id}")
+async def get_profile(request: Request, profile_id: str, artifact: Optional[str] = None):
+    """Profile summary, or one artifact: folded (flamegraph stacks), pstats, text, allocations"""
+    if not profiling.is_authorized(request.headers.get("x-profile-token")):
+        raise HTTPException(status_code=403, detail="Profiling token required")
+    if artifact:
+        path = profiling.artifact_path(profile_id, artifact)
+        if not path:
+            raise HTTPException(status_code=404, detail="Profile artifact not found")
+        return FileResponse(path, media_type=profiling.ARTIFACTS[artifact][1], filename=os.path.basename(path))
+    summary = await asyncio.to_thread(profiling.load_summary, profile_id)
+    if not summary:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return summary
+
+@app.get("/api/system/resilience")
+async def get_resilience_state():
+    """Rate governor, adaptive concurrency and circuit breaker state for the Grok and embeddings links"""
+    return {
+        "status": "success",
+        "mock_mode": ai_engine.openai_service.mock_mode,
+        "grok": grok_guard.stats(),
+        "embeddings": embeddings_guard.stats()
+    }
+
+def _persist_missing_person(name: str, age: int, description: str, cloud_url: Optional[str],
+                            analysis_results: Dict, region: Optional[str] = None) -> Tuple[int, str]:
+    """Embed the case context and save it; returns (person_id, stored photo path)"""
+    # Generate semantic embedding for search
+    openai_service = ai_engine.openai_service
+    searchable_text = f"Name: {name}, Age: {age}, Context: {description}"
+    embedding = openai_service.generate_embeddings(searchable_text)
+    
+    # If cloud_url is missing, we use a placeholder for production safety
+    final_photo_path = cloud_url or "https://placehold.co/600x400?text=Photo+Pending+Upload"
+    
+    missing_person = MissingPerson(
+        name=name,
+        age=age,
+        description=description,
+        photo_path=final_photo_path,
+        reported_date=datetime.now(),
+        region=region
+    )
+    
+    person_id = db.save_missing_person(missing_person, analysis_results, embedding)
+    if person_id and cloud_url:
+        # Common future ages are generated off-peak so the first progression view is a cache hit
+        progression_precompute.enqueue({"id": person_id, "photo_path": cloud_url, "age": age})
+    return person_id, final_photo_path
+
 @app.post("/api/report-missing")
 async def report_missing_person(
     name: str,
     age: int,
     description: str,
-    photo: UploadFile = File(...)
+    photo: UploadFile = File(...),
+    region: Optional[str] = None
 ):
     """Report a missing person with AI analysis and cloud persistence"""
     photo_path = None
     try:
         # 1. Securely save uploaded photo to temporary storage for processing
-        os.makedirs(UPLOADS_DIR, exist_ok=True)
-        photo_path = os.path.join(UPLOADS_DIR, f"report_{datetime.now().timestamp()}_{photo.filename}")
-        with open(photo_path, "wb") as buffer:
-            shutil.copyfileobj(photo.file, buffer)
+        photo_path = _save_upload(photo, "report")
         
         # 2. Upload to persistent Cloud Storage immediately
         cloud_url = cloud.upload_image(photo_path, folder="reports")
@@ -95,27 +440,11 @@ async def report_missing_person(
             logger.warning("Cloud upload failed during reporting, falling back to local path")
         
         # 3. Process with AI Engine (Intelligence Matrix)
-        analysis_results = await ai_engine.analyze_missing_person(photo_path, age, description)
-        
-        # 4. Generate semantic embedding for search
-        from .openai_integration import OpenAIIntegration
-        openai_service = OpenAIIntegration()
-        searchable_text = f"Name: {name}, Age: {age}, Context: {description}"
-        embedding = openai_service.generate_embeddings(searchable_text)
+        async with scheduler.slot("analysis", None, scheduler.priority_for(age), datetime.now()):
+            analysis_results = await ai_engine.analyze_missing_person(photo_path, age, description)
         
-        # 5. Save to persistent Database
-        # If cloud_url is missing, we use a placeholder for production safety
-        final_photo_path = cloud_url or "https://placehold.co/600x400?text=Photo+Pending+Upload"
-        
-        missing_person = MissingPerson(
-            name=name,
-            age=age,
-            description=description,
-            photo_path=final_photo_path,
-            reported_date=datetime.now()
-        )
-        
-        person_id = db.save_missing_person(missing_person, analysis_results, embedding)
+        # 4-5. Generate semantic embedding and save to persistent Database
+        person_id, final_photo_path = _persist_missing_person(name, age, description, cloud_url, analysis_results, region)
         
         if not person_id:
             raise HTTPException(status_code=500, detail="Database persistence failed")
@@ -127,124 +456,480 @@ async def report_missing_person(
             "ai_analysis": analysis_results
         }
     
+    except HTTPException:
+        raise
+    except SchedulerOverloaded as e:
+        raise _overloaded(e)
     except Exception as e:
         logger.error("Error in report_missing_person", error=str(e))
         raise HTTPException(status_code=500, detail=f"System error during reporting: {str(e)}")
     finally:
         # Cleanup temporary files
-        if photo_path and os.path.exists(photo_path):
-            try: os.remove(photo_path)
-            except: pass
+        _remove_temp_file(photo_path)
+
+@app.post("/api/report-missing/stream")
+async def report_missing_person_stream(
+    request: Request,
+    name: str,
+    age: int,
+    description: str,
+    photo: UploadFile = File(...),
+    format: Optional[str] = None,
+    region: Optional[str] = None
+):
+    """Streaming variant of /api/report-missing: emits each analysis stage and LLM tokens as they finish"""
+    photo_path = _save_upload(photo, "report")
+
+    async def events():
+        # Cloud upload runs alongside the analysis instead of in front of it
+        upload_task = asyncio.create_task(asyncio.to_thread(cloud.upload_image, photo_path, "reports"))
+        try:
+            analysis_results = None
+            slot = scheduler.slot("analysis", None, scheduler.priority_for(age), datetime.now())
+            pipeline = ai_engine.analyze_missing_person_stream(photo_path, age, description)
+            async with aclosing(_relay_in_slot(slot, pipeline)) as stream:
+                async for event in stream:
+                    yield event
+                    if event["event"] == "error":
+                        return
+                    if event["event"] == "analysis":
+                        analysis_results = event["data"]
+
+            cloud_url = await upload_task
+            if not cloud_url:
+                logger.warning("Cloud upload failed during reporting, falling back to local path")
+            person_id, final_photo_path = await asyncio.to_thread(
+                _persist_missing_person, name, age, description, cloud_url, analysis_results, region
+            )
+            if not person_id:
+                yield {"event": "error", "data": {"error": "Database persistence failed"}}
+                return
+            yield {"event": "result", "data": {
+                "status": "success",
+                "person_id": person_id,
+                "cloud_url": cloud_url or final_photo_path,
+                "ai_analysis": analysis_results
+            }}
+        except SchedulerOverloaded as e:
+            yield {"event": "error", "data": {"error": "Verification capacity exhausted, retry later",
+                                              "retry_after": e.retry_after}}
+        except Exception as e:
+            logger.error("Error in report_missing_person_stream", error=str(e))
+            yield {"event": "error", "data": {"error": f"System error during reporting: {str(e)}"}}
+        finally:
+            await asyncio.gather(upload_task, return_exceptions=True)
+            _remove_temp_file(photo_path)
+
+    return _event_stream_response(events(), request, format)
+
+def _resolve_target_photo(person_id: int, person_data: Dict) -> Tuple[Optional[str], bool]:
+    """Local path for the case photo, downloading cloud URLs; returns (path, is_temp_copy)"""
+    target_photo_url = person_data.get('photo_path')
+    target_photo_path = os.path.join(UPLOADS_DIR, f"target_{person_id}_{datetime.now().timestamp()}.jpg")
+    
+    # Download target photo if it's a URL
+    if target_photo_url and target_photo_url.startswith('http'):
+        if cloud.download_image(target_photo_url, target_photo_path):
+            return target_photo_path, True
+        return target_photo_url, False # Fallback to URL
+    return target_photo_url, False
+
+def _sighting_context(location: str, description: str) -> str:
+    return f"Location: {location}, Observations: {description}"
+
+async def _screen_open_cases(sighting_path: str, location: str, description: str) -> Dict:
+    """
+    1:N matching for a sighting without a person_id, cheapest stage first: local face/BM25/text
+    prefilter over every open case, case-specific location plausibility, then the full vision
+    verification for the top few only (concurrently, bounded)
+    """
+    timings = {}
+    start = time.perf_counter()
+    context = _sighting_context(location, description)
+    sighting_face, embedding = await asyncio.gather(
+        asyncio.to_thread(ai_engine.face_pipeline.encode, sighting_path),
+        asyncio.to_thread(ai_engine.openai_service.generate_embeddings, context)
+    )
+    candidates = await asyncio.to_thread(db.screen_open_cases, sighting_face, f"{location} {description}",
+                                         embedding, SCREENING_PREFILTER_K)
+    timings["prefilter_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+    stage = time.perf_counter()
+    for case in candidates:
+        case['location_plausibility'] = ai_engine.case_location_plausibility(location, case)
+        case['screening_score'] = round(case['prefilter_score'] * case['location_plausibility'] / 100, 6)
+    candidates.sort(key=lambda case: case['screening_score'], reverse=True)
+    shortlist = candidates[:SCREENING_VERIFY_TOP_K]
+    timings["location_ms"] = round((time.perf_counter() - stage) * 1000, 1)
+
+    stage = time.perf_counter()
+    semaphore = asyncio.Semaphore(SCREENING_VERIFY_CONCURRENCY)
+
+    async def verify(case: Dict) -> Dict:
+        async with semaphore, _verification_slot(case['id'], case):
+            target_photo_path, is_temp_target = await asyncio.to_thread(_resolve_target_photo, case['id'], case)
+            try:
+                return await ai_engine.verify_citizen_sighting(
+                    target_photo_path, sighting_path, location, description,
+                    target_face=as_face_vector(case.get('face_encoding')), sighting_face=sighting_face
+                )
+            finally:
+                if is_temp_target:
+                    _remove_temp_file(target_photo_path)
+
+    verifications = await asyncio.gather(*(verify(case) for case in shortlist))
+    timings["verification_ms"] = round((time.perf_counter() - stage) * 1000, 1)
+
+    matches = []
+    for case, verification in zip(shortlist, verifications):
+        verification.pop('face_encoding', None)
+        matches.append({
+            "person_id": case['id'],
+            "name": case.get('name'),
+            "region": case.get('region'),
+            "prefilter_score": case['prefilter_score'],
+            "face_similarity": case['face_similarity'],
+            "lexical_score": case['lexical_score'],
+            "text_similarity": case['text_similarity'],
+            "location_plausibility": case['location_plausibility'],
+            "verification": verification
+        })
+    matches.sort(key=lambda match: match['verification'].get('confidence', 0.0), reverse=True)
+    verified = [match for match in matches if match['verification'].get('verified')]
+    best = verified[0] if verified else None
+    timings["total_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    logger.info("Open case screening finished", candidates=len(candidates), verified=len(verified),
+                best=best['person_id'] if best else None, **timings)
+    return {
+        "matches": matches,
+        "best_match": best,
+        # The persisted report carries the best verified match's verdict (or the strongest rejection)
+        "verification": {**(best or matches[0])['verification'],
+                         "face_encoding": sighting_face.tolist() if sighting_face is not None else None}
+                        if matches else {"verified": False, "confidence": 0.0},
+        "embedding": embedding,
+        "cascade": {"prefilter_candidates": len(candidates), "verified_top_k": len(shortlist),
+                    "timings": timings}
+    }
+
+# Stored in place of the sighting photo's URL when the upload failed
+SIGHTING_PHOTO_PLACEHOLDER = "https://placehold.co/600x400?text=Sighting+Photo+Pending+Upload"
+
+def _persist_citizen_report(person_id: Optional[int], location: str, description: str, reporter_phone: str,
+                            sighting_path: str, verification: Dict,
+                            embedding: Optional[List[float]] = None) -> Tuple[int, Optional[str]]:
+    """Upload the sighting photo, save the report and raise alerts; returns (report_id, cloud_url)"""
+    # 4. Upload to Cloud
+    cloud_url = cloud.upload_image(sighting_path, folder="sightings")
+    
+    # 5. Save Report
+    # If cloud_url is missing, we use a placeholder for production safety
+    final_sighting_photo = cloud_url or SIGHTING_PHOTO_PLACEHOLDER
+    
+    report = CitizenReport(
+        person_id=person_id,
+        location=location,
+        description=description,
+        reporter_phone=reporter_phone,
+        sighting_photo=final_sighting_photo,
+        verification_score=verification['confidence'],
+        report_time=datetime.now(),
+        face_encoding=verification.pop('face_encoding', None)
+    )
+    
+    # Generate embedding for report context (open-case screening has already computed it)
+    if embedding is None:
+        openai_service = ai_engine.openai_service
+        embedding = openai_service.generate_embeddings(_sighting_context(location, description))
+    
+    report_id = db.save_citizen_report(report, embedding)
+    
+    # 6. Trigger Real-time Alerts if verified (fan-out and persistence happen off the request path)
+    if verification['verified'] and person_id is not None:
+        alert_broker.publish("sightings", {
+            "person_id": person_id,
+            "location": location,
+            "confidence": verification['confidence'],
+            "ai_insight": verification.get('ai_analysis', ""),
+            "timestamp": datetime.now().isoformat()
+        })
+    return report_id, cloud_url
+
+def _record_duplicate_report(report_id: int, count: int, location: str, description: str,
+                             reporter_phone: str, sighting_path: str):
+    """Keep a merged report's photo and reporter on its cluster (they are not verified again)"""
+    cloud_url = cloud.upload_image(sighting_path, folder="sightings")
+    db.update_report_cluster(report_id, count, CitizenReport(
+        person_id=None,
+        location=location,
+        description=description,
+        reporter_phone=reporter_phone,
+        sighting_photo=cloud_url or SIGHTING_PHOTO_PLACEHOLDER,
+        verification_score=0.0,
+        report_time=datetime.now()
+    ))
+
+async def _join_report_cluster(person_id: int, location: str, description: str, reporter_phone: str,
+                               sighting_path: str) -> Tuple[Optional[ReportCluster], Optional[Dict]]:
+    """
+    Near-duplicate check for a sighting of a known case. Returns (cluster, None) when this report opens
+    a cluster (verify it, then resolve the cluster), (None, response) when it merged into an already
+    verified one, and (None, None) when dedup is off or the cluster's first report failed.
+    """
+    if not report_dedup.enabled:
+        return None, None
+    embedding = None
+    if ai_engine.openai_service.embeddings_client is not None:
+        # Hash embeddings only match identical text; without a semantic backend claim() compares token sets
+        embedding = await asyncio.to_thread(ai_engine.openai_service.generate_embeddings,
+                                            normalize_description(description))
+    cluster, is_new = report_dedup.claim(person_id, location, description, embedding)
+    if is_new:
+        return cluster, None
+    if not await cluster.wait():
+        return None, None
+    count = cluster.count
+    await asyncio.to_thread(_record_duplicate_report, cluster.report_id, count, location, description,
+                            reporter_phone, sighting_path)
+    metrics.report_duplicates.inc()
+    return None, {
+        "status": "success",
+        "report_id": cluster.report_id,
+        "verification": cluster.verification,
+        "duplicate_of": cluster.report_id,
+        "cluster_size": count,
+        "persistence": "merged"
+    }
 
 @app.post("/api/citizen-report")
 async def citizen_report_sighting(
-    person_id: int,
     location: str,
     description: str,
     reporter_phone: str,
-    sighting_photo: UploadFile = File(...)
+    sighting_photo: UploadFile = File(...),
+    person_id: Optional[int] = None
 ):
-    """Citizen reports sighting with Multi-Modal AI verification"""
-    sighting_path = None
+    """Citizen reports sighting with Multi-Modal AI verification (screened against all open cases when no person_id is given)"""
+    sighting_path, cluster = None, None
+    target_photo_path, is_temp_target = None, False
     try:
         # 1. Save sighting photo temporarily
-        sighting_path = os.path.join(UPLOADS_DIR, f"sighting_{datetime.now().timestamp()}_{sighting_photo.filename}")
-        with open(sighting_path, "wb") as buffer:
-            shutil.copyfileobj(sighting_photo.file, buffer)
+        sighting_path = _save_upload(sighting_photo, "sighting")
         
+        if person_id is None:
+            screening = await _screen_open_cases(sighting_path, location, description)
+            best = screening["best_match"]
+            report_id, cloud_url = await asyncio.to_thread(
+                _persist_citizen_report, best['person_id'] if best else None, location, description,
+                reporter_phone, sighting_path, screening["verification"], screening["embedding"]
+            )
+            return {
+                "status": "success",
+                "mode": "open_case_screening",
+                "report_id": report_id,
+                "best_match": best,
+                "matches": screening["matches"],
+                "cascade": screening["cascade"],
+                "persistence": "cloud_verified" if cloud_url else "local_fallback"
+            }
+
         # 2. Get person data for comparison
         person_data = db.get_missing_person(person_id)
         if not person_data:
             raise HTTPException(status_code=404, detail="Target person ID not found in neural network")
+
+        # Bursts of near-identical reports are verified once per cluster
+        cluster, duplicate = await _join_report_cluster(person_id, location, description, reporter_phone, sighting_path)
+        if duplicate:
+            return duplicate
         
-        target_photo_url = person_data.get('photo_path')
-        target_photo_path = os.path.join(UPLOADS_DIR, f"target_{person_id}_{datetime.now().timestamp()}.jpg")
-        
-        # Download target photo if it's a URL
-        is_temp_target = False
-        if target_photo_url and target_photo_url.startswith('http'):
-            if cloud.download_image(target_photo_url, target_photo_path):
-                is_temp_target = True
-            else:
-                target_photo_path = target_photo_url # Fallback to URL
-        else:
-            target_photo_path = target_photo_url
+        target_photo_path, is_temp_target = _resolve_target_photo(person_id, person_data)
 
         # 3. Verify sighting with Multi-Modal AI (Side-by-Side Comparison)
-        verification = await ai_engine.verify_citizen_sighting(
-            target_photo_path,
-            sighting_path, 
-            location, 
-            description
-        )
+        async with _verification_slot(person_id, person_data):
+            verification = await ai_engine.verify_citizen_sighting(
+                target_photo_path,
+                sighting_path,
+                location,
+                description,
+                target_face=as_face_vector(person_data.get('face_encoding'))
+            )
         
-        # 4. Upload to Cloud
-        cloud_url = cloud.upload_image(sighting_path, folder="sightings")
-        
-        # 5. Save Report
-        # If cloud_url is missing, we use a placeholder for production safety
-        final_sighting_photo = cloud_url or "https://placehold.co/600x400?text=Sighting+Photo+Pending+Upload"
-        
-        report = CitizenReport(
-            person_id=person_id,
-            location=location,
-            description=description,
-            reporter_phone=reporter_phone,
-            sighting_photo=final_sighting_photo,
-            verification_score=verification['confidence'],
-            report_time=datetime.now()
+        # 4-6. Upload, save report and alert
+        report_id, cloud_url = _persist_citizen_report(
+            person_id, location, description, reporter_phone, sighting_path, verification
         )
-        
-        # Generate embedding for report context
-        from .openai_integration import OpenAIIntegration
-        openai_service = OpenAIIntegration()
-        embedding = openai_service.generate_embeddings(f"Location: {location}, Observations: {description}")
-        
-        report_id = db.save_citizen_report(report, embedding)
-        
-        # 6. Trigger Real-time Alerts if verified
-        if verification['verified']:
-            cloud.send_realtime_alert("sightings", {
-                "person_id": person_id,
-                "location": location,
-                "confidence": verification['confidence'],
-                "ai_insight": verification.get('ai_analysis', ""),
-                "timestamp": datetime.now().isoformat()
-            })
+        if cluster:
+            report_dedup.resolve(cluster, report_id, verification)
 
         return {
             "status": "success",
             "report_id": report_id,
             "verification": verification,
+            "cluster_size": 1,
             "persistence": "cloud_verified" if cloud_url else "local_fallback"
         }
     
     except HTTPException:
         raise
+    except SchedulerOverloaded as e:
+        raise _overloaded(e)
     except Exception as e:
         logger.error("Error in citizen_report_sighting", error=str(e))
         raise HTTPException(status_code=500, detail="Neural Verification Interface Error")
     finally:
-        if sighting_path and os.path.exists(sighting_path):
-            try: os.remove(sighting_path)
-            except: pass
+        if cluster and not cluster.resolved:
+            report_dedup.discard(cluster)
+        _remove_temp_file(sighting_path)
+        if is_temp_target:
+            _remove_temp_file(target_photo_path)
+
+@app.post("/api/citizen-report/stream")
+async def citizen_report_sighting_stream(
+    request: Request,
+    person_id: int,
+    location: str,
+    description: str,
+    reporter_phone: str,
+    sighting_photo: UploadFile = File(...),
+    format: Optional[str] = None
+):
+    """Streaming variant of /api/citizen-report: local stages, then vision tokens, then the saved verdict"""
+    person_data = db.get_missing_person(person_id)
+    if not person_data:
+        raise HTTPException(status_code=404, detail="Target person ID not found in neural network")
+    sighting_path = _save_upload(sighting_photo, "sighting")
+
+    async def events():
+        target_photo_path, is_temp_target, cluster = None, False, None
+        try:
+            cluster, duplicate = await _join_report_cluster(person_id, location, description, reporter_phone, sighting_path)
+            if duplicate:
+                yield {"event": "result", "data": duplicate}
+                return
+            target_photo_path, is_temp_target = await asyncio.to_thread(_resolve_target_photo, person_id, person_data)
+            verification = None
+            pipeline = ai_engine.verify_citizen_sighting_stream(
+                target_photo_path, sighting_path, location, description,
+                target_face=as_face_vector(person_data.get('face_encoding'))
+            )
+            async with aclosing(_relay_in_slot(_verification_slot(person_id, person_data), pipeline)) as stream:
+                async for event in stream:
+                    yield event
+                    if event["event"] == "error":
+                        return
+                    if event["event"] == "verification":
+                        verification = event["data"]
+
+            report_id, cloud_url = await asyncio.to_thread(
+                _persist_citizen_report, person_id, location, description, reporter_phone, sighting_path, verification
+            )
+            if cluster:
+                report_dedup.resolve(cluster, report_id, verification)
+            yield {"event": "result", "data": {
+                "status": "success",
+                "report_id": report_id,
+                "verification": verification,
+                "cluster_size": 1,
+                "persistence": "cloud_verified" if cloud_url else "local_fallback"
+            }}
+        except SchedulerOverloaded as e:
+            yield {"event": "error", "data": {"error": "Verification capacity exhausted, retry later",
+                                              "retry_after": e.retry_after}}
+        except Exception as e:
+            logger.error("Error in citizen_report_sighting_stream", error=str(e))
+            yield {"event": "error", "data": {"error": "Neural Verification Interface Error"}}
+        finally:
+            if cluster and not cluster.resolved:
+                report_dedup.discard(cluster)
+            _remove_temp_file(sighting_path)
+            if is_temp_target:
+                _remove_temp_file(target_photo_path)
+
+    return _event_stream_response(events(), request, format)
+
+@app.post("/api/face-search")
+async def face_search(photo: UploadFile = File(...), limit: int = 5, status: str = "missing"):
+    """Open cases whose stored face best matches the face in a photo (local embeddings, no remote vision)"""
+    if not ai_engine.face_pipeline.available:
+        raise HTTPException(status_code=503, detail="Face models not installed (python -m backend.face_pipeline)")
+    photo_path = _save_upload(photo, "face")
+    try:
+        face = await asyncio.to_thread(ai_engine.face_pipeline.encode, photo_path)
+        if face is None:
+            raise HTTPException(status_code=422, detail="No face detected in photo")
+        candidates = await asyncio.to_thread(db.match_faces, face, limit, status=None if status == "any" else status)
+        return {"status": "success", "candidates": candidates, "engine": "yunet_sface_local"}
+    finally:
+        _remove_temp_file(photo_path)
+
+@app.get("/api/alerts/stream")
+async def stream_alerts(request: Request, person_id: Optional[int] = None, region: Optional[str] = None):
+    """Server-sent alert feed, optionally filtered by case or region (location substring)"""
+    subscription = alert_broker.subscribe(person_id=person_id, region=region)
+
+    async def body():
+        try:
+            while not subscription.dropped:
+                batch = await subscription.next_batch(timeout=15)
+                if batch is None:
+                    break
+                if await request.is_disconnected():
+                    break
+                if not batch:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: alerts\ndata: {alert_broker.encode_batch(batch)}\n\n"
+        finally:
+            alert_broker.unsubscribe(subscription)
+
+    return StreamingResponse(body(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.websocket("/ws/alerts")
+async def websocket_alerts(websocket: WebSocket, person_id: Optional[int] = None, region: Optional[str] = None):
+    """WebSocket alert feed, optionally filtered by case or region (location substring)"""
+    await websocket.accept()
+    subscription = alert_broker.subscribe(person_id=person_id, region=region)
+    try:
+        while True:
+            batch = await subscription.next_batch()
+            if batch is None:
+                await websocket.close(code=1013, reason="Consumer too slow")
+                break
+            await websocket.send_text(alert_broker.encode_batch(batch))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        alert_broker.unsubscribe(subscription)
+
+@app.get("/api/alerts/stats")
+async def get_alert_stats():
+    """Alert broker subscriber and delivery counters"""
+    return {"status": "success", "data": alert_broker.stats()}
+
+def _missing_persons_payload() -> Dict:
+    persons = db.get_all_missing_persons()
+    return {"status": "success", "count": len(persons), "data": persons}
+
+def _sightings_payload() -> Dict:
+    sightings = db.get_all_citizen_reports()
+    return {"status": "success", "count": len(sightings), "data": sightings}
 
 @app.get("/api/missing-persons")
-async def get_missing_persons():
-    """Batch fetch all active missing person cases"""
+async def get_missing_persons(request: Request):
+    """Batch fetch all active missing person cases (ETag/Last-Modified, 304 on unchanged data, gzip/br)"""
     try:
-        persons = db.get_all_missing_persons()
-        return {"status": "success", "count": len(persons), "data": persons}
+        return response_cache.respond(request, "missing-persons", db.data_version, _missing_persons_payload)
     except Exception as e:
         logger.error("Error fetching missing persons", error=str(e))
         raise HTTPException(status_code=500, detail="Database retrieval error")
 
 @app.get("/api/sightings")
-async def get_sightings():
-    """Fetch all citizen-reported sightings"""
+async def get_sightings(request: Request):
+    """Fetch all citizen-reported sightings (ETag/Last-Modified, 304 on unchanged data, gzip/br)"""
     try:
-        sightings = db.get_all_citizen_reports()
-        return {"status": "success", "count": len(sightings), "data": sightings}
+        return response_cache.respond(request, "sightings", db.data_version, _sightings_payload)
     except Exception as e:
         logger.error("Error fetching sightings", error=str(e))
         raise HTTPException(status_code=500, detail="Sighting retrieval error")
@@ -264,20 +949,36 @@ async def get_sighting_details(report_id: int):
         raise HTTPException(status_code=500, detail="Neural Link Error")
 
 @app.post("/api/semantic-search")
-async def semantic_search(query: str, limit: int = 10):
-    """Multi-modal semantic search using OpenAI Intelligence Matrix"""
+async def semantic_search(
+    query: str,
+    limit: int = 10,
+    min_age: Optional[int] = None,
+    max_age: Optional[int] = None,
+    status: str = "missing",
+    reported_after: Optional[datetime] = None,
+    reported_before: Optional[datetime] = None,
+    region: Optional[str] = None,
+    mode: str = "hybrid"
+):
+    """Multi-modal semantic search using OpenAI Intelligence Matrix (status=any searches every case).
+    mode=hybrid fuses BM25 over case/report text with vector similarity; mode=vector is embeddings only"""
+    filters = SearchFilters(min_age=min_age, max_age=max_age, status=None if status == "any" else status,
+                            reported_after=reported_after, reported_before=reported_before, region=region)
     try:
-        from .openai_integration import OpenAIIntegration
-        openai_service = OpenAIIntegration()
+        openai_service = ai_engine.openai_service
         
         query_embedding = openai_service.generate_embeddings(query)
-        results = db.semantic_search(query_embedding, limit)
+        if mode == "vector":
+            results = await asyncio.to_thread(db.semantic_search, query_embedding, limit, filters=filters)
+        else:
+            results = await asyncio.to_thread(db.hybrid_search, query, query_embedding, limit, filters)
         
         return {
             "status": "success",
             "query": query,
+            "filters": filters.model_dump(exclude_none=True),
             "results": results,
-            "engine": "pgvector_similarity"
+            "engine": "pgvector_similarity" if mode == "vector" else "bm25_vector_rrf"
         }
     except Exception as e:
         logger.error("Semantic search failed", error=str(e))
@@ -300,16 +1001,8 @@ async def search_cctv_network(person_id: int = Form(...)):
             if "error" not in result:
                 db.save_search_result(person_id, result)
         
-        # Update search status
-        if db.supabase:
-            try:
-                db.supabase.table("search_status").update({
-                    "cameras_searched": len(results),
-                    "matches_found": len([r for r in results if "error" not in r]),
-                    "last_updated": datetime.now().isoformat()
-                }).eq("person_id", person_id).execute()
-            except:
-                pass  # Continue even if status update fails
+        # Update search status (continues even if the status update fails)
+        db.update_search_progress(person_id, len(results), len([r for r in results if "error" not in r]))
         
         return {
             "status": "success",
@@ -329,15 +1022,10 @@ async def process_voice_report(audio: UploadFile = File(...)):
     audio_path = None
     try:
         # Save uploaded audio file temporarily
-        os.makedirs(UPLOADS_DIR, exist_ok=True)
-        audio_path = os.path.join(UPLOADS_DIR, f"voice_{datetime.now().timestamp()}_{audio.filename}")
-        
-        with open(audio_path, "wb") as buffer:
-            shutil.copyfileobj(audio.file, buffer)
+        audio_path = _save_upload(audio, "voice", kind="audio")
         
         # Process voice report
-        from .openai_integration import OpenAIIntegration
-        openai_service = OpenAIIntegration()
+        openai_service = ai_engine.openai_service
         result = openai_service.process_voice_report(audio_path)
         
         return {
@@ -345,6 +1033,8 @@ async def process_voice_report(audio: UploadFile = File(...)):
             "transcript": result.get("transcript", ""),
             "model_used": result.get("model_used", "unknown")
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error("Voice processing failed", error=str(e))
         raise HTTPException(status_code=500, detail=f"Voice processing error: {str(e)}")
@@ -356,6 +1046,37 @@ async def process_voice_report(audio: UploadFile = File(...)):
             except:
                 pass
 
+def _load_case_photo(person_data: Dict, prefix: str) -> Tuple[str, bool]:
+    """Local path to a case photo (download if cloud URL); returns (path, is_temp_copy)"""
+    photo_path = person_data.get('photo_path')
+    if not photo_path:
+        raise HTTPException(status_code=400, detail="Person photo not available. Please upload a photo instead.")
+    
+    # If it's a URL (cloud storage), download it
+    if photo_path.startswith('http://') or photo_path.startswith('https://'):
+        local_photo_path = os.path.join(UPLOADS_DIR, f"{prefix}_downloaded_{datetime.now().timestamp()}.jpg")
+        if not cloud.download_image(photo_path, local_photo_path):
+            raise HTTPException(status_code=500, detail="Failed to download photo from cloud storage")
+        return local_photo_path, True
+    if not os.path.exists(photo_path):
+        raise HTTPException(status_code=400, detail="Person photo not available locally. Please upload a photo instead.")
+    return photo_path, False
+
+def _precompute_progressions(case: Dict, horizons: List[int]) -> int:
+    """Generate and cache a case's variants `horizons` years ahead; returns how many were newly generated"""
+    photo_path, downloaded_photo = _load_case_photo(case, "precompute")
+    try:
+        photo_hash = photo_digest(photo_path)
+        progression_cache.remember_digest(case['photo_path'], photo_hash)
+        result = ai_engine.generate_age_progressions(photo_path, case['age'], [case['age'] + years for years in horizons],
+                                                     cache=progression_cache, photo_hash=photo_hash)
+        if "error" in result:
+            raise RuntimeError(result["error"])
+        return result["generated_variations"]
+    finally:
+        if downloaded_photo:
+            _remove_temp_file(photo_path)
+
 @app.post("/api/age-progression")
 async def generate_age_progression(
     person_id: Optional[int] = Form(None),
@@ -364,7 +1085,7 @@ async def generate_age_progression(
     target_age: int = Form(...)
 ):
     """Generate age progression variations"""
-    photo_path = None
+    photo_path, photo_hash = None, None
     downloaded_photo = False
     try:
         # Either use person_id to get existing photo or use uploaded photo
@@ -372,32 +1093,27 @@ async def generate_age_progression(
             person_data = db.get_missing_person(person_id)
             if not person_data:
                 raise HTTPException(status_code=404, detail="Person not found")
+            # Repeat views of a known case photo are answered from the cache without downloading it
+            photo_hash = progression_cache.digest_of(person_data.get('photo_path'))
+            cached = photo_hash and ai_engine.cached_age_progression(photo_hash, current_age, target_age,
+                                                                     progression_cache)
+            if cached:
+                return {"status": "success", "person_id": person_id, "current_age": current_age,
+                        "target_age": target_age, **cached}
             # Use photo from database (download if cloud URL)
-            photo_path = person_data.get('photo_path')
-            if not photo_path:
-                raise HTTPException(status_code=400, detail="Person photo not available. Please upload a photo instead.")
-            
-            # If it's a URL (cloud storage), download it
-            if photo_path.startswith('http://') or photo_path.startswith('https://'):
-                downloaded_photo = True
-                local_photo_path = os.path.join(UPLOADS_DIR, f"progression_downloaded_{datetime.now().timestamp()}.jpg")
-                if not cloud.download_image(photo_path, local_photo_path):
-                    raise HTTPException(status_code=500, detail="Failed to download photo from cloud storage")
-                photo_path = local_photo_path
-            elif not os.path.exists(photo_path):
-                raise HTTPException(status_code=400, detail="Person photo not available locally. Please upload a photo instead.")
+            photo_path, downloaded_photo = _load_case_photo(person_data, "progression")
+            photo_hash = photo_digest(photo_path)
+            progression_cache.remember_digest(person_data['photo_path'], photo_hash)
         elif photo:
             # Save uploaded photo temporarily
-            os.makedirs(UPLOADS_DIR, exist_ok=True)
-            photo_path = os.path.join(UPLOADS_DIR, f"progression_{datetime.now().timestamp()}_{photo.filename}")
+            photo_path = _save_upload(photo, "progression")
             downloaded_photo = True
-            with open(photo_path, "wb") as buffer:
-                shutil.copyfileobj(photo.file, buffer)
         else:
             raise HTTPException(status_code=400, detail="Either person_id or photo must be provided")
         
         # Generate age progression
-        result = ai_engine.generate_age_progression(photo_path, current_age, target_age)
+        result = ai_engine.generate_age_progression(photo_path, current_age, target_age, cache=progression_cache,
+                                                    photo_hash=photo_hash)
         
         if "error" in result:
             raise HTTPException(status_code=500, detail=result["error"])
@@ -416,11 +1132,98 @@ async def generate_age_progression(
         raise HTTPException(status_code=500, detail=f"Age progression error: {str(e)}")
     finally:
         # Cleanup temporary files (only if we downloaded/created them)
-        if photo_path and downloaded_photo and os.path.exists(photo_path):
-            try:
-                os.remove(photo_path)
-            except:
-                pass
+        if downloaded_photo:
+            _remove_temp_file(photo_path)
+
+# Upper bound on target ages per batch request (each age costs one variant per scenario)
+PROGRESSION_BATCH_MAX_AGES = int(os.getenv("PROGRESSION_BATCH_MAX_AGES", "12"))
+
+def _reconstruction_insights(photo_path: str, current_age: int, description: str) -> str:
+    try:
+        return ai_engine.openai_service.analyze_missing_person_image(photo_path, current_age, description).get('analysis', '')
+    except Exception:
+        return "Reconstruction analysis pending."
+
+@app.post("/api/age-progression/batch")
+async def generate_age_progression_batch(
+    target_ages: str = Form(...),
+    person_id: Optional[int] = Form(None),
+    photo: Optional[UploadFile] = File(None),
+    current_age: Optional[int] = Form(None),
+    scenarios: Optional[str] = Form(None),
+    description: Optional[str] = Form(None),
+    include_insights: bool = Form(False)
+):
+    """Progression timeline in one request: comma-separated target_ages (and optional scenarios) of one photo,
+    fetched, decoded and face-located once; include_insights runs the reconstruction analysis once for all ages"""
+    try:
+        ages = list(dict.fromkeys(int(age) for age in target_ages.split(",") if age.strip()))
+    except ValueError:
+        raise HTTPException(status_code=422, detail="target_ages must be comma-separated integers")
+    if not ages or len(ages) > PROGRESSION_BATCH_MAX_AGES:
+        raise HTTPException(status_code=422, detail=f"Provide between 1 and {PROGRESSION_BATCH_MAX_AGES} target ages")
+    wanted = [name.strip() for name in scenarios.split(",") if name.strip()] if scenarios else None
+    unknown = sorted(set(wanted or []) - {scenario["condition"] for scenario in PROGRESSION_SCENARIOS})
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Unknown scenarios: {', '.join(unknown)}")
+
+    photo_path, downloaded_photo, current_age, _, description = _prepare_reconstruction(
+        person_id, photo, current_age, ages[0], description
+    )
+    try:
+        progression_task = asyncio.to_thread(ai_engine.generate_age_progressions, photo_path, current_age, ages,
+                                             wanted, progression_cache)
+        if include_insights:
+            result, insights = await asyncio.gather(
+                progression_task, asyncio.to_thread(_reconstruction_insights, photo_path, current_age, description))
+        else:
+            result, insights = await progression_task, None
+        if "error" in result:
+            raise HTTPException(status_code=500, detail=result["error"])
+
+        response = {"status": "success", "person_id": person_id, "current_age": current_age, **result}
+        if include_insights:
+            response["reconstruction_insights"] = insights
+            response["model_used"] = ai_engine.openai_service.model_name
+        return response
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Batch age progression failed", error=str(e))
+        raise HTTPException(status_code=500, detail=f"Age progression error: {str(e)}")
+    finally:
+        if downloaded_photo:
+            _remove_temp_file(photo_path)
+
+def _prepare_reconstruction(person_id: Optional[int], photo: Optional[UploadFile], current_age: Optional[int],
+                            target_age: Optional[int], description: Optional[str]) -> Tuple[str, bool, int, int, str]:
+    """Resolve photo, ages and description for a reconstruction request; returns (path, is_temp, current, target, description)"""
+    # Either use person_id to get existing photo or use uploaded photo
+    if person_id:
+        person_data = db.get_missing_person(person_id)
+        if not person_data:
+            raise HTTPException(status_code=404, detail="Person not found")
+        photo_path, downloaded_photo = _load_case_photo(person_data, "reconstruction")
+        
+        current_age = current_age or person_data.get('age')
+        description = description or person_data.get('description', '')
+    elif photo:
+        if not current_age:
+            raise HTTPException(status_code=400, detail="current_age is required when uploading a photo")
+        # Save uploaded photo temporarily
+        photo_path = _save_upload(photo, "reconstruction")
+        downloaded_photo = True
+        description = description or ''
+    else:
+        raise HTTPException(status_code=400, detail="Either person_id or photo must be provided")
+    
+    if not current_age:
+        if downloaded_photo:
+            _remove_temp_file(photo_path)
+        raise HTTPException(status_code=400, detail="current_age is required")
+    
+    target_age = target_age or (current_age + 5)  # Default to 5 years progression
+    return photo_path, downloaded_photo, current_age, target_age, description
 
 @app.post("/api/ai/target-reconstruction")
 async def target_reconstruction(
@@ -434,60 +1237,19 @@ async def target_reconstruction(
     photo_path = None
     downloaded_photo = False
     try:
-        # Either use person_id to get existing photo or use uploaded photo
-        if person_id:
-            person_data = db.get_missing_person(person_id)
-            if not person_data:
-                raise HTTPException(status_code=404, detail="Person not found")
-            photo_path = person_data.get('photo_path')
-            if not photo_path:
-                raise HTTPException(status_code=400, detail="Person photo not available. Please upload a photo instead.")
-            
-            # If it's a URL (cloud storage), download it
-            if photo_path.startswith('http://') or photo_path.startswith('https://'):
-                downloaded_photo = True
-                local_photo_path = os.path.join(UPLOADS_DIR, f"reconstruction_downloaded_{datetime.now().timestamp()}.jpg")
-                if not cloud.download_image(photo_path, local_photo_path):
-                    raise HTTPException(status_code=500, detail="Failed to download photo from cloud storage")
-                photo_path = local_photo_path
-            elif not os.path.exists(photo_path):
-                raise HTTPException(status_code=400, detail="Person photo not available locally. Please upload a photo instead.")
-            
-            current_age = current_age or person_data.get('age')
-            description = description or person_data.get('description', '')
-        elif photo:
-            if not current_age:
-                raise HTTPException(status_code=400, detail="current_age is required when uploading a photo")
-            # Save uploaded photo temporarily
-            os.makedirs(UPLOADS_DIR, exist_ok=True)
-            photo_path = os.path.join(UPLOADS_DIR, f"reconstruction_{datetime.now().timestamp()}_{photo.filename}")
-            downloaded_photo = True
-            with open(photo_path, "wb") as buffer:
-                shutil.copyfileobj(photo.file, buffer)
-            description = description or ''
-        else:
-            raise HTTPException(status_code=400, detail="Either person_id or photo must be provided")
-        
-        if not current_age:
-            raise HTTPException(status_code=400, detail="current_age is required")
-        
-        target_age = target_age or (current_age + 5)  # Default to 5 years progression
+        photo_path, downloaded_photo, current_age, target_age, description = _prepare_reconstruction(
+            person_id, photo, current_age, target_age, description
+        )
         
         # Generate age progression (reconstruction uses the same method)
-        progression_result = ai_engine.generate_age_progression(photo_path, current_age, target_age)
+        progression_result = ai_engine.generate_age_progression(photo_path, current_age, target_age, cache=progression_cache)
         
         if "error" in progression_result:
             raise HTTPException(status_code=500, detail=progression_result["error"])
         
         # Enhanced analysis using Grok for reconstruction insights
-        from .openai_integration import OpenAIIntegration
-        openai_service = OpenAIIntegration()
-        
-        try:
-            analysis_result = openai_service.analyze_missing_person_image(photo_path, current_age, description)
-            reconstruction_insights = analysis_result.get('analysis', '')
-        except:
-            reconstruction_insights = "Reconstruction analysis pending."
+        openai_service = ai_engine.openai_service
+        reconstruction_insights = _reconstruction_insights(photo_path, current_age, description)
         
         return {
             "status": "success",
@@ -505,28 +1267,79 @@ async def target_reconstruction(
         raise HTTPException(status_code=500, detail=f"Target reconstruction error: {str(e)}")
     finally:
         # Cleanup temporary files (only if we downloaded/created them)
-        if photo_path and downloaded_photo and os.path.exists(photo_path):
-            try:
-                os.remove(photo_path)
-            except:
-                pass
+        if downloaded_photo:
+            _remove_temp_file(photo_path)
+
+@app.post("/api/ai/target-reconstruction/stream")
+async def target_reconstruction_stream(
+    request: Request,
+    person_id: Optional[int] = Form(None),
+    photo: Optional[UploadFile] = File(None),
+    current_age: Optional[int] = Form(None),
+    target_age: Optional[int] = Form(None),
+    description: Optional[str] = Form(None),
+    format: Optional[str] = None
+):
+    """Streaming variant of /api/ai/target-reconstruction: progression first, then reconstruction insight tokens"""
+    photo_path, downloaded_photo, current_age, target_age, description = _prepare_reconstruction(
+        person_id, photo, current_age, target_age, description
+    )
+
+    async def events():
+        try:
+            progression_result = await asyncio.to_thread(
+                ai_engine.generate_age_progression, photo_path, current_age, target_age, progression_cache
+            )
+            if "error" in progression_result:
+                yield {"event": "error", "data": {"error": progression_result["error"]}}
+                return
+            yield {"event": "age_progression", "data": progression_result}
+
+            openai_service = ai_engine.openai_service
+            tokens = []
+            stream = openai_service.stream_missing_person_analysis(photo_path, current_age, description)
+            async for token in iterate_in_thread(stream):
+                tokens.append(token)
+                yield {"event": "llm_token", "data": {"token": token}}
+
+            yield {"event": "result", "data": {
+                "status": "success",
+                "person_id": person_id,
+                "current_age": current_age,
+                "target_age": target_age,
+                "reconstruction_insights": "".join(tokens) or "Reconstruction analysis pending.",
+                "age_progression": progression_result,
+                "model_used": openai_service.model_name
+            }}
+        except Exception as e:
+            logger.error("Target reconstruction stream failed", error=str(e))
+            yield {"event": "error", "data": {"error": f"Target reconstruction error: {str(e)}"}}
+        finally:
+            if downloaded_photo:
+                _remove_temp_file(photo_path)
+
+    return _event_stream_response(events(), request, format)
+
+def _search_status_payload(person_id: int) -> Dict:
+    status = db.get_search_status(person_id)
+
+    if status.get('status') == 'error':
+        raise HTTPException(status_code=500, detail="Failed to fetch search status")
+    elif status.get('status') == 'not_found':
+        raise HTTPException(status_code=404, detail="Search status not found for this person")
+
+    return {
+        "status": "success",
+        "person_id": person_id,
+        "data": status
+    }
 
 @app.get("/api/search-status/{person_id}")
-async def get_search_status(person_id: int):
-    """Get search status for a missing person"""
+async def get_search_status(request: Request, person_id: int):
+    """Get search status for a missing person (ETag/Last-Modified, 304 on unchanged data, gzip/br)"""
     try:
-        status = db.get_search_status(person_id)
-        
-        if status.get('status') == 'error':
-            raise HTTPException(status_code=500, detail="Failed to fetch search status")
-        elif status.get('status') == 'not_found':
-            raise HTTPException(status_code=404, detail="Search status not found for this person")
-        
-        return {
-            "status": "success",
-            "person_id": person_id,
-            "data": status
-        }
+        return response_cache.respond(request, f"search-status/{person_id}", db.data_version,
+                                      lambda: _search_status_payload(person_id))
     except HTTPException:
         raise
     except Exception as e:
@@ -534,4 +1347,5 @@ async def get_search_status(person_id: int):
         raise HTTPException(status_code=500, detail="Search status retrieval error")
 
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run("backend.main:app", host="0.0.0.0", port=8000, reload=True)
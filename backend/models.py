@@ -10,6 +10,7 @@ class MissingPerson(BaseModel):
     photo_path: str
     reported_date: datetime
     status: str = "missing"
+    region: Optional[str] = None
     
 class SearchResult(BaseModel):
     camera_id: str
@@ -21,7 +22,8 @@ class SearchResult(BaseModel):
 
 class CitizenReport(BaseModel):
     id: Optional[int] = None
-    person_id: int
+    # None when the sighting was screened against open cases and none was verified
+    person_id: Optional[int] = None
     location: str
     description: str
     reporter_phone: str
@@ -29,6 +31,16 @@ class CitizenReport(BaseModel):
     verification_score: float
     report_time: datetime
     status: str = "pending"
+    face_encoding: Optional[List[float]] = None
+
+class SearchFilters(BaseModel):
+    """Metadata predicates for semantic search (age bounds and dates inclusive; status None = any)"""
+    min_age: Optional[int] = None
+    max_age: Optional[int] = None
+    status: Optional[str] = "missing"
+    reported_after: Optional[datetime] = None
+    reported_before: Optional[datetime] = None
+    region: Optional[str] = None
 
 class AgeProgressionResult(BaseModel):
     original_age: int
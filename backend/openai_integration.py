@@ -1,12 +1,75 @@
-import openai
 import base64
 import os
 import random
 import hashlib
-from typing import Dict, List
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Tuple
 import json
 import re
+import numpy as np
 from .logger import logger
+from .metrics import observe_stage, timed_stage, mock_fallbacks, cache_hits, cache_misses
+from .tracing import span, traced
+from .resilience import ResilienceGuard, ProviderUnavailableError
+
+# Shared across every OpenAIIntegration instance so quota and health are tracked process-wide
+grok_guard = ResilienceGuard.from_env("GROK")
+embeddings_guard = ResilienceGuard.from_env("EMBEDDINGS")
+
+EMBEDDING_DIM = 1536
+
+class EmbeddingCache:
+    """Thread-safe LRU of embedding rows keyed by (model, sha256 of the text)"""
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._rows: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(model: str, text: str) -> str:
+        return f"{model}:{hashlib.sha256(text.encode()).hexdigest()}"
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            row = self._rows.get(key)
+            if row is not None:
+                self._rows.move_to_end(key)
+        (cache_hits if row is not None else cache_misses).inc(cache="embeddings")
+        return row
+
+    def put(self, key: str, row: np.ndarray):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._rows[key] = row
+            self._rows.move_to_end(key)
+            while len(self._rows) > self.max_entries:
+                self._rows.popitem(last=False)
+
+embedding_cache = EmbeddingCache(int(os.getenv("EMBEDDINGS_CACHE_SIZE", "4096")))
+
+def hash_embeddings(texts: List[str], mock: bool = False) -> np.ndarray:
+    """
+    Deterministic hash embeddings for a batch (float64, same values as the original per-byte loop).
+    mock: md5 bytes / 255 tiled to 1536. Otherwise: sha256 tiled 8x and md5 tiled 40x, mapped to
+    [-1, 1], then zero padded to 1536.
+    """
+    if not texts:
+        return np.zeros((0, EMBEDDING_DIM))
+    md5 = np.frombuffer(b"".join(hashlib.md5(t.encode()).digest() for t in texts), dtype=np.uint8).reshape(-1, 16)
+    if mock:
+        return np.tile(md5 / 255.0, (1, EMBEDDING_DIM // 16))
+    sha = np.frombuffer(b"".join(hashlib.sha256(t.encode()).digest() for t in texts), dtype=np.uint8).reshape(-1, 32)
+    out = np.zeros((len(texts), EMBEDDING_DIM))
+    out[:, :256] = np.tile(sha / 255.0 * 2 - 1, (1, 8))
+    out[:, 256:896] = np.tile(md5 / 255.0 * 2 - 1, (1, 40))
+    return out
+
+def _is_provider_failure(error: Exception) -> bool:
+    """Only timeouts, connection errors, 429s and 5xx count against provider health"""
+    status = getattr(error, "status_code", None)
+    return status is None or status == 429 or status >= 500
 
 class OpenAIIntegration:
     """
@@ -31,54 +94,66 @@ class OpenAIIntegration:
             self.client = None
         else:
             try:
+                # Deferred: the SDK import is a large share of cold-start time and mock mode never needs it
+                import openai
+                # Bounded timeout/retries: the SDK defaults (600s, 2 retries) dominate tail latency in an outage
                 self.client = openai.OpenAI(
                     api_key=self.api_key,
-                    base_url=self.base_url
+                    base_url=self.base_url,
+                    timeout=float(os.getenv('GROK_TIMEOUT_SECONDS', '30')),
+                    max_retries=int(os.getenv('GROK_MAX_RETRIES', '1'))
                 )
                 logger.info(f"Grok Intelligence Matrix Synchronized: {self.model_name}")
             except Exception as e:
                 logger.error("Grok Synchronization failed. Falling back to Mock.", error=str(e))
                 self.mock_mode = True
                 self.client = None
+
+        # Optional real embeddings backend (Grok has no embeddings endpoint); hash fallback otherwise
+        self.embeddings_model = os.getenv('EMBEDDINGS_MODEL', 'text-embedding-3-small')
+        self.embeddings_batch_size = int(os.getenv('EMBEDDINGS_BATCH_SIZE', '256'))
+        self.embeddings_client = None
+        embeddings_key = os.getenv('EMBEDDINGS_API_KEY')
+        if embeddings_key and not demo_flag:
+            try:
+                import openai
+                self.embeddings_client = openai.OpenAI(
+                    api_key=embeddings_key,
+                    base_url=os.getenv('EMBEDDINGS_BASE_URL', 'https://api.openai.com/v1'),
+                    timeout=float(os.getenv('EMBEDDINGS_TIMEOUT_SECONDS', '30')),
+                    max_retries=int(os.getenv('EMBEDDINGS_MAX_RETRIES', '1'))
+                )
+            except Exception as e:
+                logger.error("Embeddings backend unavailable. Using hash embeddings.", error=str(e))
     
+    def _chat_completion(self, **kwargs):
+        """Chat completion through the shared resilience guard (fails fast while Grok is unhealthy).
+        With stream=True this returns a guarded iterator that holds a concurrency slot until drained"""
+        if kwargs.get("stream"):
+            return grok_guard.call_stream(self._open_stream, is_failure=_is_provider_failure, **kwargs)
+        with observe_stage("grok_call"), span("OpenAIIntegration.chat_completion", model=self.model_name, stream=False):
+            return grok_guard.call(self.client.chat.completions.create, is_failure=_is_provider_failure, **kwargs)
+
+    def _open_stream(self, **kwargs):
+        # Timed up to the response headers; the stream itself is consumed (and accounted) by the guard
+        with observe_stage("grok_call"), span("OpenAIIntegration.chat_completion", model=self.model_name, stream=True):
+            return self.client.chat.completions.create(**kwargs)
+
+    def resilience_stats(self) -> Dict:
+        """Current rate governor, concurrency and circuit breaker state"""
+        return grok_guard.stats()
+
+    @traced("OpenAIIntegration.analyze_missing_person_image")
     def analyze_missing_person_image(self, image_path: str, age: int, description: str) -> Dict:
         """Analyze missing person using Grok multimodal with CoT"""
         if self.mock_mode:
+            mock_fallbacks.inc(operation="analysis", reason="mock_mode")
             return self._mock_analysis(age, description)
             
         try:
-            # Read and encode image
-            with open(image_path, "rb") as image_file:
-                image_data = image_file.read()
-                image_base64 = base64.b64encode(image_data).decode('utf-8')
-            
-            prompt = (
-                f"ADVANCED_BIOMETRIC_ANALYSIS: Analyze this photo for a missing {age}yo individual. "
-                f"Profile Context: {description}. \n\n"
-                "Please perform a step-by-step (Chain-of-Thought) analysis of the following markers:\n"
-                "1. CRANIOFACIAL_STRUCTURE: Evaluate bone structure, jawline, and forehead ratio.\n"
-                "2. IDENTIFYING_LANDMARKS: Check for unique ear morphology, hairline patterns, or permanent marks.\n"
-                "3. CLOTHING_DEGRADATION: Assess signs of environmental stress or trauma on apparel.\n"
-                "4. SEARCH_PREDICTION: Based on demographics and appearance, identify 3 high-probability urban zones.\n\n"
-                "Provide a structured technical report."
-            )
-            
-            response = self.client.chat.completions.create(
+            response = self._chat_completion(
                 model=self.model_name,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": prompt},
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{image_base64}"
-                                }
-                            }
-                        ]
-                    }
-                ],
+                messages=self._analysis_messages(image_path, age, description),
                 max_tokens=2000
             )
             
@@ -89,68 +164,45 @@ class OpenAIIntegration:
                 "analysis": analysis,
                 "model_used": self.model_name
             }
+        except ProviderUnavailableError as e:
+            logger.warning("Grok Analysis skipped, using fallback", reason=str(e))
+            mock_fallbacks.inc(operation="analysis", reason="provider_unavailable")
+            return self._mock_analysis(age, description)
         except Exception as e:
             logger.error("Grok Analysis failed", error=str(e))
+            mock_fallbacks.inc(operation="analysis", reason="error")
             return self._mock_analysis(age, description)
 
+    def stream_missing_person_analysis(self, image_path: str, age: int, description: str) -> Iterator[str]:
+        """Token stream for analyze_missing_person_image; falls back to the simulated report on failure"""
+        if self.mock_mode:
+            mock_fallbacks.inc(operation="analysis_stream", reason="mock_mode")
+            yield from self._chunk_text(self._mock_analysis(age, description)["analysis"])
+            return
+        yield from self._stream_completion(
+            lambda: self._analysis_messages(image_path, age, description), 2000,
+            lambda: self._mock_analysis(age, description)["analysis"]
+        )
+
+    @traced("OpenAIIntegration.verify_citizen_sighting")
     def verify_citizen_sighting(self, sighting_image_path: str, target_image_path: str, 
                                 missing_person_description: str, location: str, citizen_description: str) -> Dict:
         """Verify report using Grok multimodal with side-by-side Biometric CoT"""
         if self.mock_mode:
+            mock_fallbacks.inc(operation="verification", reason="mock_mode")
             return self._mock_verification(location, citizen_description)
             
         try:
-            # Read and encode sighting image
-            with open(sighting_image_path, "rb") as image_file:
-                sighting_data = image_file.read()
-                sighting_image_base64 = base64.b64encode(sighting_data).decode('utf-8')
-            
-            # Read and encode target image
-            with open(target_image_path, "rb") as image_file:
-                target_data = image_file.read()
-                target_image_base64 = base64.b64encode(target_data).decode('utf-8')
-            
-            prompt = (
-                f"NEURAL_VERIFICATION_PROTOCOL: Perform a direct biometric comparison between Image 1 (Target) and Image 2 (Sighting at {location}).\n"
-                f"Target Profile: {missing_person_description}. \n"
-                f"Citizen Observations: {citizen_description}. \n\n"
-                "INSTRUCTIONS:\n"
-                "1. COMPONENT_MATCH: Compare inter-pupillary distance, nasal bridge width, ear lobe attachment, and chin structure.\n"
-                "2. DISQUALIFIER_SEARCH: Look for immutable differences that prove Image 2 is NOT the person in Image 1.\n"
-                "CONFIDENCE_CALCULATION: Assign a percentage match based on biometric alignment.\n"
-                "4. OUTPUT: Provide the final confidence score in the format [X]% followed by a brief justification.\n\n"
-                "Note: Image 1 is the Target (Missing Person), Image 2 is the Sighting."
-            )
-            
-            response = self.client.chat.completions.create(
+            response = self._chat_completion(
                 model=self.model_name,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": prompt},
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{target_image_base64}"
-                                }
-                            },
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{sighting_image_base64}"
-                                }
-                            }
-                        ]
-                    }
-                ],
+                messages=self._verification_messages(
+                    sighting_image_path, target_image_path, missing_person_description, location, citizen_description
+                ),
                 max_tokens=1500
             )
             
             analysis = response.choices[0].message.content
-            
-            confidence_match = re.search(r'(\d+)%', analysis)
-            confidence = int(confidence_match.group(1)) if confidence_match else 75
+            confidence = self.parse_confidence(analysis)
             
             return {
                 "status": "success",
@@ -159,45 +211,205 @@ class OpenAIIntegration:
                 "verified": confidence > 70,
                 "model_used": self.model_name
             }
+        except ProviderUnavailableError as e:
+            logger.warning("Grok Verification skipped, using fallback", reason=str(e))
+            mock_fallbacks.inc(operation="verification", reason="provider_unavailable")
+            return self._mock_verification(location, citizen_description)
         except Exception as e:
             logger.error("Grok Verification failed", error=str(e))
+            mock_fallbacks.inc(operation="verification", reason="error")
             return self._mock_verification(location, citizen_description)
 
+    def stream_citizen_sighting_verification(self, sighting_image_path: str, target_image_path: str,
+                                             missing_person_description: str, location: str,
+                                             citizen_description: str) -> Iterator[str]:
+        """Token stream for verify_citizen_sighting; the text ends with a parseable [X]% confidence"""
+        if self.mock_mode:
+            mock_fallbacks.inc(operation="verification_stream", reason="mock_mode")
+            yield from self._chunk_text(self._mock_verification(location, citizen_description)["analysis"])
+            return
+        yield from self._stream_completion(
+            lambda: self._verification_messages(
+                sighting_image_path, target_image_path, missing_person_description, location, citizen_description
+            ), 1500,
+            lambda: self._mock_verification(location, citizen_description)["analysis"]
+        )
+
+    @staticmethod
+    def parse_confidence(analysis: str) -> int:
+        """Extract the [X]% confidence score from a verification report"""
+        confidence_match = re.search(r'(\d+)%', analysis or "")
+        return int(confidence_match.group(1)) if confidence_match else 75
+
+    def _stream_completion(self, build_messages, max_tokens: int, fallback) -> Iterator[str]:
+        emitted = False
+        reason = "empty_stream"
+        try:
+            stream = self._chat_completion(
+                model=self.model_name,
+                messages=build_messages(),
+                max_tokens=max_tokens,
+                stream=True
+            )
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                token = chunk.choices[0].delta.content
+                if token:
+                    emitted = True
+                    yield token
+        except ProviderUnavailableError as e:
+            logger.warning("Grok stream skipped, using fallback", reason=str(e))
+            reason = "provider_unavailable"
+        except Exception as e:
+            logger.error("Grok stream failed", error=str(e))
+            reason = "error"
+        if not emitted:
+            mock_fallbacks.inc(operation="stream", reason=reason)
+            yield from self._chunk_text(fallback())
+
+    @staticmethod
+    def _chunk_text(text: str) -> Iterator[str]:
+        """Split simulated output into word-sized chunks so it streams like real tokens"""
+        yield from re.findall(r'\S+\s*', text)
+
+    @staticmethod
+    def _encode_image(image_path: str) -> str:
+        with open(image_path, "rb") as image_file:
+            return base64.b64encode(image_file.read()).decode('utf-8')
+
+    def _analysis_messages(self, image_path: str, age: int, description: str) -> List[Dict]:
+        # Read and encode image
+        image_base64 = self._encode_image(image_path)
+        
+        prompt = (
+            f"ADVANCED_BIOMETRIC_ANALYSIS: Analyze this photo for a missing {age}yo individual. "
+            f"Profile Context: {description}. \n\n"
+            "Please perform a step-by-step (Chain-of-Thought) analysis of the following markers:\n"
+            "1. CRANIOFACIAL_STRUCTURE: Evaluate bone structure, jawline, and forehead ratio.\n"
+            "2. IDENTIFYING_LANDMARKS: Check for unique ear morphology, hairline patterns, or permanent marks.\n"
+            "3. CLOTHING_DEGRADATION: Assess signs of environmental stress or trauma on apparel.\n"
+            "4. SEARCH_PREDICTION: Based on demographics and appearance, identify 3 high-probability urban zones.\n\n"
+            "Provide a structured technical report."
+        )
+        
+        return [
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": prompt},
+                    {
+                        "type": "image_url",
+                        "image_url": {
+                            "url": f"data:image/jpeg;base64,{image_base64}"
+                        }
+                    }
+                ]
+            }
+        ]
+
+    def _verification_messages(self, sighting_image_path: str, target_image_path: str,
+                               missing_person_description: str, location: str, citizen_description: str) -> List[Dict]:
+        # Read and encode sighting and target images
+        sighting_image_base64 = self._encode_image(sighting_image_path)
+        target_image_base64 = self._encode_image(target_image_path)
+        
+        prompt = (
+            f"NEURAL_VERIFICATION_PROTOCOL: Perform a direct biometric comparison between Image 1 (Target) and Image 2 (Sighting at {location}).\n"
+            f"Target Profile: {missing_person_description}. \n"
+            f"Citizen Observations: {citizen_description}. \n\n"
+            "INSTRUCTIONS:\n"
+            "1. COMPONENT_MATCH: Compare inter-pupillary distance, nasal bridge width, ear lobe attachment, and chin structure.\n"
+            "2. DISQUALIFIER_SEARCH: Look for immutable differences that prove Image 2 is NOT the person in Image 1.\n"
+            "CONFIDENCE_CALCULATION: Assign a percentage match based on biometric alignment.\n"
+            "4. OUTPUT: Provide the final confidence score in the format [X]% followed by a brief justification.\n\n"
+            "Note: Image 1 is the Target (Missing Person), Image 2 is the Sighting."
+        )
+        
+        return [
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": prompt},
+                    {
+                        "type": "image_url",
+                        "image_url": {
+                            "url": f"data:image/jpeg;base64,{target_image_base64}"
+                        }
+                    },
+                    {
+                        "type": "image_url",
+                        "image_url": {
+                            "url": f"data:image/jpeg;base64,{sighting_image_base64}"
+                        }
+                    }
+                ]
+            }
+        ]
+
+    @timed_stage("embedding")
+    @traced("OpenAIIntegration.generate_embeddings")
     def generate_embeddings(self, text: str) -> List[float]:
         """
         Generate semantic embeddings
         Note: Grok API may not support embeddings, using fallback method
         """
-        if self.mock_mode:
-            h = hashlib.md5(text.encode()).digest()
-            mock_vec = []
-            for i in range(1536//16):
-                mock_vec.extend([float(x)/255.0 for x in h])
-            return mock_vec[:1536]
-
-        # Grok doesn't have embeddings endpoint, use hash-based fallback
-        # For production, consider using OpenAI embeddings or another service
         try:
-            
-            # Create a deterministic hash-based embedding
-            h = hashlib.sha256(text.encode()).digest()
-            h2 = hashlib.md5(text.encode()).digest()
-            
-            # Generate 1536-dim vector from hash
-            embedding = []
-            for i in range(0, 1536, 32):
-                chunk = h[:32] if i < len(h) * 8 else h2[:32]
-                for byte in chunk:
-                    embedding.append((float(byte) / 255.0) * 2 - 1)  # Normalize to [-1, 1]
-            
-            # Pad if needed
-            while len(embedding) < 1536:
-                embedding.extend([0.0] * (1536 - len(embedding)))
-            
-            return embedding[:1536]
+            if self.embeddings_client is None:
+                return hash_embeddings([text], mock=self.mock_mode)[0].tolist()
+            return self.generate_embeddings_batch([text])[0].tolist()
         except Exception as e:
             logger.error("Embedding generation failed", error=str(e))
-            return [random.uniform(-1, 1) for _ in range(1536)]
+            return [random.uniform(-1, 1) for _ in range(EMBEDDING_DIM)]
+
+    @timed_stage("embedding_batch")
+    @traced("OpenAIIntegration.generate_embeddings_batch")
+    def generate_embeddings_batch(self, texts: List[str]) -> np.ndarray:
+        """Embed many texts at once; returns a (len(texts), 1536) float32 matrix in input order"""
+        if self.embeddings_client is None:
+            return hash_embeddings(texts, mock=self.mock_mode).astype(np.float32)
+
+        matrix = np.empty((len(texts), EMBEDDING_DIM), dtype=np.float32)
+        keys = [embedding_cache.key(self.embeddings_model, text) for text in texts]
+        missing: Dict[str, List[int]] = {}
+        for i, key in enumerate(keys):
+            row = embedding_cache.get(key)
+            if row is None:
+                missing.setdefault(key, []).append(i)
+            else:
+                matrix[i] = row
+
+        # Each distinct uncached text is sent once, in batches of EMBEDDINGS_BATCH_SIZE
+        pending = list(missing)
+        for start in range(0, len(pending), self.embeddings_batch_size):
+            batch_keys = pending[start:start + self.embeddings_batch_size]
+            batch_texts = [texts[missing[key][0]] for key in batch_keys]
+            rows, cacheable = self._remote_embeddings(batch_texts)
+            for key, row in zip(batch_keys, rows):
+                if cacheable:
+                    embedding_cache.put(key, row)
+                matrix[missing[key]] = row
+        return matrix
+
+    def _remote_embeddings(self, texts: List[str]) -> Tuple[np.ndarray, bool]:
+        """One embeddings API call -> (rows, cacheable); hash rows (never cached) when the backend fails"""
+        try:
+            with observe_stage("embeddings_call"):
+                response = embeddings_guard.call(
+                    self.embeddings_client.embeddings.create, is_failure=_is_provider_failure,
+                    model=self.embeddings_model, input=texts, dimensions=EMBEDDING_DIM
+                )
+            rows = np.zeros((len(texts), EMBEDDING_DIM), dtype=np.float32)
+            for item in response.data:
+                rows[item.index] = item.embedding
+            return rows, True
+        except ProviderUnavailableError as e:
+            logger.warning("Embeddings backend unavailable; using hash embeddings", reason=str(e), batch=len(texts))
+            mock_fallbacks.inc(operation="embeddings", reason="provider_unavailable")
+        except Exception as e:
+            logger.error("Embeddings request failed; using hash embeddings", error=str(e), batch=len(texts))
+            mock_fallbacks.inc(operation="embeddings", reason="error")
+        return hash_embeddings(texts).astype(np.float32), False
 
     def _mock_analysis(self, age: int, description: str) -> Dict:
         """High-Fidelity Simulated Analysis"""
@@ -222,6 +434,7 @@ class OpenAIIntegration:
             "model_used": "GROK_SIM_V1"
         }
 
+    @traced("OpenAIIntegration.process_voice_report")
     def process_voice_report(self, audio_file_path: str) -> Dict:
         """Process voice report using Grok (Note: Audio support may be limited)"""
         if self.mock_mode:
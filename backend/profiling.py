@@ -0,0 +1,279 @@
+import os
+import io
+import sys
+import json
+import hmac
+import time
+import pstats
+import random
+import shutil
+import secrets
+import cProfile
+import threading
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional
+from .logger import logger
+from . import metrics
+
+# Empty token disables header-triggered profiling and the admin endpoints
+PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN", "")
+# Fraction of ordinary requests profiled without a token (sampling mode only, low overhead)
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DEFAULT_MODE = os.getenv("PROFILE_MODE", "sampling")
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+# Allocation snapshots for token-triggered requests; sampled requests need their own opt-in, since
+# tracemalloc hooks every allocation in the process while it runs
+PROFILE_TRACEMALLOC = os.getenv("PROFILE_TRACEMALLOC", "true").lower() == "true"
+PROFILE_SAMPLED_TRACEMALLOC = os.getenv("PROFILE_SAMPLED_TRACEMALLOC", "false").lower() == "true"
+PROFILE_TRACEMALLOC_FRAMES = int(os.getenv("PROFILE_TRACEMALLOC_FRAMES", "8"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(os.environ.get("TMPDIR", "/tmp"), "dhund_profiles"))
+PROFILE_MAX_STORED = int(os.getenv("PROFILE_MAX_STORED", "50"))
+
+MODES = ("sampling", "deterministic")
+ARTIFACTS = {
+    "folded": ("stacks.folded", "text/plain"),
+    "pstats": ("profile.pstats", "application/octet-stream"),
+    "text": ("profile.txt", "text/plain"),
+    "allocations": ("allocations.txt", "text/plain"),
+}
+# Leaf frames of threads parked on I/O or an empty work queue; not interesting CPU time
+_IDLE_LEAVES = {("selectors.py", "select"), ("threading.py", "wait"), ("thread.py", "_worker"),
+                ("queue.py", "get"), ("socket.py", "readinto"), ("threading.py", "_wait_for_tstate_lock")}
+
+profiles_captured = metrics.registry.counter(
+    "dhund_profiles_captured_total", "Request profiles written to PROFILE_DIR", ("mode", "trigger"))
+
+# cProfile and tracemalloc are process-wide; one profiled request at a time keeps output attributable
+_active_lock = threading.Lock()
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class SamplingProfiler:
+    """Polls every thread's stack at a fixed interval and aggregates collapsed (flamegraph) stacks"""
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="dhund-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in _IDLE_LEAVES:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def folded(self) -> str:
+        """Brendan Gregg collapsed format; loads in flamegraph.pl and speedscope"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class ProfileSession:
+    """One profiled request: CPU profile plus optional allocation snapshot, written under PROFILE_DIR/<id>"""
+    def __init__(self, mode: str, trigger: str, method: str, path: str):
+        self.profile_id = f"{datetime.now().strftime('%Y%m%d%H%M%S')}-{secrets.token_hex(4)}"
+        self.mode = mode
+        self.trigger = trigger
+        self.method = method
+        self.path = path
+        self.route = path
+        self.status_code: Optional[int] = None
+        self.trace_id: Optional[str] = None
+        self._profiler: Optional[cProfile.Profile] = None
+        self._sampler: Optional[SamplingProfiler] = None
+        self._started_tracemalloc = False
+        self._start = 0.0
+        self._duration_ms: Optional[float] = None
+        self._snapshot = None
+        self._peak_bytes: Optional[int] = None
+
+    def start(self):
+        trace_allocations = PROFILE_TRACEMALLOC if self.trigger == "token" else PROFILE_SAMPLED_TRACEMALLOC
+        if trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start(PROFILE_TRACEMALLOC_FRAMES)
+            self._started_tracemalloc = True
+        if self.mode == "deterministic":
+            # Records the calling thread only (the event loop); pipeline stages moved to worker
+            # threads via asyncio.to_thread show up in sampling mode instead
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        else:
+            self._sampler = SamplingProfiler(PROFILE_SAMPLE_INTERVAL_MS / 1000.0)
+            self._sampler.start()
+        self._start = time.perf_counter()
+
+    def stop(self):
+        """Stop collectors; must run on the thread that called start() (cProfile is per-thread)"""
+        if self._duration_ms is not None:
+            return
+        self._duration_ms = (time.perf_counter() - self._start) * 1000.0
+        if self._profiler:
+            self._profiler.disable()
+        if self._sampler:
+            self._sampler.stop()
+        if self._started_tracemalloc:
+            self._snapshot = tracemalloc.take_snapshot()
+            self._peak_bytes = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+    def finish(self) -> Optional[str]:
+        """Persist artifacts (safe to run off the event loop); returns the output directory"""
+        self.stop()
+        duration_ms, snapshot, peak_bytes = self._duration_ms, self._snapshot, self._peak_bytes
+        try:
+            directory = os.path.join(PROFILE_DIR, self.profile_id)
+            os.makedirs(directory, exist_ok=True)
+            files = []
+            if self._profiler:
+                self._profiler.dump_stats(os.path.join(directory, ARTIFACTS["pstats"][0]))
+                text = io.StringIO()
+                pstats.Stats(self._profiler, stream=text).sort_stats("cumulative").print_stats(60)
+                with open(os.path.join(directory, ARTIFACTS["text"][0]), "w") as f:
+                    f.write(text.getvalue())
+                files += ["pstats", "text"]
+            if self._sampler:
+                with open(os.path.join(directory, ARTIFACTS["folded"][0]), "w") as f:
+                    f.write(self._sampler.folded())
+                files.append("folded")
+            top_allocations = []
+            if snapshot is not None:
+                snapshot = snapshot.filter_traces((
+                    tracemalloc.Filter(False, tracemalloc.__file__),
+                    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                ))
+                stats = snapshot.statistics("traceback")[:25]
+                with open(os.path.join(directory, ARTIFACTS["allocations"][0]), "w") as f:
+                    for stat in stats:
+                        f.write(f"{stat.size / 1024:.1f} KiB in {stat.count} blocks\n")
+                        f.write("".join(f"    {line}\n" for line in stat.traceback.format()))
+                top_allocations = [{"location": str(stat.traceback[0]), "size_kib": round(stat.size / 1024, 1),
+                                    "count": stat.count} for stat in stats[:10]]
+                files.append("allocations")
+
+            summary = {
+                "profile_id": self.profile_id,
+                "created": datetime.now().isoformat(),
+                "mode": self.mode,
+                "trigger": self.trigger,
+                "method": self.method,
+                "path": self.path,
+                "route": self.route,
+                "status_code": self.status_code,
+                "trace_id": self.trace_id,
+                "duration_ms": round(duration_ms, 2),
+                "samples": self._sampler.samples if self._sampler else None,
+                "peak_traced_bytes": peak_bytes,
+                "top_allocations": top_allocations,
+                "artifacts": files,
+            }
+            with open(os.path.join(directory, "summary.json"), "w") as f:
+                json.dump(summary, f, indent=2)
+            profiles_captured.inc(mode=self.mode, trigger=self.trigger)
+            logger.info("Request profile captured", profile_id=self.profile_id, route=self.route,
+                        duration_ms=round(duration_ms, 2), mode=self.mode)
+            _prune()
+            return directory
+        except Exception as e:
+            logger.error("Failed to write request profile", profile_id=self.profile_id, error=str(e))
+            return None
+        finally:
+            _active_lock.release()
+
+
+def begin(headers, method: str, path: str) -> Optional[ProfileSession]:
+    """Start a session when the request carries the admin token or is sampled; None otherwise"""
+    if path.startswith("/api/admin/profiles"):
+        return None
+    token = headers.get("x-profile-token")
+    if token and PROFILE_ADMIN_TOKEN and hmac.compare_digest(token, PROFILE_ADMIN_TOKEN):
+        trigger = "token"
+        mode = headers.get("x-profile-mode", PROFILE_DEFAULT_MODE)
+    elif PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE:
+        trigger, mode = "sampled", "sampling"
+    else:
+        return None
+    if mode not in MODES:
+        mode = PROFILE_DEFAULT_MODE
+    if not _active_lock.acquire(blocking=False):
+        logger.debug("Profile skipped; another request is being profiled", path=path)
+        return None
+    session = ProfileSession(mode, trigger, method, path)
+    try:
+        session.start()
+    except Exception:
+        _active_lock.release()
+        raise
+    return session
+
+
+def is_authorized(token: Optional[str]) -> bool:
+    return bool(PROFILE_ADMIN_TOKEN and token and hmac.compare_digest(token, PROFILE_ADMIN_TOKEN))
+
+
+def _profile_dir(profile_id: str) -> Optional[str]:
+    # ids are generated here (timestamp-hex); reject anything else to keep lookups inside PROFILE_DIR
+    if not profile_id.replace("-", "").isalnum():
+        return None
+    directory = os.path.join(PROFILE_DIR, profile_id)
+    return directory if os.path.isdir(directory) else None
+
+
+def load_summary(profile_id: str) -> Optional[Dict]:
+    directory = _profile_dir(profile_id)
+    if not directory:
+        return None
+    try:
+        with open(os.path.join(directory, "summary.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def artifact_path(profile_id: str, artifact: str) -> Optional[str]:
+    directory = _profile_dir(profile_id)
+    if not directory or artifact not in ARTIFACTS:
+        return None
+    path = os.path.join(directory, ARTIFACTS[artifact][0])
+    return path if os.path.exists(path) else None
+
+
+def list_profiles(limit: int = 50) -> List[Dict]:
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    summaries = [load_summary(name) for name in sorted(os.listdir(PROFILE_DIR), reverse=True)[:limit]]
+    return [s for s in summaries if s]
+
+
+def _prune():
+    """Keep the newest PROFILE_MAX_STORED profiles"""
+    try:
+        names = sorted(os.listdir(PROFILE_DIR))
+        for name in names[:max(len(names) - PROFILE_MAX_STORED, 0)]:
+            shutil.rmtree(os.path.join(PROFILE_DIR, name), ignore_errors=True)
+    except OSError:
+        pass
@@ -0,0 +1,204 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+from .logger import logger
+from .metrics import cache_hits, cache_misses
+
+
+def photo_digest(photo_path: str) -> str:
+    """sha256 of the photo bytes; content-addressed, so re-uploads and cloud copies share cache entries"""
+    digest = hashlib.sha256()
+    with open(photo_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _parse_hours(spec: str) -> Tuple[int, int]:
+    start, _, end = spec.partition("-")
+    return int(start) % 24, int(end or start) % 24
+
+
+class ProgressionCache:
+    """Age-progression variants keyed by (photo hash, ages, scenario): an in-process LRU in front of
+    JSON objects in cloud storage, so repeat views skip generation and survive restarts"""
+    def __init__(self, max_entries: int, load: Optional[Callable[[str], Optional[Dict]]] = None,
+                 store: Optional[Callable[[str, Dict], object]] = None):
+        self.max_entries = max_entries
+        self.load = load
+        self.store = store
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        # Photo URL -> content hash, so a repeat view of a case photo can be served without downloading it
+        self._digests: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats_counters = {"local_hits": 0, "cloud_hits": 0, "misses": 0, "stored": 0, "store_failures": 0}
+
+    @classmethod
+    def from_env(cls, load: Callable[[str], Optional[Dict]], store: Callable[[str, Dict], object]) -> "ProgressionCache":
+        return cls(int(os.getenv("PROGRESSION_CACHE_SIZE", "512")), load, store)
+
+    @staticmethod
+    def key(photo_hash: str, current_age: int, target_age: int, scenario: str) -> str:
+        return f"progressions/{photo_hash}/{current_age}-{target_age}/{scenario}.json"
+
+    def _remember(self, key: str, variation: Dict):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = variation
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def digest_of(self, source: Optional[str]) -> Optional[str]:
+        with self._lock:
+            return self._digests.get(source) if source else None
+
+    def remember_digest(self, source: str, photo_hash: str):
+        with self._lock:
+            self._digests[source] = photo_hash
+            self._digests.move_to_end(source)
+            while len(self._digests) > max(self.max_entries, 1):
+                self._digests.popitem(last=False)
+
+    def get(self, key: str, record: bool = True) -> Optional[Dict]:
+        """Local LRU first, then cloud storage (promoted into the LRU); None when neither has it.
+        record=False probes without counting towards the hit/miss statistics"""
+        tier = "local_hits"
+        with self._lock:
+            variation = self._entries.get(key)
+            if variation is not None:
+                self._entries.move_to_end(key)
+        if variation is None and self.load:
+            tier = "cloud_hits"
+            try:
+                variation = self.load(key)
+            except Exception as e:
+                logger.warning("Progression cache load failed", key=key, error=str(e))
+            if variation is not None:
+                self._remember(key, variation)
+        if record:
+            with self._lock:
+                self.stats_counters[tier if variation is not None else "misses"] += 1
+            (cache_hits if variation is not None else cache_misses).inc(cache="age_progression")
+        return dict(variation) if variation is not None else None
+
+    def put(self, key: str, variation: Dict):
+        self._remember(key, variation)
+        if not self.store:
+            return
+        try:
+            self.store(key, variation)
+            stored = "stored"
+        except Exception as e:
+            logger.warning("Progression cache store failed", key=key, error=str(e))
+            stored = "store_failures"
+        with self._lock:
+            self.stats_counters[stored] += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"entries": len(self._entries), "max_entries": self.max_entries,
+                    "known_photos": len(self._digests), **self.stats_counters}
+
+
+class ProgressionPrecomputer:
+    """
+    Queue of new cases whose common horizons are generated ahead of the first view. Work only runs
+    inside the off-peak window (local hours [start, end), may wrap midnight), on a daemon thread
+    that wakes every `poll_seconds`; outside the window cases simply wait in the queue.
+    """
+    def __init__(self, job: Callable[[Dict, List[int]], int], horizons: List[int], offpeak_hours: Tuple[int, int],
+                 poll_seconds: float = 300.0, max_pending: int = 1000):
+        self.job = job
+        self.horizons = horizons
+        self.offpeak_hours = offpeak_hours
+        self.poll_seconds = poll_seconds
+        self.max_pending = max_pending
+        self._pending: "OrderedDict[int, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._run_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats_counters = {"enqueued": 0, "dropped": 0, "cases_done": 0, "variants_generated": 0, "failures": 0}
+
+    @classmethod
+    def from_env(cls, job: Callable[[Dict, List[int]], int]) -> "ProgressionPrecomputer":
+        return cls(
+            job,
+            horizons=[int(h) for h in os.getenv("PROGRESSION_PRECOMPUTE_HORIZONS", "1,3,5,10").split(",") if h.strip()],
+            offpeak_hours=_parse_hours(os.getenv("PROGRESSION_OFFPEAK_HOURS", "1-6")),
+            poll_seconds=float(os.getenv("PROGRESSION_PRECOMPUTE_POLL_SECONDS", "300")),
+            max_pending=int(os.getenv("PROGRESSION_PRECOMPUTE_MAX_PENDING", "1000")),
+        )
+
+    def in_offpeak(self, now: Optional[datetime] = None) -> bool:
+        hour = (now or datetime.now()).hour
+        start, end = self.offpeak_hours
+        return start <= hour < end if start <= end else hour >= start or hour < end
+
+    def enqueue(self, case: Dict):
+        """Queue a case ({id, photo_path, age}) for precompute; never blocks the caller"""
+        if not self.horizons or not case.get("photo_path") or case.get("age") is None:
+            return
+        with self._lock:
+            if len(self._pending) >= self.max_pending:
+                self.stats_counters["dropped"] += 1
+                return
+            self._pending[case["id"]] = case
+            self.stats_counters["enqueued"] += 1
+        self._ensure_started()
+
+    def _ensure_started(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._loop, name="dhund-progression-precompute", daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        while not self._stopped.is_set():
+            self.run_pending()
+            self._wakeup.wait(self.poll_seconds)
+            self._wakeup.clear()
+
+    def run_pending(self, force: bool = False) -> int:
+        """Precompute queued cases while inside the off-peak window (or unconditionally when forced)"""
+        done = 0
+        with self._run_lock:
+            while not self._stopped.is_set() and (force or self.in_offpeak()):
+                with self._lock:
+                    if not self._pending:
+                        break
+                    _, case = self._pending.popitem(last=False)
+                try:
+                    generated = self.job(case, self.horizons)
+                    with self._lock:
+                        self.stats_counters["cases_done"] += 1
+                        self.stats_counters["variants_generated"] += generated
+                    done += 1
+                except Exception as e:
+                    logger.warning("Progression precompute failed", person_id=case.get("id"), error=str(e))
+                    with self._lock:
+                        self.stats_counters["failures"] += 1
+        if done:
+            logger.info("Progression precompute finished", cases=done, pending=len(self._pending))
+        return done
+
+    def stop(self):
+        self._stopped.set()
+        self._wakeup.set()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "pending": len(self._pending),
+                "horizons": list(self.horizons),
+                "offpeak_hours": "{}-{}".format(*self.offpeak_hours),
+                "in_offpeak": self.in_offpeak(),
+                **self.stats_counters,
+            }
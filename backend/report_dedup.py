@@ -0,0 +1,158 @@
+import os
+import time
+import asyncio
+import threading
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from .lexical_index import tokenize
+
+# Words that vary between reports of the same spot ("near the gate" vs "at gate")
+_LOCATION_FILLERS = {"near", "opposite", "outside", "inside", "behind", "next", "beside", "around", "close"}
+# ...and between two people describing the same sighting ("seen crying near the gate" vs "crying at gate")
+_DESCRIPTION_FILLERS = _LOCATION_FILLERS | {"seen", "saw", "spotted", "found", "very", "just", "some", "there",
+                                            "here", "was", "is", "looks", "looking", "wearing"}
+
+
+def normalize_location(location: str) -> str:
+    """Order-insensitive token key for a location string ("Dadar Station, near gate 2" == "gate 2 dadar station")"""
+    return " ".join(sorted(set(tokenize(location)) - _LOCATION_FILLERS))
+
+
+def normalize_description(description: str) -> str:
+    """Same token-set key for a sighting description, so wording and punctuation don't change its embedding"""
+    return " ".join(sorted(set(tokenize(description)) - _DESCRIPTION_FILLERS))
+
+
+def token_similarity(a: frozenset, b: frozenset) -> float:
+    """Jaccard overlap of two description token sets"""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class ReportCluster:
+    """Near-identical reports of one case: the first is verified and persisted, later ones only count"""
+    def __init__(self, person_id: int, location_key: str, tokens: frozenset, embedding: Optional[np.ndarray],
+                 now: float):
+        self.person_id = person_id
+        self.location_key = location_key
+        self.tokens = tokens
+        self.embedding = embedding
+        self.first_seen = now
+        self.last_seen = now
+        self.count = 1
+        self.report_id: Optional[int] = None
+        self.verification: Optional[Dict] = None
+        self._ready = asyncio.Event()
+
+    @property
+    def resolved(self) -> bool:
+        return self._ready.is_set()
+
+    async def wait(self) -> bool:
+        """Wait for the first report's verification; False when it failed (the caller verifies itself)"""
+        await self._ready.wait()
+        return self.report_id is not None
+
+
+class ReportDeduplicator:
+    """
+    Per-case sliding windows of report clusters. A report joins an open cluster when its normalized
+    location matches and the embedding of its normalized description is within `similarity` (cosine) of
+    the cluster's. Without a semantic embedding (hash fallback, which only matches identical text) the
+    description token sets must overlap by `token_threshold` (Jaccard) instead. A cluster stays open
+    while reports keep arriving within `window_seconds` of the last one.
+    """
+    def __init__(self, window_seconds: float = 600.0, similarity: float = 0.92, token_threshold: float = 0.8,
+                 max_clusters_per_case: int = 50):
+        self.window_seconds = window_seconds
+        self.similarity = similarity
+        self.token_threshold = token_threshold
+        self.max_clusters_per_case = max_clusters_per_case
+        self._clusters: Dict[int, List[ReportCluster]] = {}
+        self._lock = threading.Lock()
+        self.stats_counters = {"clusters": 0, "duplicates": 0, "failed_clusters": 0}
+
+    @classmethod
+    def from_env(cls) -> "ReportDeduplicator":
+        return cls(
+            window_seconds=float(os.getenv("REPORT_DEDUP_WINDOW_SECONDS", "600")),
+            similarity=float(os.getenv("REPORT_DEDUP_SIMILARITY", "0.92")),
+            token_threshold=float(os.getenv("REPORT_DEDUP_TOKEN_SIMILARITY", "0.8")),
+            max_clusters_per_case=int(os.getenv("REPORT_DEDUP_MAX_CLUSTERS_PER_CASE", "50")),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.window_seconds > 0
+
+    def _open_clusters(self, person_id: int, now: float) -> List[ReportCluster]:
+        clusters = [c for c in self._clusters.get(person_id, []) if now - c.last_seen <= self.window_seconds]
+        if clusters:
+            self._clusters[person_id] = clusters
+        else:
+            self._clusters.pop(person_id, None)
+        return clusters
+
+    def claim(self, person_id: int, location: str, description: str,
+              embedding=None) -> Tuple[ReportCluster, bool]:
+        """The open cluster this report belongs to, or a new one; returns (cluster, is_new).
+        `embedding` is of normalize_description(description), None without a semantic embeddings backend.
+        Must be called on the event loop thread (clusters carry an asyncio.Event)"""
+        vector = None
+        if embedding is not None:
+            vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+            norm = float(np.linalg.norm(vector))
+            vector = vector / norm if norm else vector
+        tokens = frozenset(normalize_description(description).split())
+        location_key = normalize_location(location)
+        now = time.monotonic()
+        with self._lock:
+            clusters = self._open_clusters(person_id, now)
+            best, best_margin = None, 0.0
+            for cluster in clusters:
+                if cluster.location_key != location_key:
+                    continue
+                if vector is not None and cluster.embedding is not None:
+                    margin = float(np.dot(cluster.embedding, vector)) - self.similarity
+                else:
+                    margin = token_similarity(cluster.tokens, tokens) - self.token_threshold
+                if margin >= best_margin:
+                    best, best_margin = cluster, margin
+            if best is not None:
+                best.count += 1
+                best.last_seen = now
+                self.stats_counters["duplicates"] += 1
+                return best, False
+            cluster = ReportCluster(person_id, location_key, tokens, vector, now)
+            clusters.append(cluster)
+            del clusters[:-self.max_clusters_per_case]
+            self._clusters[person_id] = clusters
+            self.stats_counters["clusters"] += 1
+            return cluster, True
+
+    def resolve(self, cluster: ReportCluster, report_id: int, verification: Dict):
+        """Publish the first report's outcome to duplicates waiting on the cluster"""
+        cluster.report_id = report_id or None
+        cluster.verification = verification
+        if cluster.report_id is None:
+            self.discard(cluster)
+        cluster._ready.set()
+
+    def discard(self, cluster: ReportCluster):
+        """Drop a cluster whose first report failed; waiting duplicates fall back to their own verification"""
+        with self._lock:
+            clusters = self._clusters.get(cluster.person_id, [])
+            if cluster in clusters:
+                clusters.remove(cluster)
+                self.stats_counters["failed_clusters"] += 1
+        cluster._ready.set()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            now = time.monotonic()
+            open_clusters = sum(len([c for c in clusters if now - c.last_seen <= self.window_seconds])
+                                for clusters in self._clusters.values())
+            return {"open_clusters": open_clusters, "window_seconds": self.window_seconds,
+                    "similarity": self.similarity, "token_threshold": self.token_threshold,
+                    **self.stats_counters}
@@ -0,0 +1,295 @@
+import os
+import time
+import threading
+from typing import Callable, Dict, Iterator, Optional
+from .logger import logger
+
+
+class ProviderUnavailableError(Exception):
+    """Raised when a call is rejected locally instead of being sent upstream"""
+
+
+class CircuitOpenError(ProviderUnavailableError):
+    pass
+
+
+class RateLimitedError(ProviderUnavailableError):
+    pass
+
+
+class ConcurrencyLimitError(ProviderUnavailableError):
+    pass
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `rate` tokens per second"""
+    def __init__(self, rate: float, capacity: float):
+        self.rate = max(rate, 1e-9)
+        self.capacity = max(capacity, 1.0)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated_at = now
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        with self._lock:
+            self._refill(time.monotonic())
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return True
+            return False
+
+    def time_until_available(self, tokens: float = 1.0) -> float:
+        """Seconds until `tokens` can be acquired (0 when available now)"""
+        with self._lock:
+            self._refill(time.monotonic())
+            missing = tokens - self.tokens
+            return max(0.0, missing / self.rate)
+
+    def acquire(self, tokens: float = 1.0, max_wait: float = 0.0) -> bool:
+        """Acquire tokens, sleeping at most `max_wait` seconds for a refill"""
+        deadline = time.monotonic() + max_wait
+        while True:
+            if self.try_acquire(tokens):
+                return True
+            wait = self.time_until_available(tokens)
+            if time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD concurrency limit: grows by one per window of fast successes, halves on failure"""
+    def __init__(self, initial: int, min_limit: int, max_limit: int, latency_target: float):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self.latency_target = latency_target
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return True
+            return False
+
+    def release(self, success: bool, latency: float):
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - 1)
+            if success and latency <= self.latency_target:
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            elif not success or latency > self.latency_target * 2:
+                self.limit = max(self.min_limit, self.limit / 2)
+
+    def abandon(self):
+        """Give a slot back without feeding the limit (the call's outcome is unknown)"""
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - 1)
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a half-open probing phase"""
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float, half_open_max_calls: int = 1):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = max(1, half_open_max_calls)
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.half_open_calls = 0
+        self.times_opened = 0
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                self.half_open_calls = 0
+            if self.state == self.HALF_OPEN:
+                if self.half_open_calls >= self.half_open_max_calls:
+                    return False
+                self.half_open_calls += 1
+            return True
+
+    def release_probe(self):
+        """Give back a half-open probe slot when the call never reached the provider"""
+        with self._lock:
+            if self.state == self.HALF_OPEN and self.half_open_calls > 0:
+                self.half_open_calls -= 1
+
+    def record_success(self):
+        with self._lock:
+            self.consecutive_failures = 0
+            if self.state != self.CLOSED:
+                logger.info("Circuit breaker closed: provider recovered")
+            self.state = self.CLOSED
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                    logger.warning("Circuit breaker opened: failing fast to fallback",
+                                   consecutive_failures=self.consecutive_failures)
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def remaining_open_time(self) -> float:
+        with self._lock:
+            if self.state != self.OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+
+class ResilienceGuard:
+    """Rate governor + adaptive concurrency + circuit breaker in front of an upstream provider"""
+    def __init__(self, name: str, bucket: TokenBucket, limiter: AdaptiveConcurrencyLimiter,
+                 breaker: CircuitBreaker, max_rate_wait: float = 0.0):
+        self.name = name
+        self.bucket = bucket
+        self.limiter = limiter
+        self.breaker = breaker
+        self.max_rate_wait = max_rate_wait
+        self.counters = {
+            "calls": 0, "successes": 0, "failures": 0, "abandoned": 0,
+            "rejected_circuit_open": 0, "rejected_rate_limited": 0, "rejected_concurrency": 0,
+        }
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, prefix: str) -> "ResilienceGuard":
+        """Build a guard from <PREFIX>_* environment variables"""
+        def env(key, default):
+            return type(default)(os.getenv(f"{prefix}_{key}", default))
+
+        rpm = env("RATE_LIMIT_RPM", 60.0)
+        bucket = TokenBucket(rate=rpm / 60.0, capacity=env("RATE_BURST", 10.0))
+        limiter = AdaptiveConcurrencyLimiter(
+            initial=env("CONCURRENCY_INITIAL", 4),
+            min_limit=env("CONCURRENCY_MIN", 1),
+            max_limit=env("CONCURRENCY_MAX", 16),
+            latency_target=env("LATENCY_TARGET_SECONDS", 15.0),
+        )
+        breaker = CircuitBreaker(
+            failure_threshold=env("BREAKER_FAILURES", 5),
+            reset_timeout=env("BREAKER_RESET_SECONDS", 30.0),
+            half_open_max_calls=env("BREAKER_HALF_OPEN_CALLS", 1),
+        )
+        return cls(prefix.lower(), bucket, limiter, breaker, max_rate_wait=env("RATE_MAX_WAIT_SECONDS", 0.5))
+
+    def _count(self, key: str):
+        with self._lock:
+            self.counters[key] += 1
+
+    def _admit(self):
+        if not self.breaker.allow_request():
+            self._count("rejected_circuit_open")
+            raise CircuitOpenError(f"{self.name} circuit open")
+        if not self.bucket.acquire(max_wait=self.max_rate_wait):
+            self._count("rejected_rate_limited")
+            self.breaker.release_probe()
+            raise RateLimitedError(f"{self.name} rate limit exceeded")
+        if not self.limiter.try_acquire():
+            self._count("rejected_concurrency")
+            self.breaker.release_probe()
+            raise ConcurrencyLimitError(f"{self.name} concurrency limit reached")
+        self._count("calls")
+
+    def _failed(self, error: Exception, is_failure: Optional[Callable[[Exception], bool]]) -> bool:
+        """Record a provider failure; False for client-side errors (bad request, auth), which say nothing
+        about provider health and count as successes"""
+        if is_failure is None or is_failure(error):
+            self._count("failures")
+            self.breaker.record_failure()
+            return True
+        return False
+
+    def _finish(self, success: bool, start: float):
+        self.limiter.release(success, time.monotonic() - start)
+        if success:
+            with self._lock:
+                self.counters["successes"] += 1
+            self.breaker.record_success()
+
+    def call(self, fn: Callable, *args, is_failure: Optional[Callable[[Exception], bool]] = None, **kwargs):
+        """Run `fn` under the guard; raises ProviderUnavailableError without calling upstream when unhealthy"""
+        self._admit()
+        start = time.monotonic()
+        success = False
+        try:
+            result = fn(*args, **kwargs)
+            success = True
+            return result
+        except Exception as e:
+            success = not self._failed(e, is_failure)
+            raise
+        finally:
+            self._finish(success, start)
+
+    def call_stream(self, fn: Callable, *args, is_failure: Optional[Callable[[Exception], bool]] = None,
+                    **kwargs) -> Iterator:
+        """Iterate the stream returned by `fn` under the guard. The concurrency slot is held until the stream
+        ends, and the outcome (including errors raised mid-stream) is recorded then; admission happens on
+        the first next(), so ProviderUnavailableError surfaces from the iteration"""
+        self._admit()
+        start = time.monotonic()
+        success = False
+        abandoned = False
+        stream = None
+        try:
+            stream = fn(*args, **kwargs)
+            for item in stream:
+                yield item
+            success = True
+        except GeneratorExit:
+            # The consumer stopped reading early: nothing is known about provider health, so neither
+            # the breaker (a half-open probe must not count as recovered) nor the limiter hears about it
+            abandoned = True
+            raise
+        except Exception as e:
+            success = not self._failed(e, is_failure)
+            raise
+        finally:
+            # Give the upstream connection back even when the consumer stopped early
+            close = getattr(stream, "close", None)
+            if close:
+                try:
+                    close()
+                except Exception:
+                    pass
+            if abandoned:
+                self._count("abandoned")
+                self.limiter.abandon()
+                self.breaker.release_probe()
+            else:
+                self._finish(success, start)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counters = dict(self.counters)
+        return {
+            "name": self.name,
+            "circuit_state": self.breaker.state,
+            "circuit_open_remaining_seconds": round(self.breaker.remaining_open_time(), 2),
+            "circuit_times_opened": self.breaker.times_opened,
+            "consecutive_failures": self.breaker.consecutive_failures,
+            "concurrency_limit": int(self.limiter.limit),
+            "in_flight": self.limiter.in_flight,
+            "rate_tokens_available": round(self.bucket.tokens, 2),
+            "rate_per_second": round(self.bucket.rate, 3),
+            **counters,
+        }
@@ -0,0 +1,194 @@
+import os
+import math
+import time
+import asyncio
+import itertools
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional
+from .logger import logger
+from .metrics import scheduler_rejections, scheduler_wait
+
+# Share of verification capacity per job: child (CRITICAL) cases get 4x an adult case's share
+PRIORITY_WEIGHTS = {"CRITICAL": 4.0, "HIGH": 2.0, "NORMAL": 1.0}
+
+
+class SchedulerOverloaded(Exception):
+    """A job could not get a slot: the queue is full or its deadline passed while waiting"""
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Job:
+    __slots__ = ("seq", "kind", "case_key", "priority", "weight", "deadline", "enqueued", "future")
+
+    def __init__(self, seq: int, kind: str, case_key, priority: str, weight: float, deadline: float):
+        self.seq = seq
+        self.kind = kind
+        self.case_key = case_key
+        self.priority = priority
+        self.weight = weight
+        self.deadline = deadline
+        self.enqueued = time.monotonic()
+        self.future: Optional[asyncio.Future] = None
+
+
+class VerificationScheduler:
+    """
+    Bounded slots for verification and analysis jobs with start-time fair queuing across cases.
+    Each case's virtual clock advances by 1/weight per job it starts, so a viral case cannot starve
+    the others; weights come from search priority (CRITICAL children first) and are doubled while a
+    case is inside its first `golden_hours`. Jobs within `deadline_slack` of their deadline jump the
+    queue (earliest deadline first); jobs whose deadline passes while queued are rejected.
+    """
+    def __init__(self, max_concurrent: int = 4, max_queue: int = 200, default_deadline: float = 30.0,
+                 deadline_slack: float = 5.0, golden_hours: float = 72.0):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.default_deadline = default_deadline
+        self.deadline_slack = deadline_slack
+        self.golden_hours = golden_hours
+        self._running = 0
+        self._waiting: List[_Job] = []
+        self._case_finish: Dict[str, float] = {}
+        self._virtual_time = 0.0
+        self._seq = itertools.count()
+        # Smoothed slot hold time, for the Retry-After hint on rejection
+        self._service_seconds = 1.0
+        self.stats_counters = {"started": 0, "waited": 0, "rejected": 0, "expired": 0}
+
+    @classmethod
+    def from_env(cls) -> "VerificationScheduler":
+        return cls(
+            max_concurrent=int(os.getenv("SCHEDULER_MAX_CONCURRENT", "4")),
+            max_queue=int(os.getenv("SCHEDULER_MAX_QUEUE", "200")),
+            default_deadline=float(os.getenv("SCHEDULER_DEADLINE_SECONDS", "30")),
+            deadline_slack=float(os.getenv("SCHEDULER_DEADLINE_SLACK_SECONDS", "5")),
+            golden_hours=float(os.getenv("SCHEDULER_GOLDEN_HOURS", "72")),
+        )
+
+    @staticmethod
+    def priority_for(age: Optional[int]) -> str:
+        """Same rule as the case analysis' search_priority"""
+        if age is None:
+            return "NORMAL"
+        return "CRITICAL" if age < 12 else "HIGH"
+
+    def weight(self, priority: str, reported_at=None) -> float:
+        weight = PRIORITY_WEIGHTS.get(priority, 1.0)
+        if isinstance(reported_at, str):
+            try:
+                reported_at = datetime.fromisoformat(reported_at.replace("Z", "+00:00"))
+            except ValueError:
+                reported_at = None
+        if reported_at:
+            # Naive timestamps are local time, as written by the intake endpoints
+            age = datetime.now(reported_at.tzinfo) - reported_at
+            if age.total_seconds() < self.golden_hours * 3600:
+                weight *= 2
+        return weight
+
+    def _start_tag(self, job: _Job) -> float:
+        if job.case_key is None:
+            return self._virtual_time
+        return max(self._virtual_time, self._case_finish.get(job.case_key, 0.0))
+
+    def _start(self, job: _Job):
+        """Charge the job to its case's virtual clock and take a slot"""
+        start = self._start_tag(job)
+        self._virtual_time = start
+        if job.case_key is not None:
+            self._case_finish[job.case_key] = start + 1.0 / job.weight
+        if len(self._case_finish) > 4 * self.max_queue:
+            # Cases that have fallen behind the clock carry no credit, so dropping them is lossless
+            self._case_finish = {k: v for k, v in self._case_finish.items() if v > self._virtual_time}
+        self._running += 1
+        self.stats_counters["started"] += 1
+
+    def _next(self) -> Optional[_Job]:
+        now = time.monotonic()
+
+        def order(job: _Job):
+            urgent = job.deadline - now <= self.deadline_slack
+            return (not urgent, job.deadline if urgent else self._start_tag(job), -job.weight, job.seq)
+
+        self._waiting = [job for job in self._waiting if not job.future.done()]
+        return min(self._waiting, key=order) if self._waiting else None
+
+    def _dispatch(self):
+        while self._running < self.max_concurrent:
+            job = self._next()
+            if job is None:
+                return
+            self._waiting.remove(job)
+            self._start(job)
+            job.future.set_result(True)
+
+    @asynccontextmanager
+    async def slot(self, kind: str, case_id=None, priority: str = "NORMAL", reported_at=None,
+                   deadline_seconds: Optional[float] = None) -> AsyncIterator[None]:
+        """Hold one of the scheduler's slots for the duration of the block; raises SchedulerOverloaded.
+        Jobs of the same case_id share that case's fair share; case_id=None jobs (intake) are each their own flow"""
+        deadline = time.monotonic() + (deadline_seconds or self.default_deadline)
+        job = _Job(next(self._seq), kind, case_id, priority, self.weight(priority, reported_at), deadline)
+        if self._running < self.max_concurrent and not self._waiting:
+            self._start(job)
+        else:
+            if len(self._waiting) >= self.max_queue:
+                self._reject(job, "queue_full")
+            job.future = asyncio.get_running_loop().create_future()
+            self._waiting.append(job)
+            self.stats_counters["waited"] += 1
+            try:
+                await asyncio.wait_for(asyncio.shield(job.future), timeout=max(deadline - time.monotonic(), 0))
+            except asyncio.TimeoutError:
+                if not job.future.done():
+                    job.future.cancel()
+                    self._reject(job, "deadline")
+            except BaseException:
+                # Client went away while queued: give the slot back if it was already granted
+                if job.future.done() and not job.future.cancelled():
+                    self._release(0.0)
+                else:
+                    job.future.cancel()
+                raise
+        started = time.monotonic()
+        scheduler_wait.observe(started - job.enqueued, kind=kind, priority=priority)
+        try:
+            yield
+        finally:
+            self._release(time.monotonic() - started)
+
+    def _release(self, held: float):
+        self._running -= 1
+        if held:
+            self._service_seconds += 0.2 * (held - self._service_seconds)
+        self._dispatch()
+
+    def _reject(self, job: _Job, reason: str):
+        self.stats_counters["expired" if reason == "deadline" else "rejected"] += 1
+        scheduler_rejections.inc(kind=job.kind, reason=reason)
+        logger.warning("Scheduler rejected job", kind=job.kind, priority=job.priority, reason=reason,
+                       queued=len(self._waiting), running=self._running)
+        backlog = (len(self._waiting) + 1) / max(self.max_concurrent, 1)
+        raise SchedulerOverloaded(reason, max(1, math.ceil(backlog * self._service_seconds)))
+
+    def queue_depths(self) -> Dict:
+        depths: Dict = {}
+        for job in self._waiting:
+            if not job.future.done():
+                depths[(job.kind, job.priority)] = depths.get((job.kind, job.priority), 0) + 1
+        return depths
+
+    def stats(self) -> Dict:
+        return {
+            "running": self._running,
+            "max_concurrent": self.max_concurrent,
+            "queued": sum(self.queue_depths().values()),
+            "queue_depths": {f"{kind}:{priority}": depth for (kind, priority), depth in self.queue_depths().items()},
+            "tracked_cases": len(self._case_finish),
+            "avg_slot_seconds": round(self._service_seconds, 3),
+            **self.stats_counters,
+        }
@@ -0,0 +1,247 @@
+import os
+import json
+import time
+import queue
+import random
+import secrets
+import asyncio
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Dict, List, Optional
+from .logger import logger
+
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+# Head sampling rate; slow or failed requests are always kept (tail policy)
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.01"))
+TRACE_SLOW_THRESHOLD_MS = float(os.getenv("TRACE_SLOW_THRESHOLD_MS", "5000"))
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", os.path.join(os.environ.get("TMPDIR", "/tmp"), "dhund_traces.jsonl"))
+TRACE_OTLP_ENDPOINT = os.getenv("TRACE_OTLP_ENDPOINT", "")
+SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "dhund-api")
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("dhund_current_span", default=None)
+
+
+class Trace:
+    """Spans of one request, buffered until the root finishes so the keep/drop decision can see its duration"""
+    def __init__(self, trace_id: str, head_sampled: bool):
+        self.trace_id = trace_id
+        self.head_sampled = head_sampled
+        self.spans: List["Span"] = []
+        self.finished = False
+        self.kept = False
+        self._lock = threading.Lock()
+
+    def add(self, span: "Span"):
+        with self._lock:
+            if not self.finished:
+                self.spans.append(span)
+                return
+        # Spans ending after the root (e.g. streamed response bodies) follow the root's decision
+        if self.kept:
+            exporter.export([span])
+
+
+class Span:
+    def __init__(self, trace: Trace, name: str, parent: Optional["Span"], attributes: Dict):
+        self.trace = trace
+        self.name = name
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent else None
+        self.parent_remote_id = None
+        self.attributes = dict(attributes)
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.error = None
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def end(self):
+        self.end_ns = time.time_ns()
+        self.trace.add(self)
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def to_otlp(self) -> Dict:
+        span = {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 2 if self.parent_id is None else 1,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        parent = self.parent_id or self.parent_remote_id
+        if parent:
+            span["parentSpanId"] = parent
+        return span
+
+
+def _otlp_value(value) -> Dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class SpanExporter:
+    """Background exporter writing OTLP/JSON payloads to a local file or an OTLP HTTP collector"""
+    def __init__(self, path: str, endpoint: str):
+        self.path = path
+        self.endpoint = endpoint
+        self._queue: queue.Queue = queue.Queue(maxsize=10000)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def export(self, spans: List[Span]):
+        if not spans:
+            return
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            self.dropped += len(spans)
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="dhund-trace-exporter", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = self._queue.get()
+            if batch is None:
+                self._queue.task_done()
+                break
+            try:
+                self._write(batch)
+            except Exception as e:
+                logger.warning("Trace export failed", error=str(e))
+            finally:
+                self._queue.task_done()
+
+    def _payload(self, spans: List[Span]) -> Dict:
+        return {"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+            "scopeSpans": [{"scope": {"name": "dhund.tracing"}, "spans": [s.to_otlp() for s in spans]}],
+        }]}
+
+    def _write(self, spans: List[Span]):
+        payload = self._payload(spans)
+        if self.endpoint:
+            import requests
+            requests.post(self.endpoint, json=payload, timeout=5)
+        else:
+            with open(self.path, "a") as f:
+                f.write(json.dumps(payload) + "\n")
+
+    def flush(self, timeout: float = 5.0):
+        """Block until queued spans are written (used at shutdown)"""
+        if self._thread is None:
+            return
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+
+exporter = SpanExporter(TRACE_EXPORT_PATH, TRACE_OTLP_ENDPOINT)
+
+
+def _parse_traceparent(header: Optional[str]):
+    """W3C traceparent -> (trace_id, parent_span_id, sampled) or None"""
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return parts[1], parts[2], parts[3] == "01"
+
+
+@contextmanager
+def start_trace(name: str, traceparent: Optional[str] = None, **attributes):
+    """Root span for a request; yields the span (or None when tracing is disabled)"""
+    if not TRACING_ENABLED:
+        yield None
+        return
+    incoming = _parse_traceparent(traceparent)
+    if incoming:
+        trace = Trace(incoming[0], head_sampled=incoming[2] or random.random() < TRACE_SAMPLE_RATE)
+    else:
+        trace = Trace(secrets.token_hex(16), head_sampled=random.random() < TRACE_SAMPLE_RATE)
+    root = Span(trace, name, None, attributes)
+    if incoming:
+        root.parent_remote_id = incoming[1]
+    token = _current_span.set(root)
+    try:
+        yield root
+    except Exception as e:
+        root.error = str(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        root.end()
+        _finish_trace(trace, root)
+
+
+def _finish_trace(trace: Trace, root: Span):
+    with trace._lock:
+        trace.finished = True
+        has_error = any(span.error for span in trace.spans)
+        trace.kept = trace.head_sampled or has_error or root.duration_ms >= TRACE_SLOW_THRESHOLD_MS
+        spans, trace.spans = trace.spans, []
+    if trace.kept:
+        exporter.export(spans)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Child span of the current request; a no-op outside a traced request"""
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    child = Span(parent.trace, name, parent, attributes)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except Exception as e:
+        child.error = str(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        child.end()
+
+
+def traced(name: Optional[str] = None):
+    """Decorator recording a span around a sync or async function"""
+    def decorator(fn):
+        span_name = name or fn.__qualname__
+        if asyncio.iscoroutinefunction(fn):
+            @wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def current_trace_id() -> Optional[str]:
+    current = _current_span.get()
+    return current.trace.trace_id if current else None
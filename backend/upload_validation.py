@@ -0,0 +1,201 @@
+import os
+import struct
+from typing import BinaryIO, Dict, Optional, Tuple
+from .lazy import optional_import
+from .logger import logger
+from .metrics import observe_stage
+
+# Admission limits, checked from headers before anything is decoded or sent to a model
+UPLOAD_MAX_IMAGE_BYTES = int(os.getenv("UPLOAD_MAX_IMAGE_BYTES", str(10 * 1024 * 1024)))
+UPLOAD_MAX_AUDIO_BYTES = int(os.getenv("UPLOAD_MAX_AUDIO_BYTES", str(25 * 1024 * 1024)))
+UPLOAD_MAX_PIXELS = int(os.getenv("UPLOAD_MAX_PIXELS", "40000000"))
+UPLOAD_MIN_SIDE = int(os.getenv("UPLOAD_MIN_SIDE", "32"))
+# Images whose longest side exceeds this are downscaled right after upload (0 disables)
+UPLOAD_MAX_SIDE = int(os.getenv("UPLOAD_MAX_SIDE", "2048"))
+# Bytes buffered for sniffing; JPEG dimensions sit after EXIF/ICC segments, which can be large
+UPLOAD_HEADER_BYTES = 256 * 1024
+_CHUNK = 1024 * 1024
+
+IMAGE_EXTENSIONS = {"jpeg": "jpg", "png": "png", "webp": "webp", "bmp": "bmp"}
+AUDIO_EXTENSIONS = {"wav": "wav", "mp3": "mp3", "ogg": "ogg", "flac": "flac", "webm": "webm", "mp4": "m4a"}
+# JPEG start-of-frame markers (baseline, progressive, lossless...); C4/C8/CC are tables, not frames
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+class UploadRejected(Exception):
+    """An upload refused at admission; status_code is 413 (too large), 415 (wrong type) or 422 (unusable)"""
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def sniff_image(header: bytes) -> Optional[str]:
+    if header.startswith(b"\xff\xd8\xff"):
+        return "jpeg"
+    if header.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "webp"
+    if header.startswith(b"BM"):
+        return "bmp"
+    return None
+
+
+def sniff_audio(header: bytes) -> Optional[str]:
+    if header[:4] == b"RIFF" and header[8:12] == b"WAVE":
+        return "wav"
+    if header.startswith(b"ID3") or (len(header) > 1 and header[0] == 0xFF and header[1] & 0xE0 == 0xE0):
+        return "mp3"
+    if header.startswith(b"OggS"):
+        return "ogg"
+    if header.startswith(b"fLaC"):
+        return "flac"
+    if header.startswith(b"\x1a\x45\xdf\xa3"):
+        return "webm"
+    if header[4:8] == b"ftyp":
+        return "mp4"
+    return None
+
+
+def _jpeg_dimensions(header: bytes) -> Optional[Tuple[int, int]]:
+    offset = 2
+    while offset + 9 <= len(header):
+        if header[offset] != 0xFF:
+            return None
+        marker = header[offset + 1]
+        if marker == 0xFF:
+            offset += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            offset += 2
+            continue
+        length = struct.unpack(">H", header[offset + 2:offset + 4])[0]
+        if marker in _JPEG_SOF:
+            height, width = struct.unpack(">HH", header[offset + 5:offset + 9])
+            return width, height
+        offset += 2 + length
+    return None
+
+
+def image_dimensions(header: bytes, fmt: str) -> Optional[Tuple[int, int]]:
+    """(width, height) read from the container header only; None when the header is truncated or corrupt"""
+    try:
+        if fmt == "png" and header[12:16] == b"IHDR":
+            return struct.unpack(">II", header[16:24])
+        if fmt == "jpeg":
+            return _jpeg_dimensions(header)
+        if fmt == "bmp":
+            width, height = struct.unpack("<ii", header[18:26])
+            return abs(width), abs(height)
+        if fmt == "webp":
+            chunk = header[12:16]
+            if chunk == b"VP8 ":
+                width, height = struct.unpack("<HH", header[26:30])
+                return width & 0x3FFF, height & 0x3FFF
+            if chunk == b"VP8L":
+                bits = int.from_bytes(header[21:25], "little")
+                return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+            if chunk == b"VP8X":
+                return int.from_bytes(header[24:27], "little") + 1, int.from_bytes(header[27:30], "little") + 1
+    except struct.error:
+        return None
+    return None
+
+
+def _check_image_header(header: bytes) -> Tuple[str, Tuple[int, int]]:
+    fmt = sniff_image(header)
+    if fmt is None:
+        raise UploadRejected(415, "Unsupported image type (JPEG, PNG, WebP or BMP expected)")
+    dimensions = image_dimensions(header, fmt)
+    if not dimensions or min(dimensions) <= 0:
+        raise UploadRejected(422, f"Corrupt or truncated {fmt.upper()} image")
+    width, height = dimensions
+    if min(width, height) < UPLOAD_MIN_SIDE:
+        raise UploadRejected(422, f"Image too small ({width}x{height}); at least {UPLOAD_MIN_SIDE}px per side needed")
+    if width * height > UPLOAD_MAX_PIXELS:
+        raise UploadRejected(413, f"Image too large ({width}x{height}); at most {UPLOAD_MAX_PIXELS} pixels accepted")
+    return fmt, dimensions
+
+
+def save_validated(source: BinaryIO, directory: str, stem: str, kind: str = "image",
+                   declared_size: Optional[int] = None) -> Tuple[str, Dict]:
+    """
+    Copy an upload to `directory` after admission checks: declared size first, then magic bytes and
+    (images) header dimensions from the first chunk, then the byte cap while copying. Nothing is
+    decoded unless an oversized image has to be downscaled. Returns (path, info); raises UploadRejected.
+    """
+    max_bytes = UPLOAD_MAX_IMAGE_BYTES if kind == "image" else UPLOAD_MAX_AUDIO_BYTES
+    if declared_size is not None and declared_size > max_bytes:
+        raise UploadRejected(413, f"Upload exceeds {max_bytes / (1024 * 1024):.3g} MB limit")
+
+    with observe_stage("upload.admission"):
+        header = source.read(UPLOAD_HEADER_BYTES)
+        if not header:
+            raise UploadRejected(422, "Empty upload")
+        info: Dict = {"kind": kind}
+        if kind == "image":
+            fmt, (width, height) = _check_image_header(header)
+            info.update(format=fmt, width=width, height=height)
+            extension = IMAGE_EXTENSIONS[fmt]
+        else:
+            fmt = sniff_audio(header)
+            if fmt is None:
+                raise UploadRejected(415, "Unsupported audio type (WAV, MP3, OGG, FLAC, WebM or M4A expected)")
+            info["format"] = fmt
+            extension = AUDIO_EXTENSIONS[fmt]
+
+        path = os.path.join(directory, f"{stem}.{extension}")
+        size = len(header)
+        try:
+            with open(path, "wb") as buffer:
+                buffer.write(header)
+                while size <= max_bytes:
+                    chunk = source.read(_CHUNK)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    buffer.write(chunk)
+            if size > max_bytes:
+                raise UploadRejected(413, f"Upload exceeds {max_bytes / (1024 * 1024):.3g} MB limit")
+        except BaseException:
+            if os.path.exists(path):
+                os.remove(path)
+            raise
+        info["bytes"] = size
+
+    if kind == "image" and UPLOAD_MAX_SIDE and max(info["width"], info["height"]) > UPLOAD_MAX_SIDE:
+        path = _downscale(path, info)
+    return path, info
+
+
+def _downscale(path: str, info: Dict) -> str:
+    """Shrink to UPLOAD_MAX_SIDE so later stages never decode the full image; original kept on failure"""
+    cv2 = optional_import("cv2")
+    if cv2 is None:
+        return path
+    with observe_stage("upload.downscale"):
+        longest = max(info["width"], info["height"])
+        # libjpeg can decode at 1/2, 1/4 or 1/8 scale directly, skipping most of the work
+        flags = cv2.IMREAD_COLOR
+        if info["format"] == "jpeg":
+            for factor, reduced in ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4),
+                                    (2, cv2.IMREAD_REDUCED_COLOR_2)):
+                if longest / factor >= UPLOAD_MAX_SIDE:
+                    flags = reduced
+                    break
+        image = cv2.imread(path, flags)
+        if image is None:
+            logger.warning("Upload downscale skipped: decode failed", path=path)
+            return path
+        height, width = image.shape[:2]
+        scale = UPLOAD_MAX_SIDE / max(height, width)
+        if scale < 1.0:
+            image = cv2.resize(image, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+        target = path if info["format"] in ("jpeg", "png") else f"{os.path.splitext(path)[0]}.jpg"
+        if not cv2.imwrite(target, image):
+            return path
+        if target != path:
+            os.remove(path)
+        info.update(downscaled_from=f"{info['width']}x{info['height']}", width=image.shape[1], height=image.shape[0])
+        return target
@@ -0,0 +1,125 @@
+"""
+Local OpenAI-compatible stand-in for the Grok API.
+
+Serves /v1/chat/completions (buffered and streamed) and /v1/embeddings with configurable
+latency, per-token streaming delay and error rate so the resilience layer and streaming
+endpoints can be benchmarked offline.
+"""
+import json
+import time
+import random
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler
+
+from .fake_supabase import QuietHTTPServer
+
+ANALYSIS_TEXT = (
+    "1. CRANIOFACIAL_STRUCTURE: Proportions consistent with the stated age. "
+    "2. IDENTIFYING_LANDMARKS: No permanent marks visible. "
+    "3. CLOTHING_DEGRADATION: Mild wear. "
+    "4. SEARCH_PREDICTION: Railway stations, bus terminals, markets."
+)
+VERIFICATION_TEXT = "COMPONENT_MATCH: Nasal bridge and chin structure align. Final confidence: 84% based on biometric alignment."
+
+
+class FakeLLMConfig:
+    def __init__(self, latency_ms: float = 0.0, token_delay_ms: float = 0.0, error_rate: float = 0.0, seed: int = 7):
+        self.latency_ms = latency_ms
+        self.token_delay_ms = token_delay_ms
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+
+    def should_fail(self) -> bool:
+        with self.lock:
+            self.requests += 1
+            return self.random.random() < self.error_rate
+
+
+def _embedding(text: str, dims: int):
+    digest = hashlib.sha256(text.encode()).digest()
+    rng = random.Random(digest)
+    return [rng.uniform(-1, 1) for _ in range(dims)]
+
+
+def make_handler(config: FakeLLMConfig):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        wbufsize = -1
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def _json(self, status: int, body):
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0) or 0)
+            request = json.loads(self.rfile.read(length) or b"{}")
+            time.sleep(config.latency_ms / 1000.0)
+            if config.should_fail():
+                return self._json(500, {"error": {"message": "injected upstream failure", "type": "server_error"}})
+
+            if self.path.endswith("/embeddings"):
+                inputs = request.get("input")
+                inputs = inputs if isinstance(inputs, list) else [inputs]
+                dims = request.get("dimensions") or 1536
+                return self._json(200, {
+                    "object": "list",
+                    "model": request.get("model"),
+                    "data": [{"object": "embedding", "index": i, "embedding": _embedding(str(t), dims)}
+                             for i, t in enumerate(inputs)],
+                    "usage": {"prompt_tokens": 0, "total_tokens": 0},
+                })
+
+            if self.path.endswith("/chat/completions"):
+                content = request["messages"][0]["content"]
+                prompt = content[0]["text"] if isinstance(content, list) else content
+                text = VERIFICATION_TEXT if "VERIFICATION" in prompt else ANALYSIS_TEXT
+                if request.get("stream"):
+                    return self._stream(request.get("model"), text)
+                return self._json(200, {
+                    "id": "chatcmpl-bench", "object": "chat.completion", "created": int(time.time()),
+                    "model": request.get("model"),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                })
+            self._json(404, {"error": {"message": "not found"}})
+
+        def _stream(self, model: str, text: str):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            self.wfile.flush()
+
+            def chunk(data: str):
+                payload = data.encode()
+                self.wfile.write(f"{len(payload):x}\r\n".encode() + payload + b"\r\n")
+                self.wfile.flush()
+
+            for token in text.split(" "):
+                time.sleep(config.token_delay_ms / 1000.0)
+                body = {"id": "chatcmpl-bench", "object": "chat.completion.chunk", "created": int(time.time()),
+                        "model": model, "choices": [{"index": 0, "delta": {"content": token + " "}, "finish_reason": None}]}
+                chunk(f"data: {json.dumps(body)}\n\n")
+            chunk("data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+
+    return Handler
+
+
+def serve(config: FakeLLMConfig, host: str = "127.0.0.1", port: int = 0):
+    """Start the fake in a daemon thread; returns (server, base_url)"""
+    server = QuietHTTPServer((host, port), make_handler(config))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/v1"
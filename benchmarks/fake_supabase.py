@@ -0,0 +1,360 @@
+"""
+Local stand-in for the Supabase REST (PostgREST) and Storage APIs.
+
+Implements just enough of both for the DHUND backend: table select/insert/update/delete
+with PostgREST filters, ordering, limits and exact counts, the RPC functions declared in
+SUPABASE_SCHEMA.sql, and object upload/public download. Vector columns are returned in
+pgvector's text form ("[0.1,0.2,...]") like the real service.
+"""
+import re
+import sys
+import json
+import math
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qsl, unquote, urlparse
+
+VECTOR_COLUMNS = {"embedding", "face_encoding"}
+TABLE_DEFAULTS = {
+    "missing_persons": {"status": "missing", "ai_analysis": {}},
+    "citizen_reports": {"status": "pending"},
+    "search_status": {"status": "searching", "cameras_searched": 0, "matches_found": 0},
+}
+PRIMARY_KEYS = {"search_status": "person_id"}
+# Tables whose updated_at is maintained by a trigger in SUPABASE_SCHEMA.sql
+TOUCHED_TABLES = {"missing_persons"}
+
+
+def _coerce(value: str):
+    if value == "null":
+        return None
+    if value in ("true", "false"):
+        return value == "true"
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def _compare(left, right) -> Optional[int]:
+    if left is None or right is None:
+        return None
+    try:
+        left, right = float(left), float(right)
+    except (TypeError, ValueError):
+        left, right = str(left), str(right)
+    return (left > right) - (left < right)
+
+
+def _like(pattern: str, ignore_case: bool):
+    """SQL LIKE pattern (PostgREST's * alias for %, backslash escapes) as a compiled regex"""
+    parts, chars = [], iter(pattern)
+    for char in chars:
+        if char == "\\":
+            parts.append(re.escape(next(chars, "\\")))
+        elif char in "%*":
+            parts.append(".*")
+        elif char == "_":
+            parts.append(".")
+        else:
+            parts.append(re.escape(char))
+    return re.compile("".join(parts), re.DOTALL | (re.IGNORECASE if ignore_case else 0))
+
+
+def _matches(row: Dict, column: str, expression: str) -> bool:
+    negate = expression.startswith("not.")
+    if negate:
+        expression = expression[4:]
+    op, _, raw = expression.partition(".")
+    value = row.get(column)
+    if op == "is":
+        result = value is None if raw == "null" else value == _coerce(raw)
+    elif op == "in":
+        options = [_coerce(v.strip().strip('"')) for v in raw.strip("()").split(",") if v.strip()]
+        result = any(_compare(value, option) == 0 for option in options)
+    elif op in ("like", "ilike"):
+        result = value is not None and _like(raw, op == "ilike").fullmatch(str(value)) is not None
+    else:
+        cmp = _compare(value, _coerce(raw))
+        result = cmp is not None and {
+            "eq": cmp == 0, "neq": cmp != 0, "gt": cmp > 0, "gte": cmp >= 0, "lt": cmp < 0, "lte": cmp <= 0,
+        }.get(op, False)
+    return not result if negate else result
+
+
+def _cosine(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class FakeSupabase:
+    """In-memory tables + object store; every mutation happens under one lock (atomic per call)"""
+    def __init__(self):
+        self.tables: Dict[str, List[Dict]] = {}
+        self.sequences: Dict[str, int] = {}
+        self.objects: Dict[str, bytes] = {}
+        self.lock = threading.RLock()
+        self.rpc_functions = {
+            "match_missing_persons": self._rpc_match_missing_persons,
+            "create_missing_person": self._rpc_create_missing_person,
+            "record_match": self._rpc_record_match,
+        }
+
+    # --- tables -------------------------------------------------------------------------------
+    def insert(self, table: str, rows: List[Dict]) -> List[Dict]:
+        with self.lock:
+            stored = []
+            for row in rows:
+                record = {**TABLE_DEFAULTS.get(table, {}), **row}
+                if PRIMARY_KEYS.get(table, "id") == "id" and "id" not in record:
+                    self.sequences[table] = self.sequences.get(table, 0) + 1
+                    record["id"] = self.sequences[table]
+                record.setdefault("created_at", datetime.now().isoformat())
+                if table in TOUCHED_TABLES:
+                    record["updated_at"] = datetime.now().isoformat()
+                self.tables.setdefault(table, []).append(record)
+                stored.append(record)
+            return [dict(r) for r in stored]
+
+    def select(self, table: str, filters: List, order: Optional[str] = None,
+               limit: Optional[int] = None, offset: int = 0) -> List[Dict]:
+        with self.lock:
+            rows = [r for r in self.tables.get(table, []) if all(_matches(r, c, e) for c, e in filters)]
+        for clause in reversed((order or "").split(",")):
+            if not clause:
+                continue
+            column, _, direction = clause.partition(".")
+            desc = direction.startswith("desc")
+            rows.sort(key=lambda r: (r.get(column) is None, r.get(column) or 0), reverse=desc)
+        rows = rows[offset:]
+        if limit is not None:
+            rows = rows[:limit]
+        return [dict(r) for r in rows]
+
+    def update(self, table: str, filters: List, values: Dict) -> List[Dict]:
+        with self.lock:
+            updated = []
+            for row in self.tables.get(table, []):
+                if all(_matches(row, c, e) for c, e in filters):
+                    row.update(values)
+                    if table in TOUCHED_TABLES:
+                        row["updated_at"] = datetime.now().isoformat()
+                    updated.append(dict(row))
+            return updated
+
+    def delete(self, table: str, filters: List) -> List[Dict]:
+        with self.lock:
+            keep, removed = [], []
+            for row in self.tables.get(table, []):
+                (removed if all(_matches(row, c, e) for c, e in filters) else keep).append(row)
+            self.tables[table] = keep
+            return removed
+
+    # --- rpc ----------------------------------------------------------------------------------
+    def _rpc_create_missing_person(self, args: Dict) -> int:
+        person = {"status": "missing", **args["person"]}
+        with self.lock:
+            person_id = self.insert("missing_persons", [person])[0]["id"]
+            self.insert("search_status", [{"person_id": person_id, "status": "searching",
+                                           "last_updated": datetime.now().isoformat(),
+                                           "cameras_searched": 0, "matches_found": 0}])
+        return person_id
+
+    def _rpc_record_match(self, args: Dict) -> int:
+        person_id, match = args["target_person_id"], args["match"]
+        with self.lock:
+            self.update("missing_persons", [("id", f"eq.{person_id}")], {"status": "found"})
+            self.update("search_status", [("person_id", f"eq.{person_id}")],
+                        {"status": "found", "last_updated": datetime.now().isoformat()})
+            return self.insert("search_results", [{
+                "person_id": person_id, "camera_id": match.get("camera_id"), "location": match.get("location"),
+                "confidence": match.get("confidence"), "timestamp": match.get("timestamp") or datetime.now().isoformat(),
+                "match_data": match,
+            }])[0]["id"]
+
+    def _rpc_match_missing_persons(self, args: Dict):
+        query = args["query_embedding"]
+        filters = [("embedding", "not.is.null")]
+        status = args.get("filter_status", "missing")
+        if status is not None:
+            filters.append(("status", f"eq.{status}"))
+        for column, op, key in (("age", "gte", "min_age"), ("age", "lte", "max_age"),
+                                ("reported_date", "gte", "reported_after"), ("reported_date", "lte", "reported_before"),
+                                ("region", "ilike", "filter_region")):
+            if args.get(key) is not None:
+                filters.append((column, f"{op}.{args[key]}"))
+        results = []
+        for row in self.select("missing_persons", filters):
+            similarity = _cosine(query, row["embedding"])
+            if similarity > args["match_threshold"]:
+                results.append({
+                    "id": row["id"], "name": row["name"], "age": row["age"], "description": row["description"],
+                    "similarity": similarity, "match_confidence": f"{similarity * 100:5.1f}%",
+                })
+        results.sort(key=lambda r: r["similarity"], reverse=True)
+        return results[:args["match_count"]]
+
+
+def _uploaded_file(body: bytes, content_type: str) -> bytes:
+    """The file part of a multipart storage upload (the client sends multipart/form-data), else the raw body"""
+    if not content_type.startswith("multipart/form-data") or "boundary=" not in content_type:
+        return body
+    boundary = b"--" + content_type.split("boundary=", 1)[1].strip('"').encode()
+    for part in body.split(boundary):
+        headers, _, content = part.partition(b"\r\n\r\n")
+        if b'name="file"' in headers:
+            return content[:-2] if content.endswith(b"\r\n") else content
+    return body
+
+
+def _project(row: Dict, select: str) -> Dict:
+    columns = [c.strip() for c in (select or "*").split(",") if c.strip()]
+    if "*" in columns:
+        picked = dict(row)
+    else:
+        # PostgREST renames with "alias:column"
+        picked = {c.partition(":")[0]: row.get(c.partition(":")[2] or c) for c in columns}
+    for column in VECTOR_COLUMNS & picked.keys():
+        if isinstance(picked[column], list):
+            picked[column] = "[" + ",".join(repr(float(v)) for v in picked[column]) + "]"
+    return picked
+
+
+class QuietHTTPServer(ThreadingHTTPServer):
+    """Threaded server that ignores clients dropping idle keep-alive connections"""
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            super().handle_error(request, client_address)
+
+
+def make_handler(store: FakeSupabase):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Buffer header + body into one write; avoids Nagle/delayed-ACK stalls on keep-alive
+        wbufsize = -1
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status: int, body=None, headers: Optional[Dict] = None, raw: bytes = None,
+                  content_type: str = "application/json"):
+            payload = raw if raw is not None else (b"" if body is None else json.dumps(body, default=str).encode())
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(payload)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _body(self) -> bytes:
+            length = int(self.headers.get("Content-Length", 0) or 0)
+            return self.rfile.read(length) if length else b""
+
+        def _route(self, method: str):
+            url = urlparse(self.path)
+            parts = [unquote(p) for p in url.path.split("/") if p]
+            params = parse_qsl(url.query, keep_blank_values=True)
+            if parts[:2] == ["rest", "v1"]:
+                return self._rest(method, parts[2:], params)
+            if parts[:2] == ["storage", "v1"]:
+                return self._storage(method, parts[2:])
+            self._send(404, {"message": "not found"})
+
+        def _rest(self, method: str, parts: List[str], params: List):
+            prefer = self.headers.get("Prefer", "")
+            if parts and parts[0] == "rpc":
+                fn = store.rpc_functions.get(parts[1])
+                # Always consume the body so the keep-alive connection stays in sync
+                args = json.loads(self._body() or b"{}")
+                if not fn:
+                    return self._send(404, {"code": "PGRST202", "message": f"Could not find the function {parts[1]}"})
+                try:
+                    return self._send(200, fn(args))
+                except Exception as e:
+                    return self._send(400, {"code": "P0001", "message": str(e)})
+
+            table = parts[0]
+            select, order, limit, offset, filters = "*", None, None, 0, []
+            for key, value in params:
+                if key == "select":
+                    select = value
+                elif key == "order":
+                    order = value
+                elif key == "limit":
+                    limit = int(value)
+                elif key == "offset":
+                    offset = int(value)
+                elif key != "on_conflict":
+                    filters.append((key, value))
+
+            if method == "GET" or method == "HEAD":
+                rows = store.select(table, filters, order, limit, offset)
+                headers = {}
+                if "count=exact" in prefer:
+                    total = len(store.select(table, filters))
+                    headers["Content-Range"] = f"0-{max(total - 1, 0)}/{total}" if total else "*/0"
+                return self._send(200, [_project(r, select) for r in rows], headers)
+            if method == "POST":
+                body = json.loads(self._body() or b"[]")
+                rows = store.insert(table, body if isinstance(body, list) else [body])
+                return self._send(201, [_project(r, select) for r in rows] if "return=representation" in prefer else None)
+            if method == "PATCH":
+                rows = store.update(table, filters, json.loads(self._body() or b"{}"))
+                return self._send(200, [_project(r, select) for r in rows])
+            if method == "DELETE":
+                rows = store.delete(table, filters)
+                return self._send(200, [_project(r, select) for r in rows])
+            self._send(405, {"message": "method not allowed"})
+
+        def _storage(self, method: str, parts: List[str]):
+            if parts[:1] != ["object"]:
+                return self._send(404, {"message": "not found"})
+            if method in ("POST", "PUT"):
+                key = "/".join(parts[1:])
+                store.objects[key] = _uploaded_file(self._body(), self.headers.get("Content-Type", ""))
+                return self._send(200, {"Key": key})
+            if method == "GET":
+                key = "/".join(parts[2:] if parts[1] in ("public", "authenticated") else parts[1:])
+                if key not in store.objects:
+                    return self._send(404, {"message": "Object not found"})
+                return self._send(200, raw=store.objects[key], content_type="application/octet-stream")
+            self._send(405, {"message": "method not allowed"})
+
+        def do_GET(self):
+            self._route("GET")
+
+        def do_HEAD(self):
+            self._route("HEAD")
+
+        def do_POST(self):
+            self._route("POST")
+
+        def do_PUT(self):
+            self._route("PUT")
+
+        def do_PATCH(self):
+            self._route("PATCH")
+
+        def do_DELETE(self):
+            self._route("DELETE")
+
+    return Handler
+
+
+def serve(host: str = "127.0.0.1", port: int = 0):
+    """Start the fake in a daemon thread; returns (server, store, base_url)"""
+    store = FakeSupabase()
+    server = QuietHTTPServer((host, port), make_handler(store))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, store, f"http://{host}:{server.server_address[1]}"
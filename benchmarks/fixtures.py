@@ -0,0 +1,61 @@
+"""Deterministic image and audio fixtures generated on the fly (no binary files in the repo)."""
+import io
+import struct
+import wave
+import zlib
+import numpy as np
+
+
+def _png_chunk(tag: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+
+def encode_png(pixels: np.ndarray) -> bytes:
+    """Encode an HxWx3 uint8 array as an RGB PNG"""
+    height, width, _ = pixels.shape
+    raw = b"".join(b"\x00" + pixels[row].tobytes() for row in range(height))
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + _png_chunk(b"IHDR", header)
+            + _png_chunk(b"IDAT", zlib.compress(raw, 6)) + _png_chunk(b"IEND", b""))
+
+
+def portrait(width: int = 640, height: int = 480, seed: int = 0) -> bytes:
+    """Synthetic portrait: gradient background, skin-toned ellipse, eye/mouth marks and sensor noise"""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width]
+    image = np.zeros((height, width, 3), dtype=np.float32)
+    image[..., 0] = 60 + 80 * x / width
+    image[..., 1] = 70 + 60 * y / height
+    image[..., 2] = 90
+    cx, cy, rx, ry = width / 2, height / 2, width * 0.18, height * 0.32
+    face = ((x - cx) / rx) ** 2 + ((y - cy) / ry) ** 2 <= 1
+    image[face] = (205, 160, 130)
+    for ex in (cx - rx * 0.4, cx + rx * 0.4):
+        eye = ((x - ex) / (rx * 0.15)) ** 2 + ((y - (cy - ry * 0.2)) / (ry * 0.07)) ** 2 <= 1
+        image[eye] = (40, 30, 30)
+    mouth = (np.abs(x - cx) < rx * 0.35) & (np.abs(y - (cy + ry * 0.45)) < ry * 0.04)
+    image[mouth] = (150, 60, 60)
+    image += rng.normal(0, 6, image.shape)
+    return encode_png(np.clip(image, 0, 255).astype(np.uint8))
+
+
+def voice_note(seconds: float = 2.0, rate: int = 16000) -> bytes:
+    """Mono 16-bit WAV with a modulated tone"""
+    t = np.arange(int(seconds * rate)) / rate
+    samples = (0.3 * np.sin(2 * np.pi * 220 * t) * np.sin(2 * np.pi * 3 * t) * 32767).astype(np.int16)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(samples.tobytes())
+    return buffer.getvalue()
+
+
+def build_fixtures() -> dict:
+    return {
+        "case_photo": portrait(640, 480, seed=1),
+        "sighting_high_res": portrait(800, 600, seed=2),
+        "sighting_low_res": portrait(320, 240, seed=3),
+        "voice_note": voice_note(),
+    }
@@ -0,0 +1,82 @@
+"""
+Cold-start report: import-time breakdown of backend.main and first-request latency per route,
+each measured in a fresh interpreter (what a serverless cold start pays).
+
+    python -m benchmarks.import_time                         # top 25 modules by cumulative import time
+    python -m benchmarks.import_time --top 40 --route /api/missing-persons --route /
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COLD_REQUEST = """
+import json, sys, time
+start = time.perf_counter()
+import backend.main
+from fastapi.testclient import TestClient
+imported = time.perf_counter()
+client = TestClient(backend.main.app)
+status = client.get(sys.argv[1]).status_code
+done = time.perf_counter()
+print(json.dumps({"import_ms": (imported - start) * 1000, "first_request_ms": (done - imported) * 1000,
+                  "status": status, "heavy_modules": sorted(m for m in ("cv2", "mediapipe", "openai", "supabase")
+                                                           if m in sys.modules)}))
+"""
+
+
+def import_profile(module: str) -> List[Dict]:
+    """Parse `python -X importtime` output into rows sorted by cumulative microseconds"""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=ROOT, capture_output=True, text=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append({"module": name.strip(), "depth": (len(name) - len(name.lstrip())) // 2,
+                     "self_ms": int(self_us) / 1000, "cumulative_ms": int(cumulative_us) / 1000})
+    return sorted(rows, key=lambda r: r["cumulative_ms"], reverse=True)
+
+
+def cold_request(route: str) -> Dict:
+    proc = subprocess.run([sys.executable, "-c", COLD_REQUEST, route], cwd=ROOT, capture_output=True, text=True,
+                          env={**os.environ, "LOG_LEVEL": "ERROR"})
+    if proc.returncode != 0:
+        return {"route": route, "error": proc.stderr.strip().splitlines()[-1:]}
+    return {"route": route, **json.loads(proc.stdout.strip().splitlines()[-1])}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="DHUND cold-start / import-time report")
+    parser.add_argument("--module", default="backend.main")
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--route", action="append", help="route to cold-request (repeatable)")
+    parser.add_argument("--json", action="store_true", help="print machine-readable output")
+    args = parser.parse_args(argv)
+    routes = args.route or ["/", "/api/missing-persons"]
+
+    rows = import_profile(args.module)
+    colds = [cold_request(route) for route in routes]
+    if args.json:
+        print(json.dumps({"imports": rows[:args.top], "cold_requests": colds}, indent=2))
+        return
+
+    print(f"{'cumulative':>12} {'self':>10}  module")
+    for row in rows[:args.top]:
+        print(f"{row['cumulative_ms']:>10.1f}ms {row['self_ms']:>8.1f}ms  {'  ' * row['depth']}{row['module']}")
+    print()
+    for cold in colds:
+        if "error" in cold:
+            print(f"{cold['route']:<28} failed: {cold['error']}")
+            continue
+        print(f"{cold['route']:<28} import {cold['import_ms']:8.1f}ms  first request {cold['first_request_ms']:8.1f}ms"
+              f"  status {cold['status']}  heavy modules loaded: {', '.join(cold['heavy_modules']) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,377 @@
+"""
+DHUND end-to-end benchmark suite (fully offline).
+
+Starts a fake Supabase (REST + storage) and a fake OpenAI-compatible Grok server on
+localhost, points the backend at them, seeds cases from generated fixtures and drives
+every FastAPI endpoint plus the individual AIEngine stages.
+
+    python -m benchmarks.run                          # all scenarios via in-process TestClient
+    python -m benchmarks.run --transport uvicorn      # real HTTP server on a free port
+    python -m benchmarks.run --only citizen           # scenarios whose name contains "citizen"
+    python -m benchmarks.run --save-baseline          # write benchmarks/baselines/baseline.json
+    python -m benchmarks.run --compare                # exit 1 when p95/throughput regress vs baseline
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import resource
+import tempfile
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from . import fake_openai, fake_supabase
+from .fixtures import build_fixtures
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baselines", "baseline.json")
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+
+class RSSSampler:
+    """Samples resident set size on a background thread; reports the peak per scenario"""
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.page_size = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def current(self) -> int:
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * self.page_size
+        except OSError:
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self.current())
+            time.sleep(self.interval)
+
+    def __enter__(self):
+        self.peak = self.current()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.current())
+
+
+def summarize(latencies: List[float], wall: float, errors: int, peak_rss: int, ttfb: List[float]) -> Dict:
+    values = np.array(latencies) * 1000.0 if latencies else np.array([0.0])
+    result = {
+        "iterations": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / wall, 2) if wall > 0 else 0.0,
+        "mean_ms": round(float(values.mean()), 3),
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p95_ms": round(float(np.percentile(values, 95)), 3),
+        "p99_ms": round(float(np.percentile(values, 99)), 3),
+        "max_ms": round(float(values.max()), 3),
+        "peak_rss_mb": round(peak_rss / (1024 * 1024), 1),
+    }
+    if ttfb:
+        first = np.array(ttfb) * 1000.0
+        result["ttfb_p50_ms"] = round(float(np.percentile(first, 50)), 3)
+        result["ttfb_p95_ms"] = round(float(np.percentile(first, 95)), 3)
+    return result
+
+
+def measure(fn: Callable[[], Optional[float]], iterations: int, warmup: int, concurrency: int) -> Dict:
+    """Run fn repeatedly; fn returns time-to-first-byte for streaming scenarios (None otherwise)"""
+    for _ in range(warmup):
+        fn()
+    latencies, ttfb, errors = [], [], 0
+    lock = threading.Lock()
+
+    def one():
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            first = fn()
+        except Exception:
+            with lock:
+                errors += 1
+            return
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            if first is not None:
+                ttfb.append(first)
+
+    with RSSSampler() as rss:
+        wall_start = time.perf_counter()
+        if concurrency > 1:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                list(pool.map(lambda _: one(), range(iterations)))
+        else:
+            for _ in range(iterations):
+                one()
+        wall = time.perf_counter() - wall_start
+    return summarize(latencies, wall, errors, rss.peak, ttfb)
+
+
+def start_environment(args) -> Dict:
+    """Start local stand-ins and configure the backend to use them (before it is imported)"""
+    _, store, supabase_url = fake_supabase.serve()
+    llm_config = fake_openai.FakeLLMConfig(args.llm_latency_ms, args.llm_token_delay_ms, args.llm_error_rate)
+    _, llm_url = fake_openai.serve(llm_config)
+
+    os.environ.update({
+        "SUPABASE_URL": supabase_url,
+        "SUPABASE_SERVICE_ROLE_KEY": "bench.fake.key",
+        "GROK_API_BASE_URL": llm_url,
+        "GROK_API_KEY": "bench-local-key",
+        "IS_DEMO_MODE": "true" if args.mock else "false",
+        "GROK_RATE_LIMIT_RPM": "1000000",
+        "GROK_RATE_BURST": "100000",
+        # Every scenario comes from one client; per-client limits would turn iterations into 429s
+        "ADMISSION_ENABLED": "false",
+        "LOG_LEVEL": os.environ.get("LOG_LEVEL", "WARNING"),
+        "TMPDIR": tempfile.mkdtemp(prefix="dhund_bench_"),
+    })
+    return {"store": store, "llm_config": llm_config, "supabase_url": supabase_url, "llm_url": llm_url}
+
+
+def make_client(app, transport: str):
+    if transport == "uvicorn":
+        import httpx
+        import socket
+        import uvicorn
+        sock = socket.socket()
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+        sock.close()
+        server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+        threading.Thread(target=server.run, daemon=True).start()
+        while not server.started:
+            time.sleep(0.01)
+        return httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=120)
+    from fastapi.testclient import TestClient
+    client = TestClient(app)
+    client.__enter__()
+    return client
+
+
+def endpoint_scenarios(client, fixtures: Dict, person_id: int, report_id: int) -> Dict[str, Callable]:
+    def ok(response):
+        if response.status_code >= 400:
+            raise RuntimeError(f"HTTP {response.status_code}: {response.text[:200]}")
+        return None
+
+    def streamed(method: str, url: str, **kwargs) -> float:
+        start = time.perf_counter()
+        first = None
+        with client.stream(method, url, **kwargs) as response:
+            if response.status_code >= 400:
+                raise RuntimeError(f"HTTP {response.status_code}")
+            for _ in response.iter_raw():
+                if first is None:
+                    first = time.perf_counter() - start
+        return first
+
+    photo = lambda name="photo", key="case_photo": {name: (f"{key}.png", fixtures[key], "image/png")}
+    report_params = {"name": "Bench Case", "age": 9, "description": "Red shirt, last seen near Dadar station"}
+    sighting_params = {"person_id": person_id, "location": "Dadar Railway Station", "description": "Child in red shirt",
+                       "reporter_phone": "+910000000000"}
+    sighting_number = itertools.count()
+
+    def fresh_sighting() -> Dict:
+        """A distinct location and description per call, so the near-duplicate merge never short-circuits
+        verification (the "(duplicate)" scenario measures that path on purpose)"""
+        n = next(sighting_number)
+        return {**sighting_params, "location": f"Dadar Railway Station Gate {n}",
+                "description": f"Child in red shirt near stall {n}"}
+
+    return {
+        "GET /": lambda: ok(client.get("/")),
+        "POST /api/report-missing": lambda: ok(client.post("/api/report-missing", params=report_params, files=photo())),
+        "POST /api/report-missing/stream": lambda: streamed("POST", "/api/report-missing/stream", params=report_params,
+                                                            files=photo()),
+        "POST /api/citizen-report": lambda: ok(client.post("/api/citizen-report", params=fresh_sighting(),
+                                                           files=photo("sighting_photo", "sighting_high_res"))),
+        "POST /api/citizen-report (low-res)": lambda: ok(client.post("/api/citizen-report", params=fresh_sighting(),
+                                                                     files=photo("sighting_photo", "sighting_low_res"))),
+        "POST /api/citizen-report (duplicate)": lambda: ok(client.post("/api/citizen-report", params=sighting_params,
+                                                                       files=photo("sighting_photo", "sighting_high_res"))),
+        "POST /api/citizen-report (open-case screening)": lambda: ok(client.post(
+            "/api/citizen-report", params={k: v for k, v in sighting_params.items() if k != "person_id"},
+            files=photo("sighting_photo", "sighting_high_res"))),
+        "POST /api/citizen-report/stream": lambda: streamed("POST", "/api/citizen-report/stream", params=fresh_sighting(),
+                                                            files=photo("sighting_photo", "sighting_high_res")),
+        "GET /api/missing-persons": lambda: ok(client.get("/api/missing-persons")),
+        "GET /api/sightings": lambda: ok(client.get("/api/sightings")),
+        "GET /api/sightings/{id}": lambda: ok(client.get(f"/api/sightings/{report_id}")),
+        "POST /api/semantic-search": lambda: ok(client.post("/api/semantic-search",
+                                                            params={"query": "red shirt Dadar station", "limit": 10})),
+        "POST /api/search-cctv": lambda: ok(client.post("/api/search-cctv", data={"person_id": person_id})),
+        "POST /api/ai/process-voice": lambda: ok(client.post("/api/ai/process-voice",
+                                                             files={"audio": ("note.wav", fixtures["voice_note"], "audio/wav")})),
+        "POST /api/age-progression": lambda: ok(client.post("/api/age-progression", data={
+            "person_id": person_id, "current_age": 9, "target_age": 14})),
+        "POST /api/age-progression/batch": lambda: ok(client.post("/api/age-progression/batch", data={
+            "person_id": person_id, "target_ages": "10,12,14,19", "include_insights": "true"})),
+        "POST /api/ai/target-reconstruction": lambda: ok(client.post("/api/ai/target-reconstruction",
+                                                                     data={"person_id": person_id})),
+        "POST /api/ai/target-reconstruction/stream": lambda: streamed("POST", "/api/ai/target-reconstruction/stream",
+                                                                      data={"person_id": person_id}),
+        "GET /api/search-status/{id}": lambda: ok(client.get(f"/api/search-status/{person_id}")),
+        "GET /metrics": lambda: ok(client.get("/metrics")),
+    }
+
+
+def _discard(fn: Callable) -> Callable:
+    """Engine calls return payloads; measure() treats a non-None return as time-to-first-byte"""
+    def run():
+        fn()
+    return run
+
+
+def engine_scenarios(engine, fixtures: Dict, workdir: str) -> Dict[str, Callable]:
+    paths = {}
+    for key in ("case_photo", "sighting_high_res", "sighting_low_res"):
+        paths[key] = os.path.join(workdir, f"{key}.png")
+        with open(paths[key], "wb") as f:
+            f.write(fixtures[key])
+    person = {"id": 1, "name": "Bench Case", "age": 9, "description": "Red shirt"}
+    return {
+        "AIEngine.analyze_missing_person": _discard(lambda: asyncio.run(
+            engine.analyze_missing_person(paths["case_photo"], 9, "Red shirt near Dadar"))),
+        "AIEngine.verify_citizen_sighting": _discard(lambda: asyncio.run(engine.verify_citizen_sighting(
+            paths["case_photo"], paths["sighting_high_res"], "Dadar Railway Station", "Child in red shirt"))),
+        "AIEngine.generate_age_progression": _discard(lambda: engine.generate_age_progression(paths["case_photo"], 9, 14)),
+        "AIEngine.search_cctv_network": _discard(lambda: engine.search_cctv_network(person)),
+        "AIEngine._detect_faces": _discard(lambda: engine._detect_faces(paths["case_photo"])),
+        "GaitAnalyzer.extract_gait_signature": _discard(
+            lambda: engine.gait_analyzer.extract_gait_signature(paths["case_photo"])),
+        "OpenAIIntegration.generate_embeddings": _discard(lambda: engine.openai_service.generate_embeddings(
+            "Name: Bench Case, Age: 9, Context: Red shirt near Dadar station")),
+        "OpenAIIntegration.generate_embeddings_batch[256]": _discard(
+            lambda: engine.openai_service.generate_embeddings_batch(
+                [f"Name: Bench Case {i}, Age: 9, Context: Red shirt near Dadar station" for i in range(256)])),
+    }
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Regressions: p95 slower or throughput lower than baseline by more than `tolerance`"""
+    regressions = []
+    for name, current in results["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous:
+            continue
+        if previous["p95_ms"] > 0 and current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms")
+        if previous["throughput_rps"] > 0 and current["throughput_rps"] < previous["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {previous['throughput_rps']} -> {current['throughput_rps']} rps")
+        if current["errors"] > previous.get("errors", 0):
+            regressions.append(f"{name}: errors {previous.get('errors', 0)} -> {current['errors']}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="DHUND offline benchmark suite")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--transport", choices=["testclient", "uvicorn"], default="testclient")
+    parser.add_argument("--seed-cases", type=int, default=25)
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0)
+    parser.add_argument("--llm-token-delay-ms", type=float, default=2.0)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--mock", action="store_true", help="use the built-in simulation instead of the fake LLM server")
+    parser.add_argument("--only", default="", help="only run scenarios whose name contains this text")
+    parser.add_argument("--skip-engine", action="store_true")
+    parser.add_argument("--output", default="")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--compare", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    env = start_environment(args)
+    sys.path.insert(0, os.path.dirname(BENCH_DIR))
+    from backend import main as backend_main
+
+    fixtures = build_fixtures()
+    client = make_client(backend_main.app, args.transport)
+
+    # Seed cases and one sighting so read endpoints return realistic payloads
+    person_id = report_id = None
+    for i in range(args.seed_cases):
+        response = client.post("/api/report-missing", params={
+            "name": f"Seed Case {i}", "age": 5 + i % 12, "description": f"Seed description {i}, blue bag, Bandra"},
+            files={"photo": ("seed.png", fixtures["case_photo"], "image/png")})
+        person_id = person_id or response.json().get("person_id")
+    response = client.post("/api/citizen-report", params={
+        "person_id": person_id, "location": "Bandra Bus Terminal", "description": "Seed sighting",
+        "reporter_phone": "+910000000000"}, files={"sighting_photo": ("s.png", fixtures["sighting_low_res"], "image/png")})
+    report_id = response.json().get("report_id")
+
+    scenarios = dict(endpoint_scenarios(client, fixtures, person_id, report_id))
+    if not args.skip_engine:
+        scenarios.update(engine_scenarios(backend_main.ai_engine, fixtures, tempfile.mkdtemp(prefix="dhund_bench_fx_")))
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "transport": args.transport,
+            "iterations": args.iterations,
+            "concurrency": args.concurrency,
+            "llm": "simulation" if args.mock else {
+                "latency_ms": args.llm_latency_ms, "token_delay_ms": args.llm_token_delay_ms,
+                "error_rate": args.llm_error_rate},
+            "seed_cases": args.seed_cases,
+        },
+        "results": {},
+    }
+    for name, fn in scenarios.items():
+        if args.only and args.only.lower() not in name.lower():
+            continue
+        results["results"][name] = stats = measure(fn, args.iterations, args.warmup, args.concurrency)
+        print(f"{name:<45} p50 {stats['p50_ms']:>9.2f}ms  p95 {stats['p95_ms']:>9.2f}ms  "
+              f"p99 {stats['p99_ms']:>9.2f}ms  {stats['throughput_rps']:>8.1f} rps  "
+              f"rss {stats['peak_rss_mb']:>7.1f}MB  err {stats['errors']}")
+    results["meta"]["process_peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"bench_{datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            print(f"No baseline at {args.baseline}; run with --save-baseline first")
+            return 2
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\nREGRESSIONS:\n  " + "\n  ".join(regressions))
+            return 1
+        print("\nNo regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
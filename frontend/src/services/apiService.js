@@ -72,6 +72,16 @@ const apiService = {
     return response.data;
   },
 
+  // formData carries target_ages as a comma-separated list, e.g. "10,12,14"
+  generateAgeProgressionBatch: async (formData) => {
+    const response = await axios.post(apiUrl('/api/age-progression/batch'), formData, {
+      headers: {
+        'Content-Type': 'multipart/form-data',
+      },
+    });
+    return response.data;
+  },
+
   targetReconstruction: async (formData) => {
     const response = await axios.post(apiUrl('/api/ai/target-reconstruction'), formData, {
       headers: {
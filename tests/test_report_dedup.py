@@ -0,0 +1,53 @@
+import asyncio
+
+import numpy as np
+
+from backend.openai_integration import hash_embeddings
+from backend.report_dedup import ReportDeduplicator, normalize_description
+
+
+def _claim(dedup, description, location="Dadar station, near gate 2", embedding=None):
+    return dedup.claim(7, location, description, embedding)
+
+
+def test_near_identical_wording_merges_without_embeddings():
+    async def scenario():
+        dedup = ReportDeduplicator()
+        first, is_new = _claim(dedup, "Boy in red shirt crying near the bus stop")
+        second, second_new = _claim(dedup, "boy in a red shirt, crying near bus stop.", "gate 2 Dadar Station")
+        return first, is_new, second, second_new, dedup.stats()
+
+    first, is_new, second, second_new, stats = asyncio.run(scenario())
+    assert is_new and not second_new
+    assert second is first and first.count == 2
+    assert stats["duplicates"] == 1
+
+
+def test_near_identical_wording_merges_with_embeddings_of_normalized_text():
+    a = "Boy in red shirt crying near the bus stop"
+    b = "boy in a red shirt, crying near bus stop."
+    assert normalize_description(a) == normalize_description(b)
+    raw = hash_embeddings([a, b])
+    assert float(np.dot(raw[0], raw[1]) / np.linalg.norm(raw[0]) / np.linalg.norm(raw[1])) < 0.92
+
+    async def scenario():
+        dedup = ReportDeduplicator()
+        first, _ = _claim(dedup, a, embedding=hash_embeddings([normalize_description(a)])[0])
+        second, is_new = _claim(dedup, b, embedding=hash_embeddings([normalize_description(b)])[0])
+        return first, second, is_new
+
+    first, second, is_new = asyncio.run(scenario())
+    assert second is first and not is_new
+
+
+def test_different_sightings_stay_apart():
+    async def scenario():
+        dedup = ReportDeduplicator()
+        first, _ = _claim(dedup, "Boy in red shirt crying near the bus stop")
+        other, other_new = _claim(dedup, "Girl with blue school bag walking towards market")
+        moved, moved_new = _claim(dedup, "Boy in red shirt crying near the bus stop", "Andheri west, platform 4")
+        return first, other, other_new, moved, moved_new
+
+    first, other, other_new, moved, moved_new = asyncio.run(scenario())
+    assert other_new and other is not first
+    assert moved_new and moved is not first
@@ -0,0 +1,57 @@
+import time
+from backend.resilience import AdaptiveConcurrencyLimiter, CircuitBreaker, ResilienceGuard, TokenBucket
+
+
+def make_guard() -> ResilienceGuard:
+    return ResilienceGuard("test", TokenBucket(rate=1000, capacity=1000),
+                           AdaptiveConcurrencyLimiter(initial=4, min_limit=1, max_limit=16, latency_target=15.0),
+                           CircuitBreaker(failure_threshold=1, reset_timeout=0.01))
+
+
+def half_open(guard: ResilienceGuard):
+    guard.breaker.record_failure()
+    time.sleep(0.02)
+    return guard
+
+
+def test_abandoned_stream_is_not_a_successful_probe():
+    guard = half_open(make_guard())
+    limit = guard.limiter.limit
+    stream = guard.call_stream(lambda: iter(["a", "b", "c"]))
+    assert next(stream) == "a"
+    assert guard.breaker.state == CircuitBreaker.HALF_OPEN
+    stream.close()
+
+    assert guard.breaker.state == CircuitBreaker.HALF_OPEN
+    assert guard.breaker.consecutive_failures == 1
+    assert guard.limiter.in_flight == 0
+    assert guard.limiter.limit == limit
+    assert guard.counters["successes"] == 0
+    assert guard.counters["abandoned"] == 1
+    # The probe slot was given back, so the next call can still probe the provider
+    assert list(guard.call_stream(lambda: iter(["x"]))) == ["x"]
+    assert guard.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_drained_stream_records_success():
+    guard = make_guard()
+    assert list(guard.call_stream(lambda: iter(range(3)))) == [0, 1, 2]
+    assert guard.counters["successes"] == 1
+    assert guard.limiter.in_flight == 0
+
+
+def test_mid_stream_error_records_failure():
+    def failing():
+        yield 1
+        raise RuntimeError("upstream reset")
+
+    guard = make_guard()
+    stream = guard.call_stream(failing)
+    assert next(stream) == 1
+    try:
+        next(stream)
+    except RuntimeError:
+        pass
+    assert guard.counters["failures"] == 1
+    assert guard.breaker.state == CircuitBreaker.OPEN
+    assert guard.limiter.in_flight == 0
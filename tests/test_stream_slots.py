@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from backend.main import _relay_in_slot
+from backend.scheduler import SchedulerOverloaded, VerificationScheduler
+
+
+async def _pipeline(events):
+    for event in events:
+        await asyncio.sleep(0)
+        yield {"event": event, "data": {}}
+
+
+def test_slot_released_before_slow_client_reads_events():
+    async def scenario():
+        scheduler = VerificationScheduler(max_concurrent=1)
+        relay = _relay_in_slot(scheduler.slot("verification", 1), _pipeline(["stage", "token", "verification"]))
+        first = await relay.__anext__()
+        # The client has read one event; the pipeline finishes and gives the slot back anyway
+        for _ in range(10):
+            await asyncio.sleep(0)
+        running_while_client_reads = scheduler.stats()["running"]
+        rest = [event async for event in relay]
+        return first, rest, running_while_client_reads
+
+    first, rest, running = asyncio.run(scenario())
+    assert first["event"] == "stage"
+    assert [e["event"] for e in rest] == ["token", "verification"]
+    assert running == 0
+
+
+def test_overload_is_raised_to_the_client():
+    async def scenario():
+        scheduler = VerificationScheduler(max_concurrent=1, max_queue=0)
+        async with scheduler.slot("verification", 1):
+            with pytest.raises(SchedulerOverloaded):
+                async for _ in _relay_in_slot(scheduler.slot("verification", 2), _pipeline(["stage"])):
+                    pass
+        return scheduler.stats()["running"]
+
+    assert asyncio.run(scenario()) == 0
+
+
+def test_client_disconnect_cancels_pipeline_and_frees_slot():
+    async def slow_pipeline():
+        yield {"event": "stage", "data": {}}
+        await asyncio.sleep(30)
+        yield {"event": "verification", "data": {}}
+
+    async def scenario():
+        scheduler = VerificationScheduler(max_concurrent=1)
+        relay = _relay_in_slot(scheduler.slot("verification", 1), slow_pipeline())
+        await relay.__anext__()
+        await relay.aclose()
+        return scheduler.stats()["running"]
+
+    assert asyncio.run(asyncio.wait_for(scenario(), 5)) == 0